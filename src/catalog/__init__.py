@@ -0,0 +1,18 @@
+from .reader import (
+    DELIMITERS,
+    DEFAULT_CHUNK_SIZE,
+    ReadCancelled,
+    ReadProgress,
+    RawTable,
+    collapse_tabs,
+    iter_chunks,
+    line_end,
+    read_table,
+)
+from .table import EventTable, to_float64
+from .cache import CatalogCache, CacheEntry, FileFingerprint, default_cache_dir
+from .parallel import default_workers, read_events_parallel, read_table_parallel, split_ranges, use_pool
+from .batch import deduplicate, expand_sources, ingest_files, read_events
+from .timeindex import DEFAULT_TIME_FORMAT, TIME_NONE, TimeIndex, format_time, parse_times
+from .follow import CatalogFollower
+from .sketch import QuantileSketch
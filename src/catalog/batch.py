@@ -0,0 +1,235 @@
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from .cache import CatalogCache, FileFingerprint
+from .reader import ReadCancelled, read_table
+from .table import EventTable
+from .timeindex import DEFAULT_TIME_FORMAT, TIME_NONE
+
+
+def expand_sources(location: str, pattern: str = "*.csv") -> List[str]:
+    """Список файлов по папке (с маской pattern) или по glob-шаблону, в порядке имен."""
+    if os.path.isdir(location):
+        location = os.path.join(location, pattern)
+    return sorted(p for p in glob.glob(location) if os.path.isfile(p))
+
+
+def read_events(
+    path: str,
+    delimiter: str,
+    mapping: List[int],
+    time_format: str = DEFAULT_TIME_FORMAT,
+    cache_path: str = None,
+) -> EventTable:
+    """mapping - индексы колонок [x, y, z, value] или [x, y, z, value, time]."""
+    cache = CatalogCache(cache_path) if cache_path is not None else None
+    cache_mapping = list(mapping) + [time_format]
+    if cache is not None:
+        # Отпечаток снимается до чтения: put сверит его с файлом после разбора
+        fingerprint = FileFingerprint.of(path)
+        entry = cache.get(path, delimiter, cache_mapping, fingerprint)
+        if entry is not None:
+            # Колонки из mmap копируются, чтобы передать их из процесса пула
+            return entry.load().copy()
+    raw = read_table(path, delimiter)
+    table = EventTable.from_raw(raw, *mapping, time_format=time_format)
+    if cache is not None:
+        try:
+            cache.put(fingerprint, delimiter, cache_mapping, raw.header, table)
+        except OSError:
+            pass
+    return table
+
+
+# Ячейка событий без времени: далеко от ячеек реальных дат
+_TIME_NONE_CELL = TIME_NONE // 2
+
+
+def _expand(starts: np.ndarray, counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Развертка диапазонов [start, start + count): (номер диапазона, индекс)."""
+    owner = np.repeat(np.arange(len(starts)), counts)
+    shift = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+    return owner, shift + np.arange(len(owner))
+
+
+class _CellGrid:
+    """
+    События, разложенные по ячейкам со стороной в допуск по каждой оси,
+    и пары соседних непустых ячеек (сама ячейка - тоже соседняя).
+    Две точки одной ячейки всегда в пределах допуска друг от друга.
+    """
+
+    def __init__(self, cells: np.ndarray, offsets: np.ndarray):
+        # Ключ ячейки - одно int64, если окрестность помещается, иначе байты ячейки
+        self.low = cells.min(axis=0) - 1
+        spans = [int(h) - int(l) + 2 for h, l in zip(cells.max(axis=0), self.low)]
+        self.strides = None
+        if np.prod(spans, dtype=object) < 2**63:
+            self.strides = np.cumprod([1] + spans[:0:-1])[::-1].astype(np.int64)
+        self.void = np.dtype((np.void, cells.itemsize * cells.shape[1]))
+        uniq, cell_of = np.unique(self._keys(cells), return_inverse=True)
+        self.size = len(uniq)
+        self.cell_of = cell_of.ravel()
+        # Строки, упорядоченные по ячейке, внутри ячейки - по номеру
+        self.order = np.argsort(self.cell_of, kind="stable")
+        bounds = np.searchsorted(self.cell_of[self.order], np.arange(self.size + 1))
+        self.starts, self.counts = bounds[:-1], np.diff(bounds)
+        first = cells[self.order[self.starts]]
+        near_cells, near_others = [], []
+        for offset in offsets:
+            keys = self._keys(first + offset)
+            found = np.minimum(np.searchsorted(uniq, keys), self.size - 1)
+            has = np.flatnonzero(uniq[found] == keys)
+            near_cells.append(has)
+            near_others.append(found[has])
+        self.pair_cell = np.concatenate(near_cells)
+        order = np.argsort(self.pair_cell, kind="stable")
+        self.pair_cell = self.pair_cell[order]
+        self.pair_other = np.concatenate(near_others)[order]
+        bounds = np.searchsorted(self.pair_cell, np.arange(self.size + 1))
+        self.pair_starts, self.pair_counts = bounds[:-1], np.diff(bounds)
+
+    def _keys(self, cells: np.ndarray) -> np.ndarray:
+        if self.strides is not None:
+            return (cells - self.low) @ self.strides
+        return np.ascontiguousarray(cells).view(self.void).ravel()
+
+    def neighbours(self, cell: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Пары (позиция в cell, соседняя ячейка)."""
+        owner, index = _expand(self.pair_starts[cell], self.pair_counts[cell])
+        return owner, self.pair_other[index]
+
+    def members(self, cell: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Пары (позиция в cell, строка ячейки)."""
+        owner, index = _expand(self.starts[cell], self.counts[cell])
+        return owner, self.order[index]
+
+
+def _resolve_cells(grid: _CellGrid, near) -> np.ndarray:
+    """
+    Маска удаляемых строк при проходе по порядку таблицы: строка удаляется,
+    если рядом есть более ранняя оставленная.
+
+    Решается волнами сразу для всех ячеек. Первая нерешенная строка ячейки
+    остается, если у соседних ячеек нет нерешенных строк раньше нее; вместе
+    с ней удаляются все нерешенные строки окрестности в пределах допуска.
+    В ячейке остается не больше одной строки, поэтому каждая строка
+    сравнивается не больше чем с 3^k оставленными.
+    """
+    undecided, kept, dropped = 0, 1, 2
+    state = np.zeros(len(grid.cell_of), dtype=np.int8)
+    pair_cell, pair_other = grid.pair_cell, grid.pair_other
+    while True:
+        rows = grid.order[state[grid.order] == undecided]
+        if len(rows) == 0:
+            return state == dropped
+        cell = grid.cell_of[rows]
+        first = np.ones(len(cell), dtype=bool)
+        first[1:] = cell[1:] != cell[:-1]
+        cell, rows = cell[first], rows[first]
+        head = np.full(grid.size, len(state), dtype=np.intp)
+        head[cell] = rows
+        # Пары решенных ячеек больше не нужны
+        active = head[pair_cell] < len(state)
+        pair_cell, pair_other = pair_cell[active], pair_other[active]
+        wait = np.zeros(grid.size, dtype=bool)
+        wait[pair_cell[head[pair_other] < head[pair_cell]]] = True
+        rows = rows[~wait[cell]]
+        state[rows] = kept
+        owner, other = grid.neighbours(grid.cell_of[rows])
+        inner, member = grid.members(other)
+        owner = rows[owner[inner]]
+        close = (state[member] == undecided) & near(owner, member)
+        state[member[close]] = dropped
+
+
+def deduplicate(
+    table: EventTable, tolerance: float, time_tolerance: float = 0
+) -> Tuple[EventTable, int]:
+    """
+    Убирает повторы событий из пересекающихся выгрузок.
+
+    Повтор - событие, у которого x, y, z отличаются от более раннего оставленного
+    не больше чем на tolerance, а время (если есть колонка time) - не больше
+    чем на time_tolerance; при time_tolerance = 0 время должно совпасть точно.
+    События раскладываются по ячейкам floor(coord / tolerance) и сравниваются
+    только с событиями своей и соседних ячеек.
+    Возвращает таблицу без повторов и число удаленных строк.
+    """
+    if len(table) == 0 or tolerance <= 0:
+        return table, 0
+    coords = np.column_stack([np.asarray(c, dtype=np.float64) for c in (table.x, table.y, table.z)])
+    scaled = np.floor(coords / tolerance)
+    # Нечисловые и запредельные координаты повтором не считаются
+    valid = np.flatnonzero((np.abs(scaled) < 2.0**62).all(axis=1))
+    if len(valid) < 2:
+        return table, 0
+    coords = coords[valid]
+    cells = [scaled[valid].astype(np.int64)]
+    axes = [[-1, 0, 1]] * 3
+    time = None
+    if table.time is not None:
+        time = np.asarray(table.time)[valid]
+        missing = time == TIME_NONE
+        if time_tolerance > 0:
+            time_cells = np.floor(np.where(missing, 0, time) / time_tolerance).astype(np.int64)
+            axes.insert(0, [-1, 0, 1])
+        else:
+            # Точное совпадение времени: ячейка - само время, без соседей
+            time_cells = time.astype(np.int64)
+            axes.insert(0, [0])
+        time_cells[missing] = _TIME_NONE_CELL
+        cells.insert(0, time_cells[:, None])
+        # float: разность с TIME_NONE в int64 переполнилась бы
+        time = time.astype(np.float64)
+    offsets = np.array(np.meshgrid(*axes, indexing="ij")).reshape(len(axes), -1).T
+
+    def near(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        close = (np.abs(coords[a] - coords[b]) <= tolerance).all(axis=1)
+        if time is not None:
+            close &= np.abs(time[a] - time[b]) <= time_tolerance
+        return close
+
+    dropped = _resolve_cells(_CellGrid(np.hstack(cells), offsets), near)
+    removed = int(dropped.sum())
+    if removed == 0:
+        return table, 0
+    keep = np.ones(len(table), dtype=bool)
+    keep[valid[dropped]] = False
+    return table.take(np.flatnonzero(keep)), removed
+
+
+def ingest_files(
+    paths: List[str],
+    delimiter: str,
+    mapping: List[int],
+    time_format: str = DEFAULT_TIME_FORMAT,
+    workers: int = None,
+    cache_path: str = None,
+    on_progress: Optional[Callable[[int, int], bool]] = None,
+) -> EventTable:
+    """
+    Читает несколько каталогов с общим соответствием колонок параллельно,
+    по процессу на файл. Результат склеивается в порядке paths.
+    """
+    tables: List[EventTable] = [None] * len(paths)
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = {
+            executor.submit(read_events, path, delimiter, mapping, time_format, cache_path): index
+            for index, path in enumerate(paths)
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            tables[futures[future]] = future.result()
+            if on_progress is not None and on_progress(done, len(paths)) is False:
+                raise ReadCancelled()
+    except BaseException:
+        # Без with: его выход дождался бы всех процессов и отмена бы не сработала
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown()
+    return EventTable.concat(tables)
@@ -0,0 +1,240 @@
+import hashlib
+import json
+import os
+import shutil
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+from .table import EventTable
+
+DEFAULT_CACHE_LIMIT = 2 * 1024 * 1024 * 1024
+# Сколько байт с начала и с конца файла входит в хэш содержимого
+HASH_SAMPLE_SIZE = 1024 * 1024
+
+_COLUMNS = ("x", "y", "z", "value", "time")
+_META = "meta.json"
+
+
+def default_cache_dir() -> str:
+    base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "seismic-events-map", "catalogs")
+
+
+@dataclass
+class FileFingerprint:
+    path: str
+    size: int
+    mtime: int
+    content_hash: str
+
+    @classmethod
+    def of(cls, path: str) -> "FileFingerprint":
+        """
+        Отпечаток файла: путь, размер, mtime и хэш начала и конца содержимого.
+
+        Хэшируется не весь файл, а первые и последние HASH_SAMPLE_SIZE байт -
+        иначе проверка кэша многогигабайтного каталога стоила бы полного чтения.
+        """
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        h = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as f:
+            h.update(f.read(HASH_SAMPLE_SIZE))
+            if st.st_size > HASH_SAMPLE_SIZE:
+                f.seek(max(st.st_size - HASH_SAMPLE_SIZE, HASH_SAMPLE_SIZE))
+                h.update(f.read(HASH_SAMPLE_SIZE))
+        return cls(path, st.st_size, st.st_mtime_ns, h.hexdigest())
+
+
+@dataclass
+class CacheEntry:
+    key: str
+    dir: str
+    source: str
+    delimiter: str
+    mapping: List[int]
+    header: List[str]
+    rows: int
+    size: int
+    last_used: float
+
+    def load(self) -> EventTable:
+        """Открывает колонки через mmap, данные читаются с диска по мере обращения."""
+
+        def column(name):
+            path = os.path.join(self.dir, name + ".npy")
+            if not os.path.exists(path):
+                return None
+            return np.load(path, mmap_mode="r")
+
+        return EventTable(
+            x=column("x"),
+            y=column("y"),
+            z=column("z"),
+            value=column("value"),
+            time=column("time"),
+        )
+
+
+def make_key(fingerprint: FileFingerprint, delimiter: str, mapping: List[int]) -> str:
+    data = json.dumps(
+        [
+            fingerprint.path,
+            fingerprint.size,
+            fingerprint.mtime,
+            fingerprint.content_hash,
+            delimiter,
+            list(mapping),
+        ]
+    )
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+class CatalogCache:
+    """
+    Дисковый кэш разобранных каталогов в формате .npy (по файлу на колонку).
+
+    Размер ограничен limit байт, при превышении удаляются давно не
+    использованные записи (время использования - mtime meta.json).
+    """
+
+    def __init__(self, path: str = None, limit: int = DEFAULT_CACHE_LIMIT):
+        self.path = path or default_cache_dir()
+        self.limit = limit
+
+    def _read_entry(self, key) -> Optional[CacheEntry]:
+        entry_dir = os.path.join(self.path, key)
+        meta_path = os.path.join(entry_dir, _META)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            last_used = os.path.getmtime(meta_path)
+        except (OSError, ValueError):
+            return None
+        return CacheEntry(key=key, dir=entry_dir, last_used=last_used, **meta)
+
+    def _touch(self, entry: CacheEntry):
+        try:
+            os.utime(os.path.join(entry.dir, _META))
+        except OSError:
+            pass
+
+    def entries(self) -> List[CacheEntry]:
+        if not os.path.isdir(self.path):
+            return []
+        entries = []
+        for key in os.listdir(self.path):
+            if "." in key:
+                # Недописанные (.tmp) и недоудаленные (.del) каталоги записей
+                continue
+            entry = self._read_entry(key)
+            if entry is not None:
+                entries.append(entry)
+        return sorted(entries, key=lambda e: e.last_used, reverse=True)
+
+    def total_size(self) -> int:
+        return sum(e.size for e in self.entries())
+
+    def get(
+        self, path: str, delimiter: str, mapping: List[int], fingerprint: FileFingerprint = None
+    ) -> Optional[CacheEntry]:
+        if fingerprint is None:
+            fingerprint = FileFingerprint.of(path)
+        key = make_key(fingerprint, delimiter, mapping)
+        entry = self._read_entry(key)
+        if entry is not None:
+            self._touch(entry)
+        return entry
+
+    def find(self, path: str, delimiter: str) -> Optional[CacheEntry]:
+        """Последняя использованная запись для неизменившегося файла с любым соответствием колонок."""
+        fingerprint = FileFingerprint.of(path)
+        for entry in self.entries():
+            if entry.source != fingerprint.path or entry.delimiter != delimiter:
+                continue
+            if entry.key == make_key(fingerprint, delimiter, entry.mapping):
+                self._touch(entry)
+                return entry
+        return None
+
+    def put(
+        self,
+        fingerprint: FileFingerprint,
+        delimiter: str,
+        mapping: List[int],
+        header: List[str],
+        table: EventTable,
+    ) -> Optional[CacheEntry]:
+        """
+        Сохраняет таблицу под отпечатком, снятым до чтения файла. Если файл
+        с тех пор изменился, таблица могла быть прочитана частично из новой
+        версии - тогда ничего не сохраняется и возвращается None.
+        """
+        if FileFingerprint.of(fingerprint.path) != fingerprint:
+            return None
+        key = make_key(fingerprint, delimiter, mapping)
+        entry_dir = os.path.join(self.path, key)
+        tmp_dir = entry_dir + ".tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        size = 0
+        for name in _COLUMNS:
+            column = getattr(table, name)
+            if column is None:
+                continue
+            np.save(os.path.join(tmp_dir, name + ".npy"), np.ascontiguousarray(column))
+            size += column.nbytes
+        meta = {
+            "source": fingerprint.path,
+            "delimiter": delimiter,
+            "mapping": list(mapping),
+            "header": list(header),
+            "rows": len(table),
+            "size": size,
+        }
+        with open(os.path.join(tmp_dir, _META), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        if not self.remove(key):
+            # Запись с тем же ключом открыта - в ней те же данные, она и остается
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return self._read_entry(key)
+        os.replace(tmp_dir, entry_dir)
+        self.evict(keep=key)
+        return self._read_entry(key)
+
+    def evict(self, keep: str = None):
+        entries = self.entries()
+        total = sum(e.size for e in entries)
+        for entry in reversed(entries):
+            if total <= self.limit:
+                break
+            if entry.key == keep:
+                continue
+            if self.remove(entry.key):
+                total -= entry.size
+
+    def remove(self, key: str) -> bool:
+        """
+        Удаляет запись целиком или оставляет ее нетронутой, False - не удалось.
+
+        Под Windows файлы, открытые через mmap, не дают переименовать каталог
+        записи - тогда она остается в индексе со всеми колонками до следующего
+        раза. Переименованный каталог уже не виден как запись и удаляется.
+        """
+        entry_dir = os.path.join(self.path, key)
+        trash_dir = entry_dir + ".del"
+        shutil.rmtree(trash_dir, ignore_errors=True)
+        try:
+            os.replace(entry_dir, trash_dir)
+        except FileNotFoundError:
+            return True
+        except OSError:
+            return False
+        shutil.rmtree(trash_dir, ignore_errors=True)
+        return True
+
+    def clear(self):
+        for entry in self.entries():
+            self.remove(entry.key)
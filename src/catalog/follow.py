@@ -0,0 +1,78 @@
+import os
+from typing import List, Optional
+
+from .reader import DEFAULT_CHUNK_SIZE, RawTable, parse_rows
+from .table import EventTable
+from .timeindex import DEFAULT_TIME_FORMAT
+
+
+class CatalogFollower:
+    """
+    Слежение за дописываемым каталогом.
+
+    Помнит смещение после последней целой строки и соответствие колонок,
+    poll() читает только новые целые строки и не больше max_bytes за вызов,
+    поэтому частота опроса ограничивает и скорость добавления событий.
+    offset должен указывать на начало строки (см. line_end): недописанная
+    строка в конце файла читается целиком, когда ее допишут.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        delimiter: str,
+        mapping: List[int],
+        offset: int,
+        time_format: str = DEFAULT_TIME_FORMAT,
+        max_bytes: int = DEFAULT_CHUNK_SIZE,
+        encoding: str = "utf-8",
+    ):
+        self.path = path
+        self.delimiter = delimiter
+        self.mapping = list(mapping)
+        self.time_format = time_format
+        self.max_bytes = max_bytes
+        self.encoding = encoding
+        self.offset = offset
+        self.skip_header = False
+        self.width = max(self.mapping) + 1
+
+    def pending(self) -> bool:
+        try:
+            return os.path.getsize(self.path) != self.offset
+        except OSError:
+            return False
+
+    def poll(self) -> Optional[EventTable]:
+        """Новые события с прошлого вызова или None, если дописанных целых строк нет."""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return None
+        if size < self.offset:
+            # Файл пересоздан - читаем заново, пропуская заголовок
+            self.offset = 0
+            self.skip_header = True
+        if size == self.offset:
+            return None
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read(min(size - self.offset, self.max_bytes))
+        end = data.rfind(b"\n") + 1
+        if end == 0:
+            if len(data) == self.max_bytes:
+                # Строка длиннее окна чтения - расширяем окно, иначе застрянем на ней
+                self.max_bytes *= 2
+            return None
+        self.offset += end
+        data = data[:end]
+        rows = parse_rows(data.decode(self.encoding), self.delimiter)
+        if self.skip_header and len(rows) > 0:
+            rows = rows[1:]
+            self.skip_header = False
+        if len(rows) == 0:
+            return None
+        raw = RawTable()
+        raw.grow(self.width)
+        raw.append_rows(rows)
+        return EventTable.from_raw(raw, *self.mapping, time_format=self.time_format)
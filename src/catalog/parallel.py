@@ -0,0 +1,168 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, List, Optional, Tuple
+
+from .reader import (
+    DEFAULT_CHUNK_SIZE,
+    RawTable,
+    ReadCancelled,
+    ReadProgress,
+    read_table,
+)
+from .table import EventTable
+from .timeindex import DEFAULT_TIME_FORMAT
+
+# Файлы меньше этого размера быстрее прочитать в одном процессе, чем запускать пул
+PARALLEL_MIN_SIZE = 32 * 1024 * 1024
+
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
+
+
+def split_ranges(path: str, parts: int, size: int = None, start: int = 0) -> List[Tuple[int, int]]:
+    """
+    Делит байты файла от start (начало строки) до size на parts диапазонов,
+    каждая граница сдвигается на начало следующей строки.
+    """
+    if size is None:
+        size = os.path.getsize(path)
+    bounds = [start]
+    with open(path, "rb") as f:
+        for i in range(1, parts):
+            f.seek(max(start + (size - start) * i // parts, bounds[-1]))
+            f.readline()
+            pos = min(f.tell(), size)
+            if pos > bounds[-1]:
+                bounds.append(pos)
+    if bounds[-1] < size:
+        bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _read_range(path, start, end, delimiter, chunk_size, on_progress=None) -> RawTable:
+    return read_table(
+        path, delimiter, chunk_size, on_progress, start=start, end=end, with_header=start == 0
+    )
+
+
+def _read_events_range(
+    path, start, end, delimiter, chunk_size, mapping, time_format, on_progress=None
+):
+    """
+    Разбор и перевод в числа диапазона в процессе пула: обратно идут массивы, а не строки.
+    on_progress - только при чтении без пула, в процесс пула он не передается.
+    """
+    raw = _read_range(path, start, end, delimiter, chunk_size, on_progress)
+    raw.grow(max(mapping) + 1)
+    return EventTable.from_raw(raw, *mapping, time_format=time_format), raw.header
+
+
+def use_pool(size: int, workers: int) -> bool:
+    return workers > 1 and size >= PARALLEL_MIN_SIZE
+
+
+def _run_ranges(
+    path: str,
+    ranges: List[Tuple[int, int]],
+    task: Callable,
+    args: tuple,
+    workers: int,
+    count: Callable[[object], int],
+    on_progress: Optional[Callable[[ReadProgress], bool]],
+) -> list:
+    """
+    Выполняет task(path, start, end, *args) по диапазонам в пуле процессов,
+    результаты в порядке диапазонов. При отмене пул не ждет запущенные задачи.
+    """
+    parts = [None] * len(ranges)
+    progress = ReadProgress(total_bytes=sum(end - start for start, end in ranges))
+    started = time.perf_counter()
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = {
+            executor.submit(task, path, start, end, *args): index
+            for index, (start, end) in enumerate(ranges)
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            parts[index] = future.result()
+            start, end = ranges[index]
+            progress.bytes_read += end - start
+            progress.rows += count(parts[index])
+            progress.elapsed = time.perf_counter() - started
+            if on_progress is not None and on_progress(progress) is False:
+                raise ReadCancelled()
+    except BaseException:
+        # Без with: его выход дождался бы всех процессов и отмена бы не сработала
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown()
+    return parts
+
+
+def read_table_parallel(
+    path: str,
+    delimiter: str,
+    workers: int = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    on_progress: Optional[Callable[[ReadProgress], bool]] = None,
+) -> RawTable:
+    """
+    Разбирает один CSV в пуле процессов по диапазонам байт, выровненным на строки.
+
+    Части склеиваются в исходном порядке строк, результат совпадает с read_table.
+    """
+    workers = workers or default_workers()
+    size = os.path.getsize(path)
+    if not use_pool(size, workers):
+        return read_table(path, delimiter, chunk_size, on_progress=on_progress, end=size)
+
+    parts: List[RawTable] = _run_ranges(
+        path, split_ranges(path, workers), _read_range, (delimiter, chunk_size), workers, len, on_progress
+    )
+    table = parts[0]
+    for part in parts[1:]:
+        table.extend(part)
+    table.end = size
+    return table
+
+
+def read_events_parallel(
+    path: str,
+    delimiter: str,
+    mapping: List[int],
+    time_format: str = DEFAULT_TIME_FORMAT,
+    workers: int = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    on_progress: Optional[Callable[[ReadProgress], bool]] = None,
+    end: int = None,
+    start: int = 0,
+) -> Tuple[EventTable, List[str]]:
+    """
+    Как read_table_parallel, но каждый процесс сам переводит свой диапазон
+    в колонки EventTable: из пула возвращаются массивы numpy вместо списков
+    строк, и перевод в числа тоже идет параллельно. Возвращает таблицу и заголовок.
+
+    end - читать файл только до этого смещения (по умолчанию - до конца).
+    start - начало строки, с которого читать; если start > 0, все строки
+    считаются данными (заголовок прочитан раньше).
+    """
+    workers = workers or default_workers()
+    size = os.path.getsize(path) if end is None else end
+    if not use_pool(size - start, workers):
+        return _read_events_range(
+            path, start, size, delimiter, chunk_size, mapping, time_format, on_progress
+        )
+
+    parts = _run_ranges(
+        path,
+        split_ranges(path, workers, size, start),
+        _read_events_range,
+        (delimiter, chunk_size, mapping, time_format),
+        workers,
+        lambda part: len(part[0]),
+        on_progress,
+    )
+    return EventTable.concat([table for table, _ in parts]), parts[0][1]
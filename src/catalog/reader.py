@@ -0,0 +1,197 @@
+import csv
+import io
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, List, Optional, Tuple
+
+# Порядок соответствует списку разделителей в диалоге импорта
+DELIMITERS = [";", ",", "\t"]
+
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+FILL_VALUE = "0,0"
+FILL_HEADER = "Без названия"
+
+_repeated_tabs = re.compile(r"(\t)\1+")
+
+
+class ReadCancelled(Exception): ...
+
+
+def collapse_tabs(text: str) -> str:
+    """Схлопывает повторяющиеся табуляции в одну (выгрузки выравнивают колонки табами)."""
+    return _repeated_tabs.sub(r"\1", text)
+
+
+def parse_rows(text: str, delimiter: str) -> List[List[str]]:
+    """Разбирает текст из целых строк в непустые строки таблицы."""
+    text = collapse_tabs(text)
+    return [row for row in csv.reader(io.StringIO(text, newline=""), delimiter=delimiter) if len(row) > 0]
+
+
+@dataclass
+class ReadProgress:
+    bytes_read: int = 0
+    total_bytes: int = 0
+    rows: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def fraction(self) -> float:
+        if self.total_bytes == 0:
+            return 1.0
+        return min(self.bytes_read / self.total_bytes, 1.0)
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def mb_per_sec(self) -> float:
+        return self.bytes_read / (1024 * 1024) / self.elapsed if self.elapsed > 0 else 0.0
+
+
+@dataclass
+class RawTable:
+    """Текстовая таблица по колонкам: заголовок и список значений каждой колонки."""
+
+    header: List[str] = field(default_factory=list)
+    columns: List[List[str]] = field(default_factory=list)
+    # Смещение в файле, до которого прочитаны данные
+    end: int = 0
+
+    def __len__(self):
+        return len(self.columns[0]) if self.columns else 0
+
+    @property
+    def width(self) -> int:
+        return len(self.header)
+
+    def set_header(self, row: List[str]):
+        self.header = list(row)
+        self.columns = [[] for _ in row]
+
+    def grow(self, width: int):
+        rows = len(self)
+        while len(self.header) < width:
+            self.header.append(FILL_HEADER)
+            self.columns.append([FILL_VALUE] * rows)
+
+    def append_rows(self, rows: List[List[str]]):
+        if len(rows) == 0:
+            return
+        width = max(map(len, rows))
+        if width > self.width:
+            self.grow(width)
+        width = self.width
+        rows = [row if len(row) == width else row + [FILL_VALUE] * (width - len(row)) for row in rows]
+        for column, values in zip(self.columns, zip(*rows)):
+            column.extend(values)
+
+    def extend(self, other: "RawTable"):
+        if other.width > self.width:
+            self.grow(other.width)
+        rows = len(other)
+        for index, column in enumerate(self.columns):
+            if index < other.width:
+                column.extend(other.columns[index])
+            else:
+                column.extend([FILL_VALUE] * rows)
+
+    def row(self, index: int) -> List[str]:
+        return [column[index] for column in self.columns]
+
+
+def line_end(path: str, end: int = None) -> int:
+    """
+    Смещение сразу после последнего перевода строки в первых end байт файла.
+
+    В дописываемом файле после него может идти недописанная строка: ее
+    нельзя разбирать, пока не появится перевод строки.
+    """
+    if end is None:
+        end = os.path.getsize(path)
+    pos = end
+    with open(path, "rb") as f:
+        while pos > 0:
+            size = min(64 * 1024, pos)
+            f.seek(pos - size)
+            index = f.read(size).rfind(b"\n")
+            if index >= 0:
+                return pos - size + index + 1
+            pos -= size
+    return 0
+
+
+def iter_chunks(
+    path: str,
+    delimiter: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    encoding: str = "utf-8",
+    start: int = 0,
+    end: int = None,
+) -> Iterator[Tuple[List[List[str]], ReadProgress]]:
+    """
+    Читает CSV блоками по chunk_size байт и отдает разобранные непустые строки блока.
+
+    Блок обрезается по последнему переводу строки, остаток переносится в следующий,
+    поэтому в памяти одновременно находится не больше одного блока текста.
+    start/end ограничивают чтение диапазоном байт, start должен указывать на начало строки.
+    Поля в кавычках с переводом строки внутри не поддерживаются.
+    """
+    if end is None:
+        end = os.path.getsize(path)
+    progress = ReadProgress(total_bytes=end - start)
+    started = time.perf_counter()
+    tail = b""
+    with open(path, "rb") as f:
+        f.seek(start)
+        while True:
+            data = f.read(min(chunk_size, end - start - progress.bytes_read))
+            eof = len(data) == 0
+            progress.bytes_read += len(data)
+            data = tail + data
+            if eof:
+                tail = b""
+            else:
+                end_line = data.rfind(b"\n") + 1
+                data, tail = data[:end_line], data[end_line:]
+            if len(data) > 0:
+                rows = parse_rows(data.decode(encoding), delimiter)
+                progress.rows += len(rows)
+                progress.elapsed = time.perf_counter() - started
+                yield rows, progress
+            if eof:
+                break
+
+
+def read_table(
+    path: str,
+    delimiter: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    on_progress: Optional[Callable[[ReadProgress], bool]] = None,
+    start: int = 0,
+    end: int = None,
+    with_header: bool = True,
+) -> RawTable:
+    """
+    Потоково читает CSV в RawTable. Первая непустая строка - заголовок,
+    если with_header=False все строки считаются данными.
+
+    on_progress вызывается после каждого блока, если он вернул False - чтение
+    прерывается исключением ReadCancelled.
+    """
+    if end is None:
+        end = os.path.getsize(path)
+    table = RawTable(end=end)
+    header_read = not with_header
+    for rows, progress in iter_chunks(path, delimiter, chunk_size, start=start, end=end):
+        if not header_read and len(rows) > 0:
+            table.set_header(rows[0])
+            rows = rows[1:]
+            header_read = True
+        table.append_rows(rows)
+        if on_progress is not None and on_progress(progress) is False:
+            raise ReadCancelled()
+    return table
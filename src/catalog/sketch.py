@@ -0,0 +1,100 @@
+import math
+
+import numpy as np
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+
+
+class QuantileSketch:
+    """
+    Потоковая оценка квантилей (по схеме DDSketch): положительные значения
+    раскладываются по логарифмическим корзинам, квантиль возвращается с
+    относительной ошибкой не больше relative_accuracy. Память зависит от
+    разброса значений, а не от их числа, поэтому события можно добавлять
+    порциями по мере загрузки. Значения <= 0 учитываются как ноль.
+    """
+
+    def __init__(self, relative_accuracy=DEFAULT_RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.clear()
+
+    def clear(self):
+        self.counts = np.zeros(0, dtype=np.int64)
+        # Номер корзины counts[0]
+        self.offset = 0
+        self.zero_count = 0
+        self.count = 0
+        # Растет при каждом изменении, по нему сбрасываются кэши гистограмм
+        self.version = getattr(self, "version", 0) + 1
+
+    def __len__(self):
+        return self.count
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[np.isfinite(values)]
+        if len(values) == 0:
+            return
+        positive = values[values > 0]
+        self.zero_count += len(values) - len(positive)
+        if len(positive) > 0:
+            index = np.ceil(np.log(positive) / self.log_gamma).astype(np.int64)
+            self._grow(int(index.min()), int(index.max()))
+            self.counts += np.bincount(index - self.offset, minlength=len(self.counts))
+        self.count += len(values)
+        self.version += 1
+
+    def _grow(self, lo, hi):
+        if len(self.counts) == 0:
+            self.counts = np.zeros(hi - lo + 1, dtype=np.int64)
+            self.offset = lo
+            return
+        new_lo = min(lo, self.offset)
+        new_hi = max(hi, self.offset + len(self.counts) - 1)
+        if new_lo == self.offset and new_hi == self.offset + len(self.counts) - 1:
+            return
+        counts = np.zeros(new_hi - new_lo + 1, dtype=np.int64)
+        start = self.offset - new_lo
+        counts[start : start + len(self.counts)] = self.counts
+        self.counts = counts
+        self.offset = new_lo
+
+    def merge(self, other: "QuantileSketch"):
+        if other.gamma != self.gamma:
+            raise ValueError("Нельзя объединить оценки с разной точностью")
+        if len(other.counts) > 0:
+            self._grow(other.offset, other.offset + len(other.counts) - 1)
+            start = other.offset - self.offset
+            self.counts[start : start + len(other.counts)] += other.counts
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.version += 1
+
+    def bucket_values(self) -> np.ndarray:
+        """Представитель каждой корзины, первым идет ноль для значений <= 0."""
+        index = np.arange(self.offset, self.offset + len(self.counts), dtype=np.float64)
+        values = 2 * self.gamma**index / (self.gamma + 1)
+        return np.concatenate([[0.0], values])
+
+    def bucket_counts(self) -> np.ndarray:
+        return np.concatenate([[self.zero_count], self.counts])
+
+    def quantiles(self, qs) -> np.ndarray:
+        """Значения для долей qs из 0..1, при пустой оценке - NaN."""
+        qs = np.clip(np.asarray(qs, dtype=np.float64), 0, 1)
+        if self.count == 0:
+            return np.full(qs.shape, np.nan)
+        cumulative = np.cumsum(self.bucket_counts())
+        index = np.searchsorted(cumulative, qs * (self.count - 1), side="right")
+        values = self.bucket_values()
+        return values[np.minimum(index, len(values) - 1)]
+
+    def quantile(self, q) -> float:
+        return float(self.quantiles([q])[0])
+
+    def histogram(self, edges) -> np.ndarray:
+        """Число значений в интервалах между соседними edges (по возрастанию)."""
+        counts, _ = np.histogram(self.bucket_values(), bins=edges, weights=self.bucket_counts())
+        return counts
@@ -0,0 +1,116 @@
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from .reader import RawTable
+from .timeindex import DEFAULT_TIME_FORMAT, TimeIndex, parse_times
+
+
+def to_float64(values: Sequence[str]) -> np.ndarray:
+    """
+    Переводит колонку строк в float64 одним проходом numpy.
+
+    Десятичная запятая (1,41E+03) заменяется на точку векторно, значения,
+    которые не удалось разобрать, становятся NaN.
+    """
+    arr = np.char.replace(np.asarray(values, dtype=np.str_), ",", ".")
+    try:
+        return np.ascontiguousarray(arr.astype(np.float64))
+    except ValueError:
+        out = np.full(len(arr), np.nan, dtype=np.float64)
+        for index, value in enumerate(arr.tolist()):
+            try:
+                out[index] = float(value)
+            except ValueError:
+                pass
+        return out
+
+
+@dataclass
+class EventTable:
+    """Таблица событий по колонкам: непрерывные массивы float64 и необязательное время int64."""
+
+    x: np.ndarray
+    y: np.ndarray
+    z: np.ndarray
+    value: np.ndarray
+    time: Optional[np.ndarray] = None
+    _time_index: Optional[TimeIndex] = field(default=None, init=False, repr=False, compare=False)
+
+    def __len__(self):
+        return len(self.x)
+
+    @classmethod
+    def empty(cls, with_time=False):
+        return cls(
+            x=np.empty(0, dtype=np.float64),
+            y=np.empty(0, dtype=np.float64),
+            z=np.empty(0, dtype=np.float64),
+            value=np.empty(0, dtype=np.float64),
+            time=np.empty(0, dtype=np.int64) if with_time else None,
+        )
+
+    @classmethod
+    def from_raw(
+        cls,
+        raw: RawTable,
+        x_field,
+        y_field,
+        z_field,
+        value_field,
+        time_field=-1,
+        time_format=DEFAULT_TIME_FORMAT,
+    ):
+        return cls(
+            x=to_float64(raw.columns[x_field]),
+            y=to_float64(raw.columns[y_field]),
+            z=to_float64(raw.columns[z_field]),
+            value=to_float64(raw.columns[value_field]),
+            time=parse_times(raw.columns[time_field], time_format) if time_field >= 0 else None,
+        )
+
+    @classmethod
+    def concat(cls, tables: List["EventTable"]):
+        if len(tables) == 0:
+            return cls.empty()
+        with_time = all(t.time is not None for t in tables)
+        return cls(
+            x=np.concatenate([t.x for t in tables]),
+            y=np.concatenate([t.y for t in tables]),
+            z=np.concatenate([t.z for t in tables]),
+            value=np.concatenate([t.value for t in tables]),
+            time=np.concatenate([t.time for t in tables]) if with_time else None,
+        )
+
+    def time_index(self) -> Optional[TimeIndex]:
+        """Индекс по времени, строится при первом обращении."""
+        if self.time is None:
+            return None
+        if self._time_index is None:
+            self._time_index = TimeIndex(self.time)
+        return self._time_index
+
+    def select_time(self, start: int, end: int) -> np.ndarray:
+        """Индексы событий с start <= time < end."""
+        return self.time_index().select(start, end)
+
+    def copy(self):
+        """Копия в обычной памяти (например, для колонок, открытых из кэша через mmap)."""
+        return EventTable(
+            x=np.array(self.x),
+            y=np.array(self.y),
+            z=np.array(self.z),
+            value=np.array(self.value),
+            time=np.array(self.time) if self.time is not None else None,
+        )
+
+    def take(self, index):
+        """Выборка строк по маске или массиву индексов."""
+        return EventTable(
+            x=self.x[index],
+            y=self.y[index],
+            z=self.z[index],
+            value=self.value[index],
+            time=self.time[index] if self.time is not None else None,
+        )
@@ -0,0 +1,102 @@
+import re
+from itertools import compress
+from typing import Sequence
+
+import numpy as np
+
+DEFAULT_TIME_FORMAT = "%d.%m.%Y %H:%M"
+# Значение времени для строк, которые не удалось разобрать
+TIME_NONE = np.iinfo(np.int64).min
+
+_DIRECTIVES = ("%d", "%m", "%Y", "%y", "%H", "%M", "%S")
+_directive = re.compile(r"%[a-zA-Z]")
+_separators = re.compile(r"[^\d\n]+")
+
+
+def _fields(fmt: str):
+    fields = _directive.findall(fmt)
+    for f in fields:
+        if f not in _DIRECTIVES:
+            raise ValueError("Неподдерживаемый формат времени: %s" % f)
+    return fields
+
+
+def _to_epoch(fields, parts: np.ndarray) -> np.ndarray:
+    """
+    parts - (N, len(fields)) int64, результат - секунды от 1970-01-01.
+
+    Строки с днем, месяцем, часом, минутой или секундой вне допустимого
+    диапазона получают TIME_NONE, а не переносятся на следующий месяц или год.
+    """
+    col = {f: parts[:, i] for i, f in enumerate(fields)}
+    n = len(parts)
+    zeros = np.zeros(n, dtype=np.int64)
+    year = col.get("%Y")
+    if year is None:
+        y = col.get("%y", zeros)
+        year = np.where(y < 69, 2000 + y, 1900 + y)
+    month = col.get("%m", zeros + 1)
+    day = col.get("%d", zeros + 1)
+    hour = col.get("%H", zeros)
+    minute = col.get("%M", zeros)
+    second = col.get("%S", zeros)
+    valid = (month >= 1) & (month <= 12)
+    months = (year - 1970) * 12 + np.where(valid, month - 1, 0)
+    first = months.astype("datetime64[M]").astype("datetime64[D]").astype(np.int64)
+    month_days = (months + 1).astype("datetime64[M]").astype("datetime64[D]").astype(np.int64) - first
+    valid &= (day >= 1) & (day <= month_days)
+    valid &= (hour >= 0) & (hour < 24) & (minute >= 0) & (minute < 60) & (second >= 0) & (second < 60)
+    times = (first + day - 1) * 86400 + hour * 3600 + minute * 60 + second
+    return np.where(valid, times, TIME_NONE)
+
+
+def parse_times(values: Sequence[str], fmt: str = DEFAULT_TIME_FORMAT) -> np.ndarray:
+    """
+    Разбирает колонку дат в int64 секунды от эпохи одним проходом numpy.
+
+    Формат задается директивами strptime (%d %m %Y %y %H %M %S), все остальные
+    символы считаются разделителями, поэтому '3:06' и '03:06' разбираются одинаково.
+    Строки с другим числом полей или с полями вне диапазона (13.13.2025, 24:00)
+    получают TIME_NONE.
+    """
+    fields = _fields(fmt)
+    n = len(values)
+    times = np.full(n, TIME_NONE, dtype=np.int64)
+    if n == 0 or len(fields) == 0:
+        return times
+    lines = _separators.sub(" ", "\n".join(values)).split("\n")
+    counts = np.fromiter(map(len, map(str.split, lines)), dtype=np.int64, count=n)
+    valid = counts == len(fields)
+    if not valid.all():
+        lines = compress(lines, valid)
+    tokens = " ".join(lines).split()
+    if len(tokens) > 0:
+        parts = np.array(tokens, dtype=np.int64).reshape(-1, len(fields))
+        times[valid] = _to_epoch(fields, parts)
+    return times
+
+
+def format_time(value: int) -> str:
+    if value == TIME_NONE:
+        return ""
+    return str(np.datetime64(int(value), "s")).replace("T", " ")
+
+
+class TimeIndex:
+    """Отсортированный индекс по времени: выборка диапазона дат - два бинарных поиска."""
+
+    def __init__(self, time: np.ndarray):
+        self.order = np.argsort(time, kind="stable")
+        self.sorted = time[self.order]
+
+    def select(self, start: int, end: int) -> np.ndarray:
+        """Индексы событий с start <= time < end в порядке времени."""
+        lo = np.searchsorted(self.sorted, start, side="left")
+        hi = np.searchsorted(self.sorted, end, side="left")
+        return self.order[lo:hi]
+
+    def bounds(self):
+        valid = self.sorted[self.sorted != TIME_NONE]
+        if len(valid) == 0:
+            return None
+        return int(valid[0]), int(valid[-1])
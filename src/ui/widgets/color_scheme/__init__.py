@@ -11,6 +11,10 @@ from .color_scheme import (
     INTERPOL_MODE_FLAT_START,
     INTERPOL_MODE_FLAT_MIDDLE,
     INTERPOL_MODE_FLAT_END,
+    AXIS_LINEAR,
+    AXIS_LOG10,
+    AXIS_QUANTILE,
+    QUANTILE_POINTS,
     get_interpol_color_by_pos,
     draw_gradient
 )
\ No newline at end of file
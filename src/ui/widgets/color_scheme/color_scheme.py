@@ -2,7 +2,10 @@ import wx
 import wx.propgrid
 import dataclasses
 import json
-from typing import List
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
 
 from src.ui.widgets.ruler import RulerWidget
 
@@ -13,10 +16,58 @@ INTERPOL_MODE_FLAT_START = 3
 INTERPOL_MODE_FLAT_MIDDLE = 4
 INTERPOL_MODE_FLAT_END = 5
 
+# Шкала значений схемы: положения цветов задаются в единицах шкалы
+AXIS_LINEAR = 0
+AXIS_LOG10 = 1
+AXIS_QUANTILE = 2
+AXIS_NAMES = ["linear", "log10", "quantile"]
+
+# Число точек таблицы цветов на весь диапазон схемы
+LUT_SIZE = 4096
+# Значения меньше этого на логарифмической шкале прижимаются к нему
+LOG_FLOOR = 1.0
+# Число опорных квантилей для квантильной шкалы
+QUANTILE_POINTS = 101
+# Крайние процентили для автоматической схемы
+AUTO_PERCENTILES = (2, 98)
+# Ширина столбца гистограммы данных под градиентом, пикс
+HISTOGRAM_BIN_WIDTH = 4
+# Сколько растров градиента держать в кэше
+GRADIENT_CACHE_SIZE = 32
+# Сколько разобранных строк схем держать в кэше
+PARSE_CACHE_SIZE = 16
+
+_gradient_cache: "OrderedDict[tuple, wx.Bitmap]" = OrderedDict()
+_parse_cache: "OrderedDict[str, ColorScheme]" = OrderedDict()
+
+
+def interpol_ratio(ratio: np.ndarray, mode) -> np.ndarray:
+    if mode == INTERPOL_MODE_LINEAR:
+        return ratio
+    elif mode == INTERPOL_MODE_REVERSE:
+        return 1 - ratio
+    elif mode == INTERPOL_MODE_COSINE:
+        return (1 - np.cos(ratio * np.pi)) / 2
+    elif mode == INTERPOL_MODE_FLAT_START:
+        return np.zeros_like(ratio)
+    elif mode == INTERPOL_MODE_FLAT_MIDDLE:
+        return np.full_like(ratio, 0.5)
+    elif mode == INTERPOL_MODE_FLAT_END:
+        return np.ones_like(ratio)
+    else:
+        raise ValueError("Unknown interpolation mode")
+
 
 @dataclasses.dataclass
 class ColorScheme:
     schema: List
+    axis: int = AXIS_LINEAR
+    # Опорные значения квантилей 0..1 для квантильной шкалы, по возрастанию
+    reference: Optional[List[float]] = None
+    # Таблицы цветов по режимам интерполяции: режим -> (точки схемы, таблица)
+    _luts: dict = dataclasses.field(default_factory=dict, init=False, repr=False, compare=False)
+    # Последняя сериализация: (ключ схемы, строка)
+    _string: tuple = dataclasses.field(default=None, init=False, repr=False, compare=False)
 
     def min_pos(self):
         return min(map(lambda o: o[3], self.schema))
@@ -36,6 +87,14 @@ class ColorScheme:
     def range(self):
         return abs(self.min_pos() - self.max_pos())
 
+    def key(self):
+        """Значение, по которому кэшируется все, что зависит от содержимого схемы."""
+        return tuple(self.schema), self.axis, None if self.reference is None else tuple(self.reference)
+
+    def version(self) -> int:
+        """Хеш содержимого: меняется при любом изменении точек, шкалы или опорных квантилей."""
+        return hash(self.key())
+
     def save(self, f):
         f.write(self.to_string())
 
@@ -45,14 +104,49 @@ class ColorScheme:
         return cls.from_string(s)
 
     def to_string(self):
+        key = self.key()
+        if self._string is not None and self._string[0] == key:
+            return self._string[1]
+        self._string = (key, self._to_string())
+        return self._string[1]
+
+    def _to_string(self):
         schema = list(map(lambda o: list(o), self.schema))
-        return json.dumps(schema)
+        # Линейная схема сохраняется прежним списком, чтобы старые файлы и версии читались
+        if self.axis == AXIS_LINEAR:
+            return json.dumps(schema)
+        return json.dumps(
+            {"axis": AXIS_NAMES[self.axis], "schema": schema, "reference": self.reference}
+        )
 
     @classmethod
     def from_string(cls, json_str: str):
-        schema = json.loads(json_str)
+        data = json.loads(json_str)
+        axis = AXIS_LINEAR
+        reference = None
+        schema = data
+        if isinstance(data, dict):
+            axis = AXIS_NAMES.index(data.get("axis", AXIS_NAMES[AXIS_LINEAR]))
+            reference = data.get("reference")
+            schema = data["schema"]
         schema = list(map(lambda o: (o[0], o[1], o[2], o[3]), schema))
-        return cls(sorted(schema, key=lambda o: o[3]))
+        return cls(sorted(schema, key=lambda o: o[3]), axis, reference)
+
+    @classmethod
+    def parse_cached(cls, json_str: str) -> 'ColorScheme':
+        """
+        from_string с памятью на несколько последних строк. Возвращаемый
+        объект общий, его нельзя изменять - только читать и рисовать.
+        """
+        scheme = _parse_cache.get(json_str)
+        if scheme is not None:
+            _parse_cache.move_to_end(json_str)
+            return scheme
+        scheme = cls.from_string(json_str)
+        _parse_cache[json_str] = scheme
+        if len(_parse_cache) > PARSE_CACHE_SIZE:
+            _parse_cache.popitem(last=False)
+        return scheme
 
     @classmethod
     def from_paraview(cls, paraview_rgb_list):
@@ -84,7 +178,130 @@ class ColorScheme:
         return schema
     
     def clone(self) -> 'ColorScheme':
-        return ColorScheme(schema=self.schema)
+        return ColorScheme(schema=self.schema, axis=self.axis, reference=self.reference)
+
+    def set_reference(self, values):
+        """Опорные квантили для квантильной шкалы по массиву значений."""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[np.isfinite(values)]
+        if len(values) == 0:
+            self.reference = None
+            return
+        self.reference = np.quantile(values, np.linspace(0, 1, QUANTILE_POINTS)).tolist()
+
+    def fit(self, sketch, percentiles) -> 'ColorScheme':
+        """
+        Схема с цветами в заданных процентилях данных. sketch - объект
+        с quantiles(доли), например QuantileSketch загруженных событий.
+        Если число процентилей не совпадает с числом цветов, цвета берутся
+        из текущей схемы равномерно по ее диапазону.
+        """
+        percentiles = np.sort(np.asarray(percentiles, dtype=np.float64))
+        if len(self.schema) == len(percentiles):
+            colors = [o[:3] for o in self.schema]
+        else:
+            colors = self.map_axis(np.linspace(self.min_pos(), self.max_pos(), len(percentiles)))
+            colors = [tuple(c) for c in colors.tolist()]
+        fitted = ColorScheme([], self.axis, self.reference)
+        if self.axis == AXIS_QUANTILE:
+            fitted.reference = sketch.quantiles(np.linspace(0, 1, QUANTILE_POINTS)).tolist()
+        positions = fitted.transform(sketch.quantiles(percentiles / 100))
+        fitted.schema = [(r, g, b, p) for (r, g, b), p in zip(colors, positions.tolist())]
+        return fitted
+
+    def transform(self, values) -> np.ndarray:
+        """Значения -> единицы шкалы схемы, один проход по массиву."""
+        values = np.asarray(values, dtype=np.float64)
+        if self.axis == AXIS_LOG10:
+            return np.log10(np.maximum(values, LOG_FLOOR))
+        elif self.axis == AXIS_QUANTILE:
+            reference = self.reference
+            if reference is None:
+                # Распределение неизвестно - начало шкалы. Ранг внутри самого массива
+                # зависел бы от того, какая часть данных попала в массив
+                return np.zeros(len(values))
+            return np.interp(values, reference, np.linspace(0, 1, len(reference)))
+        return values
+
+    def inverse(self, positions) -> np.ndarray:
+        """Единицы шкалы -> значения."""
+        positions = np.asarray(positions, dtype=np.float64)
+        if self.axis == AXIS_LOG10:
+            return 10 ** positions
+        elif self.axis == AXIS_QUANTILE and self.reference is not None:
+            return np.interp(positions, np.linspace(0, 1, len(self.reference)), self.reference)
+        return positions
+
+    def with_axis(self, axis) -> 'ColorScheme':
+        """Копия схемы на другой шкале с пересчетом положений цветов."""
+        if axis == self.axis or len(self.schema) == 0:
+            return ColorScheme(list(self.schema), axis, self.reference)
+        positions = np.array([o[3] for o in self.schema], dtype=np.float64)
+        converted = ColorScheme([], axis, self.reference)
+        if axis == AXIS_QUANTILE and self.reference is None:
+            # Распределение неизвестно - положения переносятся пропорционально на 0..1
+            span = positions.max() - positions.min()
+            positions = (positions - positions.min()) / span if span > 0 else positions * 0
+        elif self.axis != AXIS_QUANTILE or self.reference is not None:
+            positions = converted.transform(self.inverse(positions))
+        # Из квантилей без опорных значений пересчитать нельзя, положения остаются
+        converted.schema = [
+            (r, g, b, p) for (r, g, b, _), p in zip(self.schema, positions.tolist())
+        ]
+        return converted
+
+    def classes(self, count, mode=INTERPOL_MODE_LINEAR):
+        """
+        Разбиение диапазона схемы на count равных классов: внутренние границы
+        (count - 1 значений) и цвета классов (r, g, b) по середине класса.
+        """
+        min_pos = self.min_pos()
+        step = (self.max_pos() - min_pos) / count
+        bounds = [min_pos + step * i for i in range(1, count)]
+        middles = min_pos + step * (np.arange(count) + 0.5)
+        return bounds, [tuple(c) for c in self.map_axis(middles, mode).tolist()]
+
+    def lut(self, mode=INTERPOL_MODE_LINEAR) -> np.ndarray:
+        """
+        Таблица (LUT_SIZE, 3) uint8 цветов, равномерно покрывающая диапазон
+        [min_pos, max_pos]. Строится один раз на режим и пересчитывается,
+        только если изменились точки схемы.
+        """
+        stops = tuple(self.schema)
+        cached = self._luts.get(mode)
+        if cached is not None and cached[0] == stops:
+            return cached[1]
+        table = np.array(stops, dtype=np.float64).reshape(-1, 4)
+        positions = np.linspace(table[0, 3], table[-1, 3], LUT_SIZE)
+        segment = np.clip(
+            np.searchsorted(table[:, 3], positions, side="left") - 1, 0, max(len(table) - 2, 0)
+        )
+        c0 = table[segment]
+        c1 = table[np.minimum(segment + 1, len(table) - 1)]
+        span = c1[:, 3] - c0[:, 3]
+        ratio = np.divide(positions - c0[:, 3], span, out=np.zeros_like(span), where=span != 0)
+        ratio = interpol_ratio(ratio, mode)[:, None]
+        lut = np.rint(c0[:, :3] + ratio * (c1[:, :3] - c0[:, :3])).astype(np.uint8)
+        self._luts[mode] = (stops, lut)
+        return lut
+
+    def map_colors(self, values, mode=INTERPOL_MODE_LINEAR) -> np.ndarray:
+        """Цвета (N, 3) uint8 для массива значений, за пределами схемы - крайние цвета."""
+        return self.map_axis(self.transform(values), mode)
+
+    def map_axis(self, values, mode=INTERPOL_MODE_LINEAR) -> np.ndarray:
+        """То же для значений, уже переведенных в единицы шкалы."""
+        values = np.asarray(values, dtype=np.float64)
+        if len(self.schema) == 0:
+            return np.zeros((len(values), 3), dtype=np.uint8)
+        lut = self.lut(mode)
+        min_pos = self.min_pos()
+        range_s = self.range()
+        if range_s == 0:
+            return np.repeat(lut[:1], len(values), axis=0)
+        index = (values - min_pos) * ((LUT_SIZE - 1) / range_s)
+        index = np.clip(np.nan_to_num(index, nan=0.0), 0, LUT_SIZE - 1)
+        return lut[np.rint(index).astype(np.intp)]
 
 
 def interpol(c0, c1, ratio):
@@ -97,91 +314,54 @@ def interpol(c0, c1, ratio):
 def get_interpol_color_by_pos(
     color_scheme: ColorScheme, pos: float, mode=INTERPOL_MODE_LINEAR
 ):
-    if len(color_scheme.schema) == 0:
-        return wx.Colour(0, 0, 0)
-
-    if pos < color_scheme.min_pos():
-        return color_scheme.schema[0].slice(0, 3)
-
-    for i in range(len(color_scheme.schema) - 1):
-        c0 = color_scheme.schema[i]
-        c1 = color_scheme.schema[i + 1]
-
-        if c0[3] <= pos <= c1[3]:
-            ratio = (pos - c0[3]) / (c1[3] - c0[3])
-            if mode == INTERPOL_MODE_LINEAR:
-                return interpol(c0, c1, ratio)
-            elif mode == INTERPOL_MODE_REVERSE:
-                return interpol(c0, c1, 1 - ratio)
-            elif mode == INTERPOL_MODE_COSINE:
-                return interpol(c0, c1, (1 - wx.math.cos(ratio * wx.math.pi)) / 2)
-            elif mode == INTERPOL_MODE_FLAT_START:
-                return c0
-            elif mode == INTERPOL_MODE_FLAT_MIDDLE:
-                return interpol(c0, c1, 0.5)
-            elif mode == INTERPOL_MODE_FLAT_END:
-                return c1
-            else:
-                raise ValueError("Unknown interpolation mode")
-
-    # Если не нашли, значит pos больше максимума
-    r, g, b = color_scheme.schema[-1][:3]
+    """Цвет одного значения через таблицу схемы, для массивов - ColorScheme.map_colors."""
+    r, g, b = color_scheme.map_colors([pos], mode)[0].tolist()
     return wx.Colour(r, g, b)
 
 
+def gradient_bitmap(scheme: ColorScheme, mode, width, height) -> wx.Bitmap:
+    """Растр градиента из буфера RGB, готовые растры хранятся в небольшом LRU-кэше."""
+    key = (scheme.key(), mode, width, height)
+    bitmap = _gradient_cache.get(key)
+    if bitmap is not None:
+        _gradient_cache.move_to_end(key)
+        return bitmap
+    if len(scheme.schema) == 0:
+        # Если схема пустая заполняем белым
+        colors = np.full((width, 3), 255, dtype=np.uint8)
+    else:
+        positions = scheme.min_pos() + np.arange(width) * (scheme.range() / width)
+        colors = scheme.map_axis(positions, mode)
+    buffer = np.ascontiguousarray(np.broadcast_to(colors[None], (height, width, 3)))
+    bitmap = wx.Bitmap.FromBuffer(width, height, buffer.tobytes())
+    _gradient_cache[key] = bitmap
+    if len(_gradient_cache) > GRADIENT_CACHE_SIZE:
+        _gradient_cache.popitem(last=False)
+    return bitmap
+
+
 def draw_gradient(
     dc: wx.DC, rect: wx.Rect, scheme: ColorScheme, mode=INTERPOL_MODE_LINEAR
 ):
     if rect.GetWidth() <= 0 or rect.GetHeight() <= 0:
         return
-    min_pos = scheme.min_pos()
-    range_s = scheme.range()
-    x = rect.GetLeft()
-    y = rect.GetTop()
-    w = rect.GetWidth()
-    h = rect.GetHeight()
-    l_ = len(scheme.schema)
-    # Вместо условия в цикле применяю функцию исходя из выбранного метода
-    if mode == INTERPOL_MODE_LINEAR:
-        fn = lambda c0, c1, ratio: interpol(c0, c1, ratio)
-    elif mode == INTERPOL_MODE_REVERSE:
-        fn = lambda c0, c1, ratio: interpol(c0, c1, 1 - ratio)
-    elif mode == INTERPOL_MODE_COSINE:
-        fn = lambda c0, c1, ratio: interpol(
-            c0, c1, (1 - wx.math.cos(ratio * wx.math.pi)) / 2
-        )
-    elif mode == INTERPOL_MODE_FLAT_START:
-        fn = lambda c0, c1, ratio: c0
-    elif mode == INTERPOL_MODE_FLAT_MIDDLE:
-        fn = lambda c0, c1, ratio: interpol(c0, c1, 0.5)
-    elif mode == INTERPOL_MODE_FLAT_END:
-        fn = lambda c0, c1, ratio: c1
-    else:
-        raise ValueError("Unknown interpolation mode")
+    bitmap = gradient_bitmap(scheme, mode, rect.GetWidth(), rect.GetHeight())
+    dc.DrawBitmap(bitmap, rect.GetLeft(), rect.GetTop())
 
-    # Если схема пустая заполняем белым
-    if l_ == 0:
-        dc.SetPen(wx.Pen(wx.Colour(255, 255, 255)))
-        dc.SetBrush(wx.Brush(wx.Colour(255, 255, 255)))
-        dc.DrawRectangle(rect)
-    # Если один цвет им из заполняем 
-    elif l_ == 1:
-        dc.SetPen(wx.Pen(wx.Colour(*scheme.schema[0][:3])))
-        dc.SetBrush(wx.Brush(wx.Colour(*scheme.schema[0][:3])))
-        dc.DrawRectangle(rect)
-    else:
-        c = 0
-        c0 = scheme.schema[0]
-        c1 = scheme.schema[1]
-        for i in range(x, x + w):
-            pos = min_pos + (i - x) * (range_s / w)
-            if not (c0[3] <= pos <= c1[3]):
-                c += 1
-                c0 = scheme.schema[c] 
-                c1 = scheme.schema[c + 1]
-            color = fn(c0[:3], c1[:3], (pos - c0[3]) / (c1[3] - c0[3]))
-            dc.SetPen(wx.Pen(color))
-            dc.DrawLine(i, y, i, y + h)
+
+def draw_histogram(dc: wx.DC, rect: wx.Rect, counts: np.ndarray):
+    """Полупрозрачные столбцы распределения данных поверх градиента."""
+    if len(counts) == 0 or counts.max() <= 0:
+        return
+    gc = wx.GraphicsContext.Create(dc)
+    gc.SetPen(wx.TRANSPARENT_PEN)
+    gc.SetBrush(wx.Brush(wx.Colour(0, 0, 0, 70)))
+    bin_width = rect.GetWidth() / len(counts)
+    heights = counts / counts.max() * rect.GetHeight() * 0.8
+    bottom = rect.GetBottom() + 1
+    for i, height in enumerate(heights.tolist()):
+        if height > 0:
+            gc.DrawRectangle(rect.GetLeft() + i * bin_width, bottom - height, bin_width, height)
 
 
 class ColorSchemePicker(wx.Panel):
@@ -191,10 +371,15 @@ class ColorSchemePicker(wx.Panel):
         value: ColorScheme,
         mode=INTERPOL_MODE_FLAT_START,
         size=wx.DefaultSize,
+        sketch=None,
     ):
         super().__init__(parent, size=size)
         self.value = value
         self.mode = mode
+        # Распределение данных для гистограммы под градиентом
+        self.sketch = sketch
+        self.histogram_key = None
+        self.histogram = None
         sz = wx.BoxSizer(wx.VERTICAL)
         self.ruler = RulerWidget(self, threshold=50)
         sz.Add(self.ruler, 0, wx.EXPAND)
@@ -361,15 +546,27 @@ class ColorSchemePicker(wx.Panel):
             else:
                 self.gradient.SetCursor(wx.Cursor(wx.CURSOR_CROSS))
 
+    def update_ruler_format(self):
+        # Линейка подписывает деления в единицах шкалы схемы
+        if self.value.axis == AXIS_LOG10:
+            self.ruler.set_label_format(lambda n: "10^%g" % round(n, 6), draw=False)
+        elif self.value.axis == AXIS_QUANTILE:
+            self.ruler.set_label_format(lambda n: "%g%%" % round(n * 100, 6), draw=False)
+        else:
+            self.ruler.set_label_format(None, draw=False)
+
     def on_size(self, event):
         width = self.GetSize().GetWidth()
+        self.update_ruler_format()
         self.ruler.set_scale(width / self.value.range(), draw=False)
         self.ruler.set_offset(-self.value.min_pos())
         self.ruler.draw()
         self.gradient.Refresh()
 
     def get_color(self, pos):
-        return get_interpol_color_by_pos(self.value, pos, self.mode)
+        # pos - положение на шкале схемы, как и у точек цветов
+        r, g, b = self.value.map_axis([pos], self.mode)[0].tolist()
+        return wx.Colour(r, g, b)
 
     def on_paint(self, event):
         dc = wx.PaintDC(self.gradient)
@@ -380,6 +577,7 @@ class ColorSchemePicker(wx.Panel):
         if width == 0 or height == 0:
             return
         draw_gradient(dc, wx.Rect(0, 0, width, height), self.value)
+        draw_histogram(dc, wx.Rect(0, 0, width, height), self.get_histogram(width))
 
         for r, g, b, p in self.value.schema:
             x = int((p - self.value.min_pos()) / self.value.range() * width)
@@ -388,17 +586,40 @@ class ColorSchemePicker(wx.Panel):
             )
             dc.DrawRectangle(int(x - 5), int(height / 2 - 5), 10, 10)
 
+        self.update_ruler_format()
         self.ruler.set_scale(width / self.value.range(), draw=False)
         self.ruler.set_offset(-self.value.min_pos())
         self.ruler.draw()
 
+    def get_histogram(self, width):
+        """Гистограмма данных по шкале схемы, пересчитывается только при изменении данных или диапазона."""
+        value = self.value
+        if self.sketch is None or len(self.sketch) == 0 or len(value.schema) < 2 or value.range() == 0:
+            return np.zeros(0)
+        if value.axis == AXIS_QUANTILE and value.reference is None:
+            return np.zeros(0)
+        key = (
+            self.sketch.version,
+            value.axis,
+            value.min_pos(),
+            value.max_pos(),
+            width,
+            None if value.reference is None else tuple(value.reference),
+        )
+        if key != self.histogram_key:
+            bins = max(1, width // HISTOGRAM_BIN_WIDTH)
+            edges = value.inverse(np.linspace(value.min_pos(), value.max_pos(), bins + 1))
+            self.histogram = self.sketch.histogram(edges)
+            self.histogram_key = key
+        return self.histogram
+
     def set_mode(self, mode):
         self.mode = mode
         self.Refresh()
 
 
 class ColorSchemeDialog(wx.Dialog):
-    def __init__(self, parent, value: ColorScheme, mode=INTERPOL_MODE_LINEAR):
+    def __init__(self, parent, value: ColorScheme, mode=INTERPOL_MODE_LINEAR, sketch=None):
         super().__init__(
             parent,
             title="Настройка цветовой схемы",
@@ -407,7 +628,8 @@ class ColorSchemeDialog(wx.Dialog):
         )
         self.mode = mode
         sz = wx.BoxSizer(wx.VERTICAL)
-        self.picker = ColorSchemePicker(self, value, mode=mode, size=wx.Size(350, 50))
+        self.picker = ColorSchemePicker(self, value, mode=mode, size=wx.Size(350, 50), sketch=sketch)
+        self.sketch = sketch
         sz.Add(self.picker, 0, wx.EXPAND | wx.BOTTOM, 10)
         btn_sz = wx.BoxSizer(wx.HORIZONTAL)
         self.btn_load = wx.Button(self, wx.ID_OPEN, "Загрузить")
@@ -415,7 +637,17 @@ class ColorSchemeDialog(wx.Dialog):
         self.btn_load.Bind(wx.EVT_BUTTON, self.on_load)
         self.btn_save.Bind(wx.EVT_BUTTON, self.on_save)
         btn_sz.Add(self.btn_load)
-        btn_sz.Add(self.btn_save, 1, wx.RIGHT, border=20)
+        btn_sz.Add(self.btn_save, 0, wx.RIGHT, border=10)
+        self.axis = wx.Choice(self, choices=["Линейная", "Логарифмическая", "Квантильная"])
+        self.axis.SetSelection(value.axis)
+        self.axis.SetToolTip("Шкала значений схемы")
+        self.axis.Bind(wx.EVT_CHOICE, self.on_axis)
+        btn_sz.Add(self.axis, 1, wx.RIGHT, border=10)
+        self.btn_auto = wx.Button(self, label="Авто")
+        self.btn_auto.SetToolTip("Расставить цвета по процентилям загруженных событий")
+        self.btn_auto.Enable(sketch is not None and len(sketch) > 0)
+        self.btn_auto.Bind(wx.EVT_BUTTON, self.on_auto)
+        btn_sz.Add(self.btn_auto, 0, wx.RIGHT, border=20)
         sz.Add(btn_sz, 0, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
         btn_sz.AddStretchSpacer()
         self.btn_cancel = wx.Button(self, label="Отменить")
@@ -431,6 +663,28 @@ class ColorSchemeDialog(wx.Dialog):
     def on_apply(self, event):
         self.EndModal(wx.ID_OK)
 
+    def on_auto(self, event):
+        count = max(2, len(self.picker.value.schema))
+        default = " ".join("%g" % p for p in np.linspace(*AUTO_PERCENTILES, count))
+        text = wx.GetTextFromUser("Процентили через пробел (0-100)", "Авто", default, self)
+        if text.strip() == "":
+            return
+        try:
+            percentiles = [float(p.replace(",", ".")) for p in text.split()]
+            if len(percentiles) < 2 or not all(0 <= p <= 100 for p in percentiles):
+                raise ValueError
+        except ValueError:
+            wx.MessageBox("Нужно не меньше двух чисел от 0 до 100", "Авто", wx.OK | wx.ICON_WARNING, self)
+            return
+        self.picker.value = self.picker.value.fit(self.sketch, percentiles)
+        self.picker.Refresh()
+        self.picker.Update()
+
+    def on_axis(self, event):
+        self.picker.value = self.picker.value.with_axis(self.axis.GetSelection())
+        self.picker.Refresh()
+        self.picker.Update()
+
     def on_cancel(self, event):
         self.EndModal(wx.ID_CANCEL)
 
@@ -466,6 +720,7 @@ class ColorSchemeDialog(wx.Dialog):
             if dlg.ShowModal() == wx.ID_OK:
                 with open(dlg.GetPath(), "r") as f:
                     self.picker.value = ColorScheme.load(f)
+                    self.axis.SetSelection(self.picker.value.axis)
                     self.picker.Refresh()
                     self.picker.Update()
 
@@ -536,9 +791,15 @@ class GradientEditor(wx.propgrid.PGEditor):
         return get_interpol_color_by_pos(scheme, value, mode)
 
     def DrawValue(self, dc, rect, property, text):
-        propvalue = ColorScheme.from_string(text)
-        stops = getattr(propvalue, "schema")
-        self.value = propvalue
+        # Живое значение свойства берется напрямую, строка разбирается только без него
+        value = property.GetValue() if property is not None else None
+        if not isinstance(value, ColorScheme):
+            value = ColorScheme.parse_cached(text)
+        self.value = value
+        self.draw_scheme(dc, rect, value)
+
+    def draw_scheme(self, dc, rect, value: ColorScheme):
+        stops = value.schema
 
         if not stops or len(stops) < 2:
             dc.SetBrush(wx.Brush(wx.WHITE))
@@ -551,7 +812,7 @@ class GradientEditor(wx.propgrid.PGEditor):
         # Рисуем градиент слева направо
         if width == 0 or height == 0:
             return
-        draw_gradient(dc, rect, self.value, self.mode)
+        draw_gradient(dc, rect, value, self.mode)
 
     def OnPaint(self, event):
         if self.value is None:
@@ -562,7 +823,7 @@ class GradientEditor(wx.propgrid.PGEditor):
         rect: wx.Rect = panel.GetClientRect()
         rect.Deflate(0, 2)
 
-        self.DrawValue(dc, rect, None, self.value.to_string())
+        self.draw_scheme(dc, rect, self.value)
 
     def OnEvent(
         self,
@@ -584,6 +845,8 @@ class GradientEditor(wx.propgrid.PGEditor):
 class ColorSchemeProperty(wx.propgrid.PGProperty):
     def __init__(self, label, name, value=None):
         super().__init__(label, name)
+        # Распределение загруженных данных для диалога схемы
+        self.sketch = None
         self.SetValue(value)
 
     def GetValueAsString(self, argFlags=0):
@@ -596,7 +859,7 @@ class ColorSchemeProperty(wx.propgrid.PGProperty):
         event: wx.Event,
     ) -> bool:
         if event.GetEventType() == wx.wxEVT_BUTTON:
-            dlg = ColorSchemeDialog(propgrid, self.GetValue().clone())
+            dlg = ColorSchemeDialog(propgrid, self.GetValue().clone(), sketch=self.sketch)
             if dlg.ShowModal() == wx.ID_OK:
                 self.SetValueInEvent(dlg.get_value())
         return True
@@ -1,6 +1,7 @@
 import wx
 import math
 from dataclasses import dataclass
+from typing import Callable, Optional
 
 
 @dataclass
@@ -16,6 +17,8 @@ class RulerConfig:
     inverted: bool = False
     exponent_threshold: float = 10000
     parts: int = 5
+    # Своя подпись делений, например для нелинейной шкалы
+    label_format: Optional[Callable[[float], str]] = None
 
 
 def next_factor(current):
@@ -46,7 +49,9 @@ def rm(v, s):
 def draw_label(
     gc: wx.GraphicsContext, config: RulerConfig, x: float, y: float, n: float
 ):
-    if abs(n) >= config.exponent_threshold:
+    if config.label_format is not None:
+        gc.DrawText(config.label_format(n), x, y)
+    elif abs(n) >= config.exponent_threshold:
         e = 0
         while abs(n) >= 10:
             n /= 10
@@ -315,6 +320,12 @@ class RulerWidget(wx.Panel):
         if draw:
             self.draw()
 
+    def set_label_format(self, label_format: Optional[Callable[[float], str]], draw=True):
+        """Sets the tick label formatter, None - plain numbers."""
+        self.config.label_format = label_format
+        if draw:
+            self.draw()
+
     def set_cursor(self, axis_value: float | None, draw=True):
         """Sets the cursor position on the ruler. in pixels."""
         self.config.cursor = axis_value
@@ -0,0 +1,87 @@
+import wx
+import wx.grid
+
+from src.catalog import EventTable, RawTable, format_time
+
+
+class PreviewTable(wx.grid.GridTableBase):
+    """
+    Виртуальная модель таблицы предпросмотра поверх RawTable.
+
+    Сетка запрашивает только видимые ячейки, а смена соответствия колонок
+    X/Y/Z/Значение/Время меняет лишь список индексов без перестроения сетки.
+    Для каталога из кэша показываются уже разобранные колонки EventTable.
+    """
+
+    LABELS = ["X", "Y", "Z", "Значение", "Время"]
+
+    def __init__(self):
+        super().__init__()
+        self.data: RawTable = RawTable()
+        self.mapping = [0, 0, 0, 0, -1]
+        self.events: EventTable = None
+
+    def GetNumberRows(self):
+        if self.events is not None:
+            return len(self.events)
+        return len(self.data)
+
+    def GetNumberCols(self):
+        return len(self.LABELS)
+
+    def IsEmptyCell(self, row, col):
+        return False
+
+    def GetValue(self, row, col):
+        if self.events is not None:
+            if col == 4:
+                return format_time(self.events.time[row]) if self.events.time is not None else ""
+            column = (self.events.x, self.events.y, self.events.z, self.events.value)[col]
+            return "%g" % column[row]
+        if self.mapping[col] < 0:
+            return ""
+        return self.data.columns[self.mapping[col]][row]
+
+    def SetValue(self, row, col, value):
+        if self.events is None and self.mapping[col] >= 0:
+            self.data.columns[self.mapping[col]][row] = value
+
+    def GetColLabelValue(self, col):
+        return self.LABELS[col]
+
+    def set_data(self, data: RawTable):
+        old_rows = self.GetNumberRows()
+        self.data = data
+        self.events = None
+        self.mapping = [0, 0, 0, 0, -1]
+        self.reset_rows(old_rows)
+
+    def set_events(self, events: EventTable):
+        old_rows = self.GetNumberRows()
+        self.events = events
+        self.reset_rows(old_rows)
+
+    def reset_rows(self, old_rows):
+        grid: wx.grid.Grid = self.GetView()
+        if grid is None:
+            return
+        new_rows = self.GetNumberRows()
+        grid.BeginBatch()
+        if new_rows < old_rows:
+            msg = wx.grid.GridTableMessage(
+                self, wx.grid.GRIDTABLE_NOTIFY_ROWS_DELETED, new_rows, old_rows - new_rows
+            )
+            grid.ProcessTableMessage(msg)
+        elif new_rows > old_rows:
+            msg = wx.grid.GridTableMessage(
+                self, wx.grid.GRIDTABLE_NOTIFY_ROWS_APPENDED, new_rows - old_rows
+            )
+            grid.ProcessTableMessage(msg)
+        grid.EndBatch()
+        grid.ForceRefresh()
+
+    def set_mapping(self, x_field, y_field, z_field, value_field, time_field=-1):
+        self.mapping = [x_field, y_field, z_field, value_field, time_field]
+        grid: wx.grid.Grid = self.GetView()
+        if grid is not None:
+            grid.ForceRefresh()
@@ -1,12 +1,32 @@
+import os
+
 import wx
 import wx.grid
 
+from src.catalog import (
+    DEFAULT_TIME_FORMAT,
+    DELIMITERS,
+    CatalogCache,
+    CatalogFollower,
+    EventTable,
+    FileFingerprint,
+    ReadCancelled,
+    deduplicate,
+    default_workers,
+    ingest_files,
+    line_end,
+    parse_times,
+    read_events_parallel,
+    read_table_parallel,
+)
+from .table import PreviewTable
+
 
 class SeismicImport(wx.Dialog):
-    def __init__(self, parent):
+    def __init__(self, parent, sources=None):
         super().__init__(
             parent,
-            size=wx.Size(350, 550),
+            size=wx.Size(350, 700),
             title="Импорт сейсмических данных",
             style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER,
         )
@@ -24,6 +44,33 @@ class SeismicImport(wx.Dialog):
         self.delimiter.SetSelection(2)
         sz_in.Add(self.delimiter, 0, wx.BOTTOM, border=5)
 
+        label = wx.StaticText(self, label="Процессов разбора")
+        sz_in.Add(label)
+        self.workers = wx.SpinCtrl(
+            self, min=1, max=default_workers(), initial=default_workers()
+        )
+        sz_in.Add(self.workers, 0, wx.BOTTOM, border=5)
+
+        self.follow = wx.CheckBox(self, label="Следить за дописыванием файла")
+        sz_in.Add(self.follow, 0, wx.BOTTOM, border=5)
+
+        self.sources = sources
+        if sources is not None:
+            self.follow.Hide()
+            label = wx.StaticText(
+                self, label="Файлов: %d, колонки выбираются по первому" % len(sources)
+            )
+            sz_in.Add(label, 0, wx.BOTTOM, border=5)
+            label = wx.StaticText(self, label="Допуск совпадения событий, м")
+            sz_in.Add(label)
+            self.tolerance = wx.SpinCtrlDouble(self, min=0, max=100, initial=0.5, inc=0.1)
+            self.tolerance.SetDigits(2)
+            sz_in.Add(self.tolerance, 0, wx.BOTTOM, border=5)
+            label = wx.StaticText(self, label="Допуск совпадения по времени, с")
+            sz_in.Add(label)
+            self.time_tolerance = wx.SpinCtrl(self, min=0, max=86400, initial=60)
+            sz_in.Add(self.time_tolerance, 0, wx.BOTTOM, border=5)
+
         line = wx.StaticLine(self)
         sz_in.Add(line, 0, wx.EXPAND | wx.BOTTOM, border=5)
 
@@ -52,12 +99,24 @@ class SeismicImport(wx.Dialog):
         sz_in.Add(label)
         self.value_choice = wx.Choice(self)
         self.value_choice.Disable()
-        sz_in.Add(self.value_choice, 0, wx.EXPAND)
+        sz_in.Add(self.value_choice, 0, wx.EXPAND | wx.BOTTOM, border=5)
+
+        label = wx.StaticText(self, label="Время")
+        sz_in.Add(label)
+        self.time_choice = wx.Choice(self)
+        self.time_choice.Disable()
+        sz_in.Add(self.time_choice, 0, wx.EXPAND | wx.BOTTOM, border=5)
+
+        label = wx.StaticText(self, label="Формат времени")
+        sz_in.Add(label)
+        self.time_format = wx.TextCtrl(self, value=DEFAULT_TIME_FORMAT)
+        sz_in.Add(self.time_format, 0, wx.EXPAND)
 
         sz.Add(sz_in, 0, wx.EXPAND | wx.ALL, border=10)
 
         self.grid = wx.grid.Grid(self)
-        self.grid.CreateGrid(0, 4)
+        self.preview = PreviewTable()
+        self.grid.SetTable(self.preview, True)
         self.grid.SetColMinimalAcceptableWidth(2)
         self.grid.SetRowMinimalAcceptableHeight(20)
         self.grid.GridLineColour = wx.SystemSettings.GetColour(
@@ -70,10 +129,6 @@ class SeismicImport(wx.Dialog):
         font.SetNativeFontInfo(info)
         self.grid.SetColLabelSize(20)
         self.grid.SetLabelFont(font)
-        self.grid.SetColLabelValue(0, "X")
-        self.grid.SetColLabelValue(1, "Y")
-        self.grid.SetColLabelValue(2, "Z")
-        self.grid.SetColLabelValue(3, "Значение")
         self.grid.SetRowLabelSize(30)
         attr = wx.grid.GridCellAttr()
         attr.SetEditor(wx.grid.GridCellTextEditor())  # редактор текста
@@ -82,36 +137,61 @@ class SeismicImport(wx.Dialog):
         self.grid.SetColAttr(1, attr)
         self.grid.SetColAttr(2, attr)
         self.grid.SetColAttr(3, attr)
+        self.grid.SetColAttr(4, attr)
         sz.Add(self.grid, 1, wx.EXPAND | wx.ALL, border=10)
 
-        sz_btn = wx.StdDialogButtonSizer()
+        self.read_info = wx.StaticText(self, label="")
+        sz.Add(self.read_info, 0, wx.EXPAND | wx.LEFT | wx.RIGHT, border=10)
+
+        sz_btn = wx.BoxSizer(wx.HORIZONTAL)
+        self.cache_info = wx.StaticText(self, label="")
+        sz_btn.Add(self.cache_info, 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, border=5)
+        self.btn_clear_cache = wx.Button(self, label="Очистить кэш")
+        sz_btn.Add(self.btn_clear_cache)
+        sz_btn.AddStretchSpacer()
         self.btn_load = wx.Button(self, label="Загрузить")
         sz_btn.Add(self.btn_load)
         self.btn_load.Disable()
-        sz.Add(sz_btn, 0, wx.ALIGN_RIGHT | wx.ALL, border=10)
+        sz.Add(sz_btn, 0, wx.EXPAND | wx.ALL, border=10)
         self.SetSizer(sz)
         self.btn_load.Bind(wx.EVT_BUTTON, self.on_load)
+        self.btn_clear_cache.Bind(wx.EVT_BUTTON, self.on_clear_cache)
         self.Layout()
 
+        self.cache = CatalogCache()
+        self.cached = None
         self.table = None
+        # Отпечаток файла на момент чтения self.table, под ним таблица попадет в кэш
+        self.source_fingerprint = None
+        self.source_end = 0
         self.x_field = -1
         self.y_field = -1
         self.z_field = -1
         self.value_field = -1
+        self.time_field = -1
         self.file.Bind(wx.EVT_FILEPICKER_CHANGED, self.on_open_file)
         self.x_choice.Bind(wx.EVT_CHOICE, self.on_choice_changed)
         self.y_choice.Bind(wx.EVT_CHOICE, self.on_choice_changed)
         self.z_choice.Bind(wx.EVT_CHOICE, self.on_choice_changed)
         self.value_choice.Bind(wx.EVT_CHOICE, self.on_choice_changed)
+        self.time_choice.Bind(wx.EVT_CHOICE, self.on_choice_changed)
+        self.update_cache_info()
+        if sources is not None:
+            self.file.SetPath(sources[0])
+            self.file.Disable()
+            wx.CallAfter(self.on_open_file, None)
 
     def update_controls_state(self):
         import os.path
 
-        exists = os.path.exists(self.file.GetPath())
+        exists = os.path.exists(self.file.GetPath()) and (
+            self.table is not None or self.cached is not None
+        )
         self.x_choice.Enable(exists)
         self.y_choice.Enable(exists)
         self.z_choice.Enable(exists)
         self.value_choice.Enable(exists)
+        self.time_choice.Enable(exists)
         self.coord_types_radio.Enable(exists)
         self.btn_load.Enable(exists)
 
@@ -120,73 +200,265 @@ class SeismicImport(wx.Dialog):
         self.y_field = self.y_choice.GetSelection()
         self.z_field = self.z_choice.GetSelection()
         self.value_field = self.value_choice.GetSelection()
+        self.time_field = self.time_choice.GetSelection() - 1
+        if (
+            self.table is None
+            and self.cached is not None
+            and self.get_cache_mapping() != self.cached.mapping
+        ):
+            # Из кэша доступны только колонки сохраненного соответствия, для другого нужен текст
+            if not self.read_file():
+                self.set_header(self.cached.header, self.cached.mapping)
+                return
         self.update_grid()
         self.update_controls_state()
 
     def update_grid(self):
-        if self.grid.GetNumberRows() > 0:
-            self.grid.DeleteRows(0, self.grid.GetNumberRows())
-        data = self.table[1:]
-        for index, row in enumerate(data):
-            self.grid.AppendRows(1)
-            self.grid.SetCellValue(index, 0, data[index][self.x_field])
-            self.grid.SetCellValue(index, 1, data[index][self.y_field])
-            self.grid.SetCellValue(index, 2, data[index][self.z_field])
-            self.grid.SetCellValue(index, 3, data[index][self.value_field])
+        if self.table is not None:
+            self.preview.set_mapping(
+                self.x_field, self.y_field, self.z_field, self.value_field, self.time_field
+            )
 
-    def on_open_file(self, event):
-        import csv
-        import re
-
-        data = []
-        with open(self.file.GetPath(), newline="", encoding="utf-8") as f:
-            rows = []
-            for row in f:
-                rows.append(re.sub(r"(\t)\1+", r"\1", row))
-            rowslen = []
-            delimiter = [";", ",", "\t"].__getitem__(self.delimiter.GetSelection())
-            for row in csv.reader(rows, delimiter=delimiter):
-                if len(row) == 0:
-                    continue
-                rowslen.append(len(list(row)))
-                data.append(list(row))
-            max_rows_len = max(rowslen)
-            for index in range(1, len(data)):
-                data[index].extend(["0,0"] * (max_rows_len - len(data[index])))
-            data[0].extend(["Без названия"] * (max_rows_len - len(data[0])))
-        self.table = data
-        header = data[0]
+    def get_delimiter(self):
+        return DELIMITERS[self.delimiter.GetSelection()]
+
+    def get_mapping(self):
+        return [self.x_field, self.y_field, self.z_field, self.value_field, self.time_field]
+
+    def get_time_format(self):
+        return self.time_format.GetValue()
+
+    def get_cache_mapping(self):
+        return self.get_mapping() + [self.get_time_format()]
+
+    def set_header(self, header, mapping):
         self.x_choice.Clear()
         self.y_choice.Clear()
         self.z_choice.Clear()
         self.value_choice.Clear()
+        self.time_choice.Clear()
         self.x_choice.AppendItems(header)
         self.y_choice.AppendItems(header)
         self.z_choice.AppendItems(header)
         self.value_choice.AppendItems(header)
-        self.x_choice.SetSelection(0)
-        self.y_choice.SetSelection(1 if len(header) > 1 else 0)
-        self.z_choice.SetSelection(2 if len(header) > 1 else 0)
-        self.value_choice.SetSelection(3 if len(header) > 1 else 0)
+        self.time_choice.AppendItems(["Нет"] + header)
+        self.x_choice.SetSelection(mapping[0])
+        self.y_choice.SetSelection(mapping[1])
+        self.z_choice.SetSelection(mapping[2])
+        self.value_choice.SetSelection(mapping[3])
+        self.time_choice.SetSelection((mapping[4] if len(mapping) > 4 else -1) + 1)
+        if len(mapping) > 5:
+            self.time_format.SetValue(mapping[5])
         self.on_choice_changed()
-        self.update_grid()
-        self.update_controls_state()
+
+    def on_open_file(self, event):
+        self.table = None
+        self.cached = self.cache.find(self.file.GetPath(), self.get_delimiter())
+        if self.cached is not None:
+            self.source_end = os.path.getsize(self.file.GetPath())
+            self.preview.set_events(self.cached.load())
+            self.read_info.SetLabel("Загружено из кэша: %d строк" % self.cached.rows)
+            self.set_header(self.cached.header, self.cached.mapping)
+            return
+        if not self.read_file():
+            return
+        header = self.table.header
+        self.set_header(
+            header,
+            [
+                0,
+                1 if len(header) > 1 else 0,
+                2 if len(header) > 1 else 0,
+                3 if len(header) > 1 else 0,
+                self.guess_time_field(header),
+            ],
+        )
+
+    def guess_time_field(self, header):
+        for index, name in enumerate(header):
+            if "time" in name.lower() or "время" in name.lower():
+                return index
+        return -1
+
+    def read_file(self):
+        dlg = wx.ProgressDialog(
+            "Импорт сейсмических данных",
+            "Чтение файла...",
+            maximum=1000,
+            parent=self,
+            style=wx.PD_APP_MODAL | wx.PD_AUTO_HIDE | wx.PD_CAN_ABORT | wx.PD_ELAPSED_TIME,
+        )
+
+        def on_progress(progress):
+            cont, _ = dlg.Update(
+                int(progress.fraction * 1000),
+                "Прочитано строк: %d (%.0f строк/с, %.1f МБ/с)"
+                % (progress.rows, progress.rows_per_sec, progress.mb_per_sec),
+            )
+            self.read_info.SetLabel(
+                "%d строк, %.0f строк/с, %.1f МБ/с, процессов: %d"
+                % (
+                    progress.rows,
+                    progress.rows_per_sec,
+                    progress.mb_per_sec,
+                    self.workers.GetValue(),
+                )
+            )
+            return cont
+
+        try:
+            fingerprint = FileFingerprint.of(self.file.GetPath())
+            data = read_table_parallel(
+                self.file.GetPath(),
+                self.get_delimiter(),
+                workers=self.workers.GetValue(),
+                on_progress=on_progress,
+            )
+        except ReadCancelled:
+            self.read_info.SetLabel("Чтение прервано")
+            return False
+        finally:
+            dlg.Destroy()
+        if data.width == 0:
+            self.read_info.SetLabel("Файл пуст")
+            return False
+        self.table = data
+        self.source_fingerprint = fingerprint
+        self.source_end = data.end
+        self.preview.set_data(data)
+        return True
 
     def on_load(self, event):
+        try:
+            parse_times([], self.get_time_format())
+        except ValueError as e:
+            wx.MessageBox(str(e), "Формат времени", wx.OK | wx.ICON_ERROR, self)
+            return
         self.EndModal(wx.ID_OK)
 
-    def get_table(self):
-        data = []
-        for row in self.table[1:]:
-            data.append(
-                [
-                    row[self.x_field].replace(",", "."),
-                    row[self.y_field].replace(",", "."),
-                    row[self.z_field].replace(",", "."),
-                    row[self.value_field].replace(",", "."),
-                ]
+    def update_cache_info(self):
+        self.cache_info.SetLabel(
+            "Кэш: %.1f МБ" % (self.cache.total_size() / (1024 * 1024))
+        )
+
+    def on_clear_cache(self, event):
+        self.cache.clear()
+        self.update_cache_info()
+
+    def get_table(self) -> EventTable:
+        return self.get_loader()()[0]
+
+    def get_loader(self):
+        """
+        Функция загрузки событий по выбранным в диалоге параметрам:
+        load(on_progress=None) -> (EventTable, число отброшенных повторов).
+
+        Не обращается к элементам окна, поэтому ее можно вызывать из рабочего потока.
+        on_progress(доля, текст) возвращает False, чтобы прервать загрузку (ReadCancelled).
+        """
+        if self.sources is not None:
+            return self.get_batch_loader()
+        path = self.file.GetPath()
+        delimiter = self.get_delimiter()
+        mapping = self.get_mapping()
+        cache_mapping = self.get_cache_mapping()
+        time_format = self.get_time_format()
+        workers = self.workers.GetValue()
+        cache = self.cache
+        raw = self.table
+        raw_fingerprint = self.source_fingerprint
+        # При слежении загружаются только целые строки, недописанную прочитает follower
+        follow_end = self.get_follow_end() if self.is_follow() else None
+
+        def load(on_progress=None):
+            fingerprint = FileFingerprint.of(path)
+            if follow_end is None or follow_end == fingerprint.size:
+                entry = cache.get(path, delimiter, cache_mapping, fingerprint)
+                if entry is not None:
+                    return entry.load(), 0
+            end = follow_end
+            start = 0
+            if raw is not None:
+                # Таблица прочитана в диалоге, в кэш - под отпечатком того момента
+                fingerprint = raw_fingerprint
+                if end is None:
+                    end = raw.end
+                if raw.end <= end:
+                    start = raw.end
+            if end is None:
+                end = fingerprint.size
+            tables, header = [], []
+            if start > 0:
+                # Колонки диалога не разбираются повторно, читается только хвост
+                tables.append(EventTable.from_raw(raw, *mapping, time_format=time_format))
+                header = raw.header
+            if start < end:
+                # Строки в числа переводят процессы пула, а не этот поток
+                tail, tail_header = read_events_parallel(
+                    path,
+                    delimiter,
+                    mapping,
+                    time_format,
+                    workers=workers,
+                    on_progress=lambda p: on_progress is None
+                    or on_progress(p.fraction, "Чтение файла: %d строк" % p.rows),
+                    end=end,
+                    start=start,
+                )
+                tables.append(tail)
+                if start == 0:
+                    header = tail_header
+            table = EventTable.concat(tables)
+            if end == fingerprint.size:
+                try:
+                    cache.put(fingerprint, delimiter, cache_mapping, header, table)
+                except OSError:
+                    pass
+            return table, 0
+
+        return load
+
+    def is_follow(self):
+        return self.sources is None and self.follow.GetValue()
+
+    def get_follow_end(self) -> int:
+        """Конец последней целой строки прочитанной части файла: с него начинает follower."""
+        return line_end(self.file.GetPath(), self.source_end)
+
+    def get_follower(self) -> CatalogFollower:
+        return CatalogFollower(
+            self.file.GetPath(),
+            self.get_delimiter(),
+            self.get_mapping(),
+            self.get_follow_end(),
+            time_format=self.get_time_format(),
+        )
+
+    def get_batch_loader(self):
+        sources = self.sources
+        delimiter = self.get_delimiter()
+        mapping = self.get_mapping()
+        time_format = self.get_time_format()
+        workers = self.workers.GetValue()
+        cache_path = self.cache.path
+        tolerance = self.tolerance.GetValue()
+        time_tolerance = self.time_tolerance.GetValue()
+
+        def load(on_progress=None):
+            table = ingest_files(
+                sources,
+                delimiter,
+                mapping,
+                time_format=time_format,
+                workers=workers,
+                cache_path=cache_path,
+                on_progress=lambda done, total: on_progress is None
+                or on_progress(done / total, "Прочитано файлов: %d из %d" % (done, total)),
             )
-        return data
+            # Число повторов уходит в результат: поле диалога из потока импорта писать нельзя
+            return deduplicate(table, tolerance, time_tolerance)
+
+        return load
 
     def get_coord_system(self):
         if self.coord_types_radio.GetSelection() == 0:
@@ -0,0 +1,186 @@
+import math
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+from .render import PRIM_COUNT
+from .spatial import cell_key
+
+# Сторона ячейки нижнего уровня иерархии, единицы чертежа
+BASE_CELL_SIZE = 1.0
+# Уровней иерархии, сторона ячейки уровня - BASE_CELL_SIZE * 2**level
+LEVELS = 24
+# Меньше стольких событий в ячейке скопление не образуется
+MIN_COUNT = 5
+
+
+@dataclass(eq=False)
+class GridLevel:
+    """Непустые ячейки уровня по возрастанию ключа cell_key(cx, cy) и суммы по ним."""
+
+    cx: np.ndarray
+    cy: np.ndarray
+    keys: np.ndarray
+    count: np.ndarray
+    energy: np.ndarray
+    sx: np.ndarray
+    sy: np.ndarray
+    # Сколько первых событий коллекции учтено
+    covered: int = 0
+
+    @classmethod
+    def aggregate(cls, cx, cy, count, energy, sx, sy, covered=0) -> "GridLevel":
+        keys = cell_key(cx, cy)
+        keys, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        size = len(keys)
+        return cls(
+            cx[first],
+            cy[first],
+            keys,
+            np.bincount(inverse, weights=count, minlength=size).astype(np.int64),
+            np.bincount(inverse, weights=energy, minlength=size),
+            np.bincount(inverse, weights=sx, minlength=size),
+            np.bincount(inverse, weights=sy, minlength=size),
+            covered,
+        )
+
+    @classmethod
+    def from_points(cls, x, y, energy, size, covered=0) -> "GridLevel":
+        finite = np.isfinite(x) & np.isfinite(y)
+        x, y = x[finite], y[finite]
+        energy = np.nan_to_num(energy[finite])
+        cx = np.floor(x / size).astype(np.int64)
+        cy = np.floor(y / size).astype(np.int64)
+        return cls.aggregate(cx, cy, np.ones(len(x)), energy, x, y, covered)
+
+    def parent(self) -> "GridLevel":
+        """Следующий уровень: ячейки вдвое крупнее, собираются из ячеек этого."""
+        return self.aggregate(
+            self.cx >> 1, self.cy >> 1, self.count, self.energy, self.sx, self.sy, self.covered
+        )
+
+    def merge(self, other: "GridLevel") -> "GridLevel":
+        return self.aggregate(
+            np.concatenate([self.cx, other.cx]),
+            np.concatenate([self.cy, other.cy]),
+            np.concatenate([self.count, other.count]),
+            np.concatenate([self.energy, other.energy]),
+            np.concatenate([self.sx, other.sx]),
+            np.concatenate([self.sy, other.sy]),
+            other.covered,
+        )
+
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.cx, self.cy, self.keys, self.count, self.energy, self.sx, self.sy))
+
+    def select(self, kx0, ky0, kx1, ky1, min_count=MIN_COUNT) -> np.ndarray:
+        """Номера ячеек прямоугольника, в которых не меньше min_count событий."""
+        # Ключи упорядочены по cx, поэтому полоса cx - один отрезок массива
+        lo = np.searchsorted(self.keys, cell_key(kx0, 0))
+        hi = np.searchsorted(self.keys, cell_key(kx1 + 1, 0))
+        index = np.arange(lo, hi)
+        cy = self.cy[index]
+        return index[(cy >= ky0) & (cy <= ky1) & (self.count[index] >= min_count)]
+
+    def lookup(self, cx, cy) -> np.ndarray:
+        """Номер ячейки для каждой пары (cx, cy), -1 если ячейка пуста."""
+        keys = cell_key(cx, cy)
+        if len(self.keys) == 0:
+            return np.full(len(keys), -1, dtype=np.int64)
+        index = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        return np.where(self.keys[index] == keys, index, -1)
+
+
+class ClusterGrid:
+    """
+    Многоуровневая сетка для группировки плотных скоплений событий.
+    Уровни строятся один раз снизу вверх, каждый из предыдущего за
+    O(число ячеек). Дописанные после этого события досчитываются только
+    в запрошенный уровень, при первом обращении к нему.
+    """
+
+    def __init__(self, base=BASE_CELL_SIZE, depth=LEVELS):
+        self.base = base
+        self.levels: List[Optional[GridLevel]] = [None] * depth
+
+    def cell_size(self, level) -> float:
+        return self.base * 2**level
+
+    def choose_level(self, world_per_pixel, pixels) -> int:
+        """Уровень, ячейка которого на экране не меньше pixels; -1 - события различимы и так."""
+        if pixels <= 0 or world_per_pixel <= 0:
+            return -1
+        level = math.ceil(math.log2(pixels * world_per_pixel / self.base))
+        if level < 0:
+            return -1
+        return min(level, len(self.levels) - 1)
+
+    def build(self, x, y, energy):
+        level = GridLevel.from_points(x, y, energy, self.base, len(x))
+        for i in range(len(self.levels)):
+            self.levels[i] = level
+            level = level.parent()
+
+    def nbytes(self) -> int:
+        return sum(level.nbytes() for level in self.levels if level is not None)
+
+    def level(self, index, x, y, energy) -> GridLevel:
+        """Уровень index с учетом всех len(x) событий коллекции."""
+        if self.levels[0] is None:
+            self.build(x, y, energy)
+        level = self.levels[index]
+        start = level.covered
+        if start < len(x):
+            added = GridLevel.from_points(
+                x[start:], y[start:], energy[start:], self.cell_size(index), len(x)
+            )
+            level = self.levels[index] = level.merge(added)
+        return level
+
+    def members(self, index, x, y, min_count=MIN_COUNT) -> np.ndarray:
+        """Маска событий с координатами x, y, попавших в скопления уровня index."""
+        size = self.cell_size(index)
+        level = self.levels[index]
+        cx = np.floor(x / size).astype(np.int64)
+        cy = np.floor(y / size).astype(np.int64)
+        cells = level.lookup(cx, cy)
+        inside = cells >= 0
+        inside[inside] = level.count[cells[inside]] >= min_count
+        return inside
+
+
+@dataclass
+class ShownClusters:
+    """Символы скоплений коллекции, переданные отрисовке."""
+
+    level: int = -1
+    keys: np.ndarray = None
+    count: np.ndarray = None
+    energy: np.ndarray = None
+    # Центры символов и длины подписей для расстановки подписей
+    x: np.ndarray = None
+    y: np.ndarray = None
+    lengths: np.ndarray = None
+    # Показана ли подпись скопления
+    labeled: np.ndarray = None
+    handles: np.ndarray = None
+
+    def __post_init__(self):
+        if self.keys is None:
+            self.clear()
+
+    def nbytes(self) -> int:
+        arrays = (self.keys, self.count, self.energy, self.x, self.y, self.lengths, self.labeled, self.handles)
+        return sum(a.nbytes for a in arrays)
+
+    def clear(self):
+        self.level = -1
+        self.keys = np.empty(0, dtype=np.int64)
+        self.count = np.empty(0, dtype=np.int64)
+        self.energy = np.empty(0, dtype=np.float64)
+        self.x = np.empty(0, dtype=np.float64)
+        self.y = np.empty(0, dtype=np.float64)
+        self.lengths = np.empty(0, dtype=np.int32)
+        self.labeled = np.empty(0, dtype=bool)
+        self.handles = np.empty((0, PRIM_COUNT), dtype=np.int64)
@@ -0,0 +1,138 @@
+import threading
+import time
+from typing import Callable
+
+import wx
+
+from src.catalog import ReadCancelled
+from .timings import PhaseTimings
+
+# Сколько событий отдается в окно за один раз
+CHUNK_SIZE = 2000
+# Пауза между порциями, чтобы окно успевало обрабатывать ввод, с
+CHUNK_INTERVAL = 0.02
+
+
+class ImportJob(threading.Thread):
+    """
+    Фоновый импорт: чтение и подготовка геометрии идут в потоке, а порции
+    событий передаются в PlotWidget через wx.CallAfter. Следующая порция
+    готовится только после того, как окно добавило предыдущую.
+
+    load(on_progress) возвращает (EventTable, число отброшенных повторов).
+    Чем бы ни закончился импорт, finish вызывается в потоке окна ровно один раз.
+    """
+
+    def __init__(
+        self,
+        plot,
+        statusbar,
+        load: Callable,
+        on_done: Callable = None,
+        chunk_size=CHUNK_SIZE,
+    ):
+        super().__init__(daemon=True)
+        self.plot = plot
+        self.statusbar = statusbar
+        self.load = load
+        self.on_done = on_done
+        self.chunk_size = chunk_size
+        self.collection = None
+        self.loaded = 0
+        self.total = 0
+        self.duplicates = 0
+        self.error = None
+        self.timings = PhaseTimings()
+        self.cancelled = threading.Event()
+        self.applied = threading.Event()
+
+    def cancel(self):
+        self.cancelled.set()
+        self.applied.set()
+
+    def on_load_progress(self, fraction, text):
+        wx.CallAfter(self.statusbar.set_progress, fraction, text)
+        return not self.cancelled.is_set()
+
+    def run(self):
+        try:
+            self.run_import()
+        except ReadCancelled:
+            pass
+        except Exception as e:
+            self.error = e
+        finally:
+            wx.CallAfter(self.finish)
+
+    def run_import(self):
+        with self.timings.measure("parse"):
+            table, self.duplicates = self.load(self.on_load_progress)
+        self.total = len(table)
+        self.applied.clear()
+        wx.CallAfter(self.create_collection, table.time is not None)
+        self.applied.wait()
+        for start in range(0, self.total, self.chunk_size):
+            if self.cancelled.is_set():
+                break
+            prepared = self.plot.prepare_events(table.take(slice(start, start + self.chunk_size)))
+            self.applied.clear()
+            wx.CallAfter(self.apply, prepared)
+            self.applied.wait()
+            time.sleep(CHUNK_INTERVAL)
+
+    def fail(self, error):
+        """Ошибка в потоке окна: поток импорта останавливается, как при отмене."""
+        if self.error is None:
+            self.error = error
+        self.cancelled.set()
+
+    def create_collection(self, with_time):
+        try:
+            if not self.cancelled.is_set():
+                self.collection = self.plot.create_collection(with_time=with_time)
+        except Exception as e:
+            self.fail(e)
+        finally:
+            self.applied.set()
+
+    def apply(self, prepared):
+        try:
+            if not self.cancelled.is_set():
+                first = self.loaded == 0
+                self.plot.append_prepared(self.collection, prepared)
+                self.timings.merge(prepared.timings)
+                self.loaded += len(prepared.table)
+                self.statusbar.set_progress(
+                    self.loaded / self.total,
+                    "Отрисовка событий: %d из %d" % (self.loaded, self.total),
+                )
+                if first:
+                    self.plot.zoom_to_bb()
+        except Exception as e:
+            self.fail(e)
+        finally:
+            self.applied.set()
+
+    def finish(self):
+        text = "Загружено событий: %d (%s)" % (self.loaded, self.timings)
+        if self.error is not None:
+            text = "Ошибка импорта: %s" % self.error
+        elif self.cancelled.is_set() and self.collection is not None:
+            keep = wx.MessageBox(
+                "Импорт прерван, загружено %d из %d событий. Оставить загруженные события?"
+                % (self.loaded, self.total),
+                "Импорт",
+                wx.YES_NO | wx.ICON_QUESTION,
+            )
+            if keep != wx.YES:
+                self.plot.remove_collection(self.collection)
+                self.collection = None
+                text = "Импорт отменен"
+        elif self.cancelled.is_set():
+            text = "Импорт отменен"
+        if self.collection is not None:
+            self.plot.refresh_quantile_colors()
+            self.plot.zoom_to_bb()
+        self.statusbar.finish_progress(text)
+        if self.on_done is not None:
+            self.on_done(self)
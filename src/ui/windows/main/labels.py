@@ -0,0 +1,61 @@
+import numpy as np
+
+from .render import LABEL_HEIGHT, LABEL_MIN_PIXELS, LABEL_OFFSET
+
+# Ширина символа подписи в долях ее высоты
+CHAR_WIDTH = 0.6
+
+
+def label_lengths(labels) -> np.ndarray:
+    return np.fromiter((len(label) for label in labels), dtype=np.int32, count=len(labels))
+
+
+def place_labels(x, y, priority, lengths, scale) -> np.ndarray:
+    """
+    Расстановка подписей без перекрытий: маска подписей, которые показываются.
+
+    x, y - точки событий в единицах чертежа, scale - пикс на единицу.
+    Прямоугольники подписей переводятся в экранные ячейки со стороной
+    в высоту подписи; подписи ставятся по убыванию priority, ячейки
+    поставленных помечаются занятыми, подпись, задевающая занятую
+    ячейку, скрывается. В каждой ячейке привязки претендует только
+    самое сильное событие, так что проход ограничен числом ячеек
+    экрана, а не числом видимых событий.
+    """
+    placed = np.zeros(len(x), dtype=bool)
+    cell = LABEL_HEIGHT * scale
+    # Экранная ось y направлена вниз, подпись начинается под событием
+    px = x * scale / cell
+    py = -y * scale / cell + LABEL_OFFSET / LABEL_HEIGHT
+    index = np.flatnonzero(np.isfinite(px) & np.isfinite(py))
+    if len(index) == 0 or cell < LABEL_MIN_PIXELS:
+        return placed
+    left = np.floor(px[index]).astype(np.int64)
+    top = np.floor(py[index]).astype(np.int64)
+    # Ширина подписи в ячейках сверх первой, высота - всегда две строки ячеек
+    span = np.floor(px[index] + lengths[index] * CHAR_WIDTH).astype(np.int64) - left
+    left -= left.min()
+    top -= top.min()
+    # Номер ячейки - одно целое: столбец * stride + строка
+    stride = int(top.max()) + 2
+    anchor = left * stride + top
+    # Самое сильное событие каждой ячейки привязки, без сортировки всех событий
+    priority = np.nan_to_num(np.asarray(priority, dtype=np.float64)[index], nan=-np.inf)
+    by_cell = np.argsort(anchor)
+    sorted_anchor = anchor[by_cell]
+    starts = np.flatnonzero(np.r_[True, sorted_anchor[1:] != sorted_anchor[:-1]])
+    group = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, len(by_cell)]))
+    best = np.flatnonzero(priority[by_cell] == np.maximum.reduceat(priority[by_cell], starts)[group])
+    best = best[np.r_[True, group[best][1:] != group[best][:-1]]]
+    candidates = by_cell[best]
+    candidates = candidates[np.argsort(-priority[candidates], kind="stable")]
+    offsets = [(dx * stride, dx * stride + 1) for dx in range(int(span[candidates].max()) + 1)]
+    occupied = set()
+    for i, base, width in zip(candidates.tolist(), anchor[candidates].tolist(), span[candidates].tolist()):
+        if base in occupied:
+            continue
+        cells = [base + offset for pair in offsets[: width + 1] for offset in pair]
+        if occupied.isdisjoint(cells):
+            occupied.update(cells)
+            placed[index[i]] = True
+    return placed
@@ -1,17 +1,21 @@
 import wx
 import wx.lib.agw.flatnotebook
-import lib.litecad as lc
-import ctypes as ct
-import ctypes.wintypes as wt
 
+from src.catalog import CatalogFollower, expand_sources
 from src.ui.windows.import_seismic_data import SeismicImport
 from .plot import PlotWidget
-from .menu import MainMenu
+from .menu import MainMenu, ID_OPEN_FOLDER, ID_STOP_FOLLOW
 from .toolbar import MainToolbar
-from .statusbar import MainStatubar
+from .statusbar import MainStatubar, EVT_STATUS_CANCEL
+from .import_job import ImportJob
+from .repaint import RepaintScheduler
 from .properties import Properties, EVT_PROPS_CLOSE, EVT_PROPS_CHANGED
 
 
+# Период опроса дописываемых файлов, мс
+FOLLOW_INTERVAL = 1000
+
+
 class MainWindow(wx.Frame):
     def __init__(self):
         super().__init__(None, title="Карта сейсмических событий", size=wx.Size(800, 600))
@@ -28,16 +32,28 @@ class MainWindow(wx.Frame):
         self.plot = PlotWidget(self.sw)
         self.properties = Properties(self.sw)
         self.plot.apply_color_scheme(self.properties.pg.GetPropertyValue("levels"))
+        self.properties.set_sketch(self.plot.sketch)
+        self.properties.set_points_only_scale(self.plot.points_only_scale)
+        self.properties.set_cluster_pixels(self.plot.cluster_pixels)
+        self.repaint_scheduler = RepaintScheduler(self.plot)
+        # Схема и число классов, для которых последний раз запрошены цвета
+        self.requested_colors = self.color_key()
         self.sw.SplitVertically(self.plot, self.properties, 300)
         sz.Add(self.sw, 1, wx.EXPAND)
         self.SetSizer(sz)
         self.Layout()
-        self.InitLiteCad_DLL()
+        self.followers = []
+        self.job = None
+        self.follow_timer = wx.Timer(self)
         self.bind_all()
         self.Show()
 
     def bind_all(self):
         self.menu.Bind(wx.EVT_MENU, self.on_open, id=wx.ID_OPEN)
+        self.menu.Bind(wx.EVT_MENU, self.on_open_folder, id=ID_OPEN_FOLDER)
+        self.menu.Bind(wx.EVT_MENU, self.on_stop_follow, id=ID_STOP_FOLLOW)
+        self.Bind(wx.EVT_TIMER, self.on_follow_timer, self.follow_timer)
+        self.statusbar.Bind(EVT_STATUS_CANCEL, self.on_cancel_import)
         self.menu.Bind(wx.EVT_MENU, self.on_undo, id=wx.ID_UNDO)
         self.menu.Bind(wx.EVT_MENU, self.on_redo, id=wx.ID_REDO)
         self.toolbar.Bind(wx.EVT_TOOL, self.on_open, id=wx.ID_OPEN)
@@ -50,46 +66,29 @@ class MainWindow(wx.Frame):
         self.properties.Bind(EVT_PROPS_CHANGED, self.on_props_changed)
         self.Bind(wx.EVT_CLOSE, self.on_close)
 
-        CMPFUNC = ct.CFUNCTYPE(None, wt.HANDLE)  # Регистрация процедуры событий
-        self.LcEventProc = CMPFUNC(self.LcEventProc)  # Регистрация процедуры событий
-        lc.lcEventSetProc(lc.LC_EVENT_MOUSEMOVE, self.LcEventProc, 0, self.LcEventProc)
-        lc.lcEventSetProc(lc.LC_EVENT_WNDVIEW, self.LcEventProc, 0, self.LcEventProc)
+    def color_key(self):
+        """То, от чего зависят цвета событий: содержимое схемы и число классов."""
+        return self.properties.get_color_scheme().key(), self.properties.get_color_classes()
 
     def on_props_changed(self, event):
-        self.plot.apply_color_scheme(self.properties.get_color_scheme())
+        self.plot.set_points_only_scale(self.properties.get_points_only_scale())
+        self.plot.set_cluster_pixels(self.properties.get_cluster_pixels())
+        # Масштаб и скопления только перерисовывают, перекраска - при смене цветов
+        key = self.color_key()
+        if key != self.requested_colors:
+            self.requested_colors = key
+            self.repaint_scheduler.request(
+                self.properties.get_color_scheme(), self.properties.get_color_classes()
+            )
 
     def on_props_close(self, event):
         self.sw.Unsplit(self.properties)
 
-    def InitLiteCad_DLL(self):
-        lc.lcPropPutStr(
-            0, lc.LC_PROP_G_REGCODE, "cdda-e9ce-9eb7-1d89"
-        )  # Серийник от библиотеки
-        # lc.lcPropPutStr( 0, lc.LC_PROP_G_RULERBMP, "C:\Serg\sigmaview\icon.bmp")
-        lc.lcPropPutBool(0, lc.LC_PROP_G_PANREDQUAL, True)
-        print("Version:", lc.lcPropGetStr(0, lc.LC_PROP_G_VERSION))
-        print("Directory:", lc.lcPropGetStr(0, lc.LC_PROP_G_DIRDLL))
-        self.lc_job = lc.lcInitialize()  # Инициализация CAD'a)
-        print("Инициализация CADa lc_job=", self.lc_job)
-        print(lc.lcPropPutBool(0, lc.LC_PROP_SEL_PICKADD, True))
-        # Настройка цветов и режимов выделения примитивов
-        lc.lcPropPutBool(0, lc.LC_PROP_SEL_GRIPNUM, False)  # Отключаем нумирацию точек
-        lc.lcPropPutBool(
-            0, lc.LC_PROP_SEL_HATCHFILL, False
-        )  # Отключаем штриховку замкнутых областей
-        lc.lcPropPutInt(
-            0, lc.LC_PROP_SEL_GRIPCOLORF, 0
-        )  # Цвет точек на римитивах - черный
-        lc.lcPropPutInt(
-            0, lc.LC_PROP_SEL_COLORF, lc.lcColorRGB(255, 255, 255)
-        )  # Цвет заливки выбранной области - белый
-
-    def LcEventProc(self, action):
-        return self.plot.on_lc_event(
-            lc.lcPropGetInt(action, lc.LC_PROP_EVENT_TYPE), action
-        )
-    
     def on_close(self, event):
+        self.follow_timer.Stop()
+        self.repaint_scheduler.cancel()
+        if self.job is not None:
+            self.job.cancel()
         event.Skip()
 
     def on_undo(self, event):
@@ -107,7 +106,79 @@ class MainWindow(wx.Frame):
     def on_zoom_out(self, event):
         self.plot.zoom_out()
 
+    def start_import(self, load, on_done=None):
+        self.job = ImportJob(self.plot, self.statusbar, load, on_done=on_done)
+        self.statusbar.start_progress("Чтение данных...")
+        self.job.start()
+
+    def on_import_done(self, job):
+        self.job = None
+
+    def on_cancel_import(self, event):
+        if self.job is not None:
+            self.job.cancel()
+
+    def can_import(self):
+        if self.job is not None:
+            wx.MessageBox("Дождитесь окончания текущего импорта", "Импорт", wx.OK | wx.ICON_WARNING, self)
+            return False
+        return True
+
     def on_open(self, event):
+        if not self.can_import():
+            return
         dlg = SeismicImport(self)
         if dlg.ShowModal() == wx.ID_OK:
-            self.plot.add_events(dlg.get_table(), dlg.get_coord_system())
+            follower = dlg.get_follower() if dlg.is_follow() else None
+
+            def on_done(job):
+                self.on_import_done(job)
+                if follower is not None and job.collection is not None:
+                    self.follow(follower, job.collection)
+
+            self.start_import(dlg.get_loader(), on_done)
+
+    def follow(self, follower: CatalogFollower, collection):
+        self.followers.append((follower, collection))
+        self.menu.Enable(ID_STOP_FOLLOW, True)
+        if not self.follow_timer.IsRunning():
+            self.follow_timer.Start(FOLLOW_INTERVAL)
+
+    def on_follow_timer(self, event):
+        # За один тик от каждого файла добавляется не больше одной порции событий
+        for follower, collection in self.followers:
+            table = follower.poll()
+            if table is not None:
+                self.plot.append_events(collection, table)
+
+    def on_stop_follow(self, event):
+        self.follow_timer.Stop()
+        self.followers = []
+        self.menu.Enable(ID_STOP_FOLLOW, False)
+
+    def on_open_folder(self, event):
+        if not self.can_import():
+            return
+        with wx.DirDialog(self, "Папка с каталогами") as dlg:
+            if dlg.ShowModal() != wx.ID_OK:
+                return
+            folder = dlg.GetPath()
+        pattern = wx.GetTextFromUser("Маска файлов", "Открыть папку", "*.csv", self)
+        if pattern == "":
+            return
+        sources = expand_sources(folder, pattern)
+        if len(sources) == 0:
+            wx.MessageBox("Файлы не найдены", "Открыть папку", wx.OK | wx.ICON_WARNING, self)
+            return
+        dlg = SeismicImport(self, sources=sources)
+        if dlg.ShowModal() == wx.ID_OK:
+
+            def on_done(job):
+                self.on_import_done(job)
+                if job.error is None and not job.cancelled.is_set():
+                    self.statusbar.SetStatusText(
+                        "Загружено событий: %d, повторов отброшено: %d"
+                        % (job.loaded, job.duplicates)
+                    )
+
+            self.start_import(dlg.get_loader(), on_done)
@@ -2,12 +2,19 @@ import wx
 
 from src.ui.icon import get_icon
 
+ID_OPEN_FOLDER = wx.NewIdRef()
+ID_STOP_FOLLOW = wx.NewIdRef()
+
 class MainMenu(wx.MenuBar):
     def __init__(self):
         super().__init__()
         m = wx.Menu()
         item = m.Append(wx.ID_OPEN, "&Открыть\tCtrl+O", "Открыть файл")
         item.SetBitmap(get_icon("folder-open"))
+        item = m.Append(ID_OPEN_FOLDER, "Открыть &папку...\tCtrl+Shift+O", "Загрузить все каталоги из папки")
+        item.SetBitmap(get_icon("folder-open"))
+        item = m.Append(ID_STOP_FOLLOW, "Остановить слежение за файлами", "Больше не догружать дописанные события")
+        item.Enable(False)
         item = m.Append(wx.ID_SAVE, "&Сохранить\tCtrl+S", "Сохранить файл")
         item.SetBitmap(get_icon("save"))
         item.Enable(False)
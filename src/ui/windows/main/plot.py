@@ -1,38 +1,73 @@
 import wx
-import lib.litecad as lc
-import ctypes
-import ctypes.wintypes as wt
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import List
+import math
 import time
+import numpy as np
 
-from src.ui.widgets.color_scheme import ColorScheme, get_interpol_color_by_pos
+from src.catalog import EventTable, QuantileSketch, format_time
+from src.ui.widgets.color_scheme import AXIS_QUANTILE, QUANTILE_POINTS, ColorScheme
 from src.ui.widgets.ruler import RulerWidget
+from .render import PRIM_COUNT, PRIM_SYMBOL, PRIM_TEXT, RenderBackend, create_backend
+from .labels import label_lengths, place_labels
+from .scene import EventsCollection
+from .timings import PhaseTimings
+
+# Радиус поиска события под курсором, пикс
+HOVER_PIXELS = 6
+# Мельче этого масштаба (пикс на единицу чертежа) рисуются только точки событий
+POINTS_ONLY_SCALE = 0.25
+# Запас вокруг окна при отборе видимых событий под подписи, пикс
+VIEW_MARGIN_PIXELS = 64
+# Сторона экранной ячейки, события в которой собираются в скопление, пикс; 0 - без скоплений
+CLUSTER_PIXELS = 32
+
+
+def n2text(n):
+    n_text = ""
+    if n < 100:
+        return str(n)
+    else:
+        e = 0
+        while n >= 10:
+            n /= 10
+            e += 1
+        n_text = f"{n:.2f}".rstrip("0").rstrip(".") + f"x10^{e}"
+    return str(n_text)
 
 
 @dataclass
-class Event:
-    x: float
-    y: float
-    z: float
-    energy: float
-    primitives: List[wt.HANDLE]
-
-
-@dataclass
-class EventsCollection:
-    lc_layer_handle: wt.HANDLE
-    events: List[Event]
+class PreparedEvents:
+    table: EventTable
+    radius: np.ndarray
+    colors: np.ndarray
+    labels: List[str]
+    timings: PhaseTimings = field(default_factory=PhaseTimings)
 
 
 class PlotWidget(wx.Panel):
     def __init__(self, parent):
         super().__init__(parent)
-        self.lc_drw = None
-        self.lc_wnd = None
         self.color_scheme = None
+        # Число цветовых классов, 0 - непрерывная раскраска
+        self.color_classes = 0
+        self.class_groups = []
+        self.class_bounds = np.empty(0, dtype=np.float64)
+        self.class_colors = None
+        # Сколько событий учтено в опорных квантилях схемы
+        self.reference_count = 0
+        # Распределение энергий всех коллекций, пополняется при добавлении событий
+        self.sketch = QuantileSketch()
         self.objects = []
         self.ruler_update_time = time.time()
+        # Событие под курсором: (коллекция, номер) или None
+        self.hovered = None
+        self.points_only_scale = POINTS_ONLY_SCALE
+        self.points_only = False
+        self.cluster_pixels = CLUSTER_PIXELS
+        self.view_pending = False
+        # Добавлены примитивы: update_view перерисует, даже если отбор ничего не изменил
+        self.redraw_pending = False
         sz = wx.FlexGridSizer(2, 2, 0, 0)
         sz.AddGrowableCol(1)
         sz.AddGrowableRow(1)
@@ -40,7 +75,10 @@ class PlotWidget(wx.Panel):
         deputy.SetBackgroundColour(wx.Colour(255, 255, 255))
         self.hz_ruler = RulerWidget(self, parts=10)
         self.vt_ruler = RulerWidget(self, orientation=wx.VERTICAL, invert=True, parts=10)
-        self.canvas = wx.Panel(self)
+        self.backend: RenderBackend = create_backend(self)
+        self.backend.on_view_changed = self.on_view_changed
+        self.backend.on_mouse_move = self.on_mouse_move
+        self.canvas = self.backend.window
         sz.Add(deputy)
         sz.Add(self.hz_ruler, 1, wx.EXPAND)
         sz.Add(self.vt_ruler, 1, wx.EXPAND)
@@ -48,8 +86,222 @@ class PlotWidget(wx.Panel):
         self.SetSizer(sz)
         self.Layout()
 
-        self.canvas.Bind(wx.EVT_SIZE, self.on_canvas_size)
-        self.init_litecad(self.canvas)
+    def on_view_changed(self):
+        self.update_rulers()
+        self.schedule_view_update()
+
+    def schedule_view_update(self, redraw=False):
+        """
+        Отбор видимых событий и подписи - один раз за тик окна после серии
+        событий масштаба и панорамы или добавленных порций событий.
+        """
+        self.redraw_pending |= redraw
+        if not self.view_pending:
+            self.view_pending = True
+            wx.CallAfter(self.update_view)
+
+    def view_rect(self):
+        """Видимая область чертежа (x0, y0, x1, y1) или None, пока у окна нет размера."""
+        width, height = self.canvas.GetSize().Get()
+        if width == 0 or height == 0:
+            return None
+        x0, y0 = self.backend.window_to_world(0, 0)
+        x1, y1 = self.backend.window_to_world(width, height)
+        return min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)
+
+    def set_points_only_scale(self, scale: float):
+        if scale != self.points_only_scale:
+            self.points_only_scale = scale
+            self.update_view()
+
+    def set_cluster_pixels(self, pixels: int):
+        if pixels != self.cluster_pixels:
+            self.cluster_pixels = pixels
+            self.update_view()
+
+    def update_view(self):
+        self.view_pending = False
+        redraw = self.redraw_pending
+        self.redraw_pending = False
+        if self.refresh_view() or redraw:
+            self.backend.redraw()
+
+    def refresh_view(self) -> bool:
+        """
+        Уровень детализации по масштабу, отбор событий по видимой области
+        и расстановка подписей: показываются только примитивы событий внутри
+        окна, отрисовке передаются лишь изменения относительно прошлого
+        отбора. True, если что-то изменилось.
+        """
+        rect = self.view_rect()
+        if rect is None:
+            return False
+        world_per_pixel = self.world_per_pixel()
+        if world_per_pixel <= 0:
+            return False
+        changed = self.set_points_only(1 / world_per_pixel < self.points_only_scale)
+        for collection in self.collections():
+            changed |= self.cull(collection, rect, world_per_pixel)
+        changed |= self.update_labels(1 / world_per_pixel)
+        return changed
+
+    def set_points_only(self, points_only: bool) -> bool:
+        """Подписи в режиме только точек скрывает update_labels."""
+        if points_only == self.points_only:
+            return False
+        self.points_only = points_only
+        self.backend.set_points_only(points_only)
+        return True
+
+    def cull(self, collection: EventsCollection, rect, world_per_pixel) -> bool:
+        margin = collection.reach + VIEW_MARGIN_PIXELS * world_per_pixel
+        x0, y0, x1, y1 = rect
+        rect = (x0 - margin, y0 - margin, x1 + margin, y1 + margin)
+        visible = collection.index.query_rect(*rect, collection.x, collection.y)
+        level = collection.clusters.choose_level(world_per_pixel, self.cluster_pixels)
+        if level >= 0:
+            # События, собранные в скопления, вместо своих символов показываются символом скопления
+            collection.clusters.level(level, collection.x, collection.y, collection.energy)
+            visible = visible[~collection.clusters.members(level, collection.x[visible], collection.y[visible])]
+        clusters_changed = self.update_clusters(collection, rect, level)
+        shown = np.setdiff1d(visible, collection.visible, assume_unique=True)
+        hidden = np.setdiff1d(collection.visible, visible, assume_unique=True)
+        collection.visible = visible
+        # Здесь только символы, подписи видимых событий расставляет update_labels
+        primitives = collection.primitives
+        if len(hidden) > 0:
+            self.backend.set_visible(primitives[hidden, PRIM_SYMBOL], False)
+        if len(shown) > 0:
+            self.backend.set_visible(primitives[shown, PRIM_SYMBOL], True)
+        return clusters_changed or len(shown) > 0 or len(hidden) > 0
+
+    def update_labels(self, scale) -> bool:
+        """
+        Подписи видимых событий и скоплений всех коллекций без перекрытий,
+        сильные события первыми (см. labels.place_labels). Показываются
+        и скрываются только подписи, чье состояние изменилось.
+        """
+        sources = []
+        for collection in self.collections():
+            visible = collection.visible
+            sources.append(
+                (collection, False, collection.x[visible], collection.y[visible],
+                 collection.energy[visible], collection.label_lengths[visible])
+            )
+            shown = collection.shown_clusters
+            if len(shown.keys) > 0:
+                sources.append((collection, True, shown.x, shown.y, shown.energy, shown.lengths))
+        if len(sources) == 0:
+            return False
+        if self.points_only:
+            placed = np.zeros(sum(len(source[2]) for source in sources), dtype=bool)
+        else:
+            placed = place_labels(*(np.concatenate([source[i] for source in sources]) for i in range(2, 6)), scale)
+        changed = False
+        start = 0
+        for collection, clusters, x, *_ in sources:
+            part = placed[start : start + len(x)]
+            start += len(x)
+            if clusters:
+                shown = collection.shown_clusters
+                flipped = part != shown.labeled
+                if flipped.any():
+                    self.backend.set_visible(shown.handles[flipped & part, PRIM_TEXT], True)
+                    self.backend.set_visible(shown.handles[flipped & ~part, PRIM_TEXT], False)
+                    shown.labeled = part
+                    changed = True
+                continue
+            labeled = collection.visible[part]
+            added = np.setdiff1d(labeled, collection.labeled, assume_unique=True)
+            removed = np.setdiff1d(collection.labeled, labeled, assume_unique=True)
+            collection.labeled = labeled
+            if len(added) > 0:
+                self.backend.set_visible(collection.primitives[added, PRIM_TEXT], True)
+            if len(removed) > 0:
+                self.backend.set_visible(collection.primitives[removed, PRIM_TEXT], False)
+            changed |= len(added) > 0 or len(removed) > 0
+        return changed
+
+    def update_clusters(self, collection: EventsCollection, rect, level) -> bool:
+        """
+        Символы скоплений уровня level внутри rect. При том же уровне
+        остаются символы ячеек, число событий в которых не изменилось,
+        остальные удаляются и создаются заново.
+        """
+        shown = collection.shown_clusters
+        if level < 0:
+            if len(shown.keys) == 0:
+                return False
+            self.backend.remove(shown.handles)
+            shown.clear()
+            return True
+        grid = collection.clusters
+        cells = grid.levels[level]
+        size = grid.cell_size(level)
+        x0, y0, x1, y1 = rect
+        index = cells.select(
+            math.floor(x0 / size), math.floor(y0 / size), math.floor(x1 / size), math.floor(y1 / size)
+        )
+        keys = cells.keys[index]
+        kept = np.zeros(len(index), dtype=bool)
+        keep = np.zeros(len(shown.keys), dtype=bool)
+        if shown.level == level and len(shown.keys) > 0:
+            pos = np.minimum(np.searchsorted(shown.keys, keys), len(shown.keys) - 1)
+            kept = (shown.keys[pos] == keys) & (shown.count[pos] == cells.count[index])
+            keep[pos[kept]] = True
+        added = index[~kept]
+        if len(added) == 0 and keep.all():
+            shown.level = level
+            return False
+        self.backend.remove(shown.handles[~keep])
+        x = cells.sx[added] / cells.count[added]
+        y = cells.sy[added] / cells.count[added]
+        labels = [
+            "%d: %s" % (c, n2text(e)) for c, e in zip(cells.count[added].tolist(), cells.energy[added].tolist())
+        ]
+        if len(added) > 0:
+            handles = self.add_clusters(collection, x, y, cells.energy[added], labels)
+        else:
+            handles = np.empty((0, PRIM_COUNT), dtype=np.int64)
+        keys = np.concatenate([shown.keys[keep], cells.keys[added]])
+        order = np.argsort(keys, kind="stable")
+        shown.level = level
+        shown.keys = keys[order]
+        shown.count = np.concatenate([shown.count[keep], cells.count[added]])[order]
+        shown.energy = np.concatenate([shown.energy[keep], cells.energy[added]])[order]
+        shown.x = np.concatenate([shown.x[keep], x])[order]
+        shown.y = np.concatenate([shown.y[keep], y])[order]
+        shown.lengths = np.concatenate([shown.lengths[keep], label_lengths(labels)])[order]
+        # Подписи новых символов видимы, пока их не скроет update_labels
+        shown.labeled = np.concatenate([shown.labeled[keep], np.ones(len(added), dtype=bool)])[order]
+        shown.handles = np.concatenate([shown.handles[keep], handles])[order]
+        return True
+
+    def add_clusters(self, collection: EventsCollection, x, y, energy, labels):
+        """Символы скоплений в центрах масс ячеек, подпись - число событий и суммарная энергия."""
+        if collection.cluster_layer is None:
+            collection.cluster_layer = self.backend.create_layer("Скопления")
+        return self.backend.add_symbols(
+            collection.cluster_layer, x, y, self.event_radius(energy), self.cluster_colors(energy), labels
+        )
+
+    def cluster_colors(self, energy) -> np.ndarray:
+        """
+        Цвет скопления по суммарной энергии: цвет класса в режиме классов, иначе по схеме.
+        На квантильной шкале - по тем же опорным квантилям, что и события: они
+        обновляются в update_reference, после чего скопления перекрашивает paint_clusters.
+        """
+        if self.color_classes > 0 and self.class_colors is not None:
+            classes = np.searchsorted(self.class_bounds, self.color_scheme.transform(energy), side="right")
+            return self.class_colors[classes]
+        return self.map_colors(self.color_scheme, energy)
+
+    def paint_clusters(self):
+        for collection in self.collections():
+            shown = collection.shown_clusters
+            if len(shown.keys) > 0:
+                colors = self.cluster_colors(shown.energy)
+                self.backend.set_colors(shown.handles.ravel(), np.repeat(colors, PRIM_COUNT, axis=0))
 
     def update_rulers(self):
         #Временный(скорей всего) костыль, чтобы не тормозило панаромирование чертежа. Нужно найти более элегантное решение
@@ -57,83 +309,56 @@ class PlotWidget(wx.Panel):
         #обновить линейку по окончании процедуры панаромирования а так же не подвешивать постоянной её перерисовкой
         t = time.time()
         if (time.time() - self.ruler_update_time) >=(1 / 60):
-            x0 = ctypes.c_double()
-            y0 = ctypes.c_double()
-            x1 = ctypes.c_double()
-            y1 = ctypes.c_double()
-            width, height = self.GetSize().Get()
+            width, height = self.canvas.GetSize().Get()
             if width == 0 or height == 0:
                 return
-            lc.lcCoordWndToDrw(self.lc_wnd, 0, 0, ctypes.pointer(x0), ctypes.pointer(y0))
-            lc.lcCoordWndToDrw(self.lc_wnd, width, height, ctypes.pointer(x1), ctypes.pointer(y1))
-            width, height = self.GetSize().Get()
-            self.hz_ruler.set_offset(-x0.value, False)
-            self.hz_ruler.set_scale(width / abs(x1.value - x0.value), False)
-            self.vt_ruler.set_offset(-y1.value, False)
-            self.vt_ruler.set_scale(height / (y0.value - y1.value), False)
+            x0, y0 = self.backend.window_to_world(0, 0)
+            x1, y1 = self.backend.window_to_world(width, height)
+            if x0 == x1 or y0 == y1:
+                return
+            self.hz_ruler.set_offset(-x0, False)
+            self.hz_ruler.set_scale(width / abs(x1 - x0), False)
+            self.vt_ruler.set_offset(-y1, False)
+            self.vt_ruler.set_scale(height / (y0 - y1), False)
             self.vt_ruler.draw()
             self.hz_ruler.draw()
             self.ruler_update_time = t
 
-    def on_canvas_size(self, event):
-        rc = lc.lcWndResize(
-            self.lc_wnd, 0, 0, event.GetSize().GetWidth(), event.GetSize().GetHeight()
-        )
-        if rc == 0:
-            raise Exception(lc.lcGetErrorStr())
-        event.Skip()
-        self.update_rulers()
-
-    def init_litecad(self, panel):
-        w, h = panel.Size  # Размеры рабочего поля 2D
-        lc_wnd = lc.lcCreateWindow(
-            panel.GetHandle(), lc.LC_WS_DEFAULT
-        )  # ^lc.LC_WS_RULERS #Sozdanie okna s privyazkoy k okny interfeisa
-        print("Инициализация окна CADa lc_wnd=", lc_wnd)
-        lc.lcWndResize(lc_wnd, 0, 0, w, h)  #
-        lc.lcPropPutBool(lc_wnd, lc.LC_PROP_WND_SELECT, True)
-        # On/Off vydelenye mysh'y
-        lc.lcPropPutBool(lc_wnd, lc.LC_PROP_WND_GRIDSHOW, True)
-        # On/Off setka na fone
-        lc_drw = lc.lcCreateDrawing()  # Sozdanie objecta otrisovki
-        print("Инициализация изображения CAD" "a lc_drw=", lc_drw)
-        lc.lcPropPutInt(
-            lc_drw, lc.LC_PROP_DRW_COLORBACKP, 255 * 65536 + 255 * 256 + 255
-        )
-        lc.lcPropPutInt(
-            lc_drw, lc.LC_PROP_DRW_COLORBACKM, 255 * 65536 + 255 * 256 + 255
-        )  # Cvet zadnego fona B*65535_G*256_R
-        lc.lcPropPutInt(
-            lc_wnd, lc.LC_PROP_WND_GRIDCOLOR, 252 * 65536 + 86 * 256 + 97
-        )  # Cvet GRID'a B*65535_G*256_R
-        hBlock = lc.lcPropGetHandle(lc_drw, lc.LC_PROP_DRW_BLOCK_MODEL)
-        lc.lcPropPutBool(lc_wnd, lc.LC_PROP_WND_DRAWPAPER, False)
-        print("Инициализация блока CAD" "a hBlock=", hBlock)
-        lc.lcWndSetBlock(lc_wnd, hBlock)
-        # Vybrat' block kotoriy bydet otobrajat'sya v okne
-        lc.lcBlockUpdate(hBlock, True, 0)
-        # Obnovlyaet block i vse objekty
-        lc.lcWndExeCommand(lc_wnd, lc.LC_CMD_ZOOM_EXT, 0)
-        # Vypolnyaet comandy 'Priblizit' k ob'ekty otrisovki'
-        lc.lcWndSetFocus(lc_wnd)
-        # Delaet aktivnym dlya klaviatury okino
-        lc.lcPropPutBool(lc_wnd, lc.LC_PROP_WND_STDBLKFRAME, False)
-        # On/Off Ramka blocka
-        lc.lcPropPutBool(
-            lc_drw, lc.LC_PROP_DRW_LOCKSEL, True
-        )  # On/Off Select locked elements
-        lc.lcPropPutFloat(lc_wnd, lc.LC_PROP_WND_GRIDDX, 10.0)
-        lc.lcPropPutFloat(lc_wnd, lc.LC_PROP_WND_GRIDDY, 10.0)
-        lc.lcPropPutBool(lc_wnd, lc.LC_PROP_WND_GRIDDOTTED, True)
-        # lc.lcPropPutBool( lc_wnd, lc.LC_PROP_WND_RULERS, True) #Отображение линейки LiteCAD'a
-        self.text_style = lc.lcDrwAddTextStyle(self.lc_drw, "ArialStyle", "Arial", True)
-        self.lc_wnd = lc_wnd
-        self.lc_drw = lc_drw
-
-    def on_lc_event(self, EventType, action):
-        if EventType == lc.LC_EVENT_WNDVIEW:
-            self.update_rulers()
-        return 0
+    def on_mouse_move(self, x, y):
+        found = self.event_at(x, y)
+        if found == self.hovered:
+            return
+        self.hovered = found
+        if found is None:
+            self.canvas.UnsetToolTip()
+            return
+        self.canvas.SetToolTip(self.event_tooltip(*found))
+
+    def world_per_pixel(self) -> float:
+        x0, y0 = self.backend.window_to_world(0, 0)
+        x1, y1 = self.backend.window_to_world(1, 1)
+        return max(abs(x1 - x0), abs(y1 - y0))
+
+    def event_at(self, x, y):
+        """Ближайшее к точке чертежа событие в пределах HOVER_PIXELS: (коллекция, номер) или None."""
+        radius = HOVER_PIXELS * self.world_per_pixel()
+        found = None
+        for collection in self.collections():
+            index, dist = collection.nearest(x, y, radius)
+            if index >= 0:
+                found = (collection, index)
+                radius = dist
+        return found
+
+    @staticmethod
+    def event_tooltip(collection: EventsCollection, index) -> str:
+        table = collection.table
+        lines = []
+        if table.time is not None:
+            lines.append("Время: %s" % format_time(table.time[index]))
+        lines.append("Энергия: %s" % n2text(float(table.value[index])))
+        lines.append("Глубина: %g" % float(table.z[index]))
+        return "\n".join(lines)
 
     def save(self, path):
         pass
@@ -142,16 +367,16 @@ class PlotWidget(wx.Panel):
         return False
 
     def can_undo(self):
-        return True
+        return self.backend.can_undo()
 
     def undo(self):
-        lc.lcWndExeCommand(self.lc_wnd, lc.LC_CMD_UNDO, 0)
+        self.backend.undo()
 
     def can_redo(self):
-        return True
+        return self.backend.can_redo()
 
     def redo(self):
-        lc.lcWndExeCommand(self.lc_wnd, lc.LC_CMD_REDO, 0)
+        self.backend.redo()
 
     def can_copy(self):
         return True
@@ -172,89 +397,209 @@ class PlotWidget(wx.Panel):
         pass
 
     def zoom_in(self):
-        lc.lcWndExeCommand(self.lc_wnd, lc.LC_CMD_ZOOM_IN, 0)
+        self.backend.zoom_in()
 
     def zoom_out(self):
-        lc.lcWndExeCommand(self.lc_wnd, lc.LC_CMD_ZOOM_OUT, 0)
+        self.backend.zoom_out()
 
     def zoom_to_bb(self):
-        lc.lcWndExeCommand(self.lc_wnd, lc.LC_CMD_ZOOM_EXT, 0)
+        self.backend.zoom_extents()
 
-    def add_events(self, table, coord_system):
-        def n2text(n):
-            n_text = ""
-            if n < 100:
-                return str(n)
-            else:
-                e = 0
-                while n >= 10:
-                    n /= 10
-                    e += 1
-                n_text = f"{n:.2f}".rstrip("0").rstrip(".") + f"x10^{e}"
-            return str(n_text)
-
-        import math
-
-        hBlock = lc.lcPropGetHandle(self.lc_wnd, lc.LC_PROP_WND_BLOCK)
-        LayerLineType = lc.lcDrwGetObjectByName(
-            self.lc_drw, lc.LC_OBJ_LINETYPE, "CONTINUOUS"
-        )
-        Layer = lc.lcDrwAddLayer(self.lc_drw, "Контуры", "0,0,0", LayerLineType, 0)
-        lc.lcPropPutInt(Layer, lc.LC_PROP_LAYER_COLORI, 255)
-        lc.lcPropPutBool(Layer, lc.LC_PROP_LAYER_LOCKED, True)
-        lc.lcPropPutBool(Layer, lc.LC_PROP_LAYER_VISIBLE, True)
-        collection = EventsCollection(Layer, [])
-        for event in table:
-            x = float(event[0])
-            y = float(event[1])
-            z = float(event[2])
-            energy = float(event[3])
-            if self.color_scheme is not None:
-                r, g, b, a = get_interpol_color_by_pos(self.color_scheme, energy).Get()
-                color = "%d,%d,%d" % (r, g, b)
-            else:
-                color = "0,0,0"
-            radius = 5 * math.log(energy)
-            p = lc.lcBlockAddCircle(hBlock, x, y, 5 * math.log(energy), False)
-            hLineType = lc.lcDrwGetObjectByName(
-                self.lc_drw, lc.LC_OBJ_LINETYPE, "CONTINUOUS"
-            )
-            lc.lcPropPutHandle(p, lc.LC_PROP_ENT_LINETYPE, hLineType)
-            lc.lcPropPutStr(p, lc.LC_PROP_ENT_COLOR, color)
-            lc.lcPropPutFloat(p, lc.LC_PROP_ENT_LTSCALE, 1.0)
-            lc.lcPropPutHandle(p, lc.LC_PROP_ENT_LAYER, Layer)
-            t = lc.lcBlockAddTextWin2(
-                hBlock, n2text(energy), x, y - 8, 0, 16.0, 1.0, 0, 0
-            )
-            lc.lcPropPutStr(t, lc.LC_PROP_ENT_COLOR, color)
-            lc.lcPropPutHandle(t, lc.LC_PROP_TEXT_STYLE, self.text_style)
-            lc.lcPropPutHandle(t, lc.LC_PROP_ENT_LAYER, Layer)
-            point = lc.lcBlockAddPoint(hBlock, x, y)
-            lc.lcPropPutStr(point, lc.LC_PROP_ENT_COLOR, color)
-            lc.lcPropPutHandle(point, lc.LC_PROP_ENT_LAYER, Layer)
-            collection.events.append(Event(x, y, z, energy, [p, t, point]))
+    def create_collection(self, with_time=False) -> EventsCollection:
+        layer = self.backend.create_layer("Контуры")
+        collection = EventsCollection(layer, with_time=with_time)
         self.objects.append(collection)
-        lc.lcBlockUpdate(hBlock, True, 0)
-
-        lc.lcWndExeCommand(self.lc_wnd, lc.LC_CMD_ZOOM_EXT, 0)
+        return collection
+
+    def remove_collection(self, collection: EventsCollection):
+        if len(collection) > 0:
+            self.backend.remove(collection.handles())
+        self.backend.delete_layer(collection.layer)
+        if collection.cluster_layer is not None:
+            self.backend.remove(collection.shown_clusters.handles)
+            self.backend.delete_layer(collection.cluster_layer)
+        self.objects.remove(collection)
+        if self.hovered is not None and self.hovered[0] is collection:
+            self.hovered = None
+            self.canvas.UnsetToolTip()
+        self.sketch.clear()
+        for other in self.collections():
+            self.sketch.add(other.table.value)
+        self.refresh_quantile_colors()
+        self.backend.redraw()
+
+    def prepare_events(self, table: EventTable) -> PreparedEvents:
+        """Расчет геометрии, цветов и подписей без обращения к отрисовке, можно вызывать из рабочего потока."""
+        color_scheme = self.color_scheme
+        timings = PhaseTimings()
+        energies = table.value.tolist()
+        with timings.measure("colors"):
+            colors = self.map_colors(color_scheme, table.value)
+        with timings.measure("labels"):
+            # Строки хранят только текстовые примитивы отрисовки, см. RenderBackend.add_symbols
+            labels = [n2text(energy) for energy in energies]
+        return PreparedEvents(table, self.event_radius(table.value), colors, labels, timings)
+
+    @staticmethod
+    def event_radius(energies: np.ndarray) -> np.ndarray:
+        return 5 * np.log(energies)
+
+    def append_events(self, collection: EventsCollection, table: EventTable):
+        self.append_prepared(collection, self.prepare_events(table))
+
+    def append_prepared(self, collection: EventsCollection, prepared: PreparedEvents):
+        table = prepared.table
+        with prepared.timings.measure("create"):
+            handles = self.backend.add_symbols(
+                collection.layer, table.x, table.y, prepared.radius, prepared.colors, prepared.labels
+            )
+            start = len(collection)
+            collection.append(table, prepared.colors, handles, prepared.labels)
+            radius = np.abs(prepared.radius)
+            radius = radius[np.isfinite(radius)]
+            if len(radius) > 0:
+                collection.reach = max(collection.reach, float(radius.max()))
+            # Новые примитивы видимы, те, что вне окна, и лишние подписи скроет update_view
+            added = np.arange(start, len(collection))
+            collection.visible = np.concatenate([collection.visible, added])
+            collection.labeled = np.concatenate([collection.labeled, added])
+            self.sketch.add(table.value)
+            # Следующие порции раскрашиваются по квантилям с учетом этой,
+            # уже добавленные перекрашивает refresh_quantile_colors в конце импорта.
+            # Скоплений на экране немного, их цвета обновляются сразу
+            if self.update_reference():
+                self.paint_clusters()
+            if len(self.class_groups) > 0:
+                self.assign_classes(collection, handles, table.value)
+        # Отбор по окну и расстановка подписей проходят по всем событиям,
+        # поэтому они и перерисовка - раз за тик окна, а не на каждую порцию
+        self.schedule_view_update(redraw=True)
 
     def apply_color_scheme(self, color_scheme: ColorScheme):
         self.color_scheme = color_scheme
         self.repaint()
 
+    def set_color_scheme(self, color_scheme: ColorScheme):
+        """Смена схемы без перерисовки, перекраску ведет RepaintScheduler."""
+        self.color_scheme = color_scheme
+
+    def collections(self) -> List[EventsCollection]:
+        return [o for o in self.objects if isinstance(o, EventsCollection) and len(o) > 0]
+
+    def set_color_classes(self, count: int):
+        """
+        Режим цветовых классов: события делятся на count классов по энергии,
+        каждый класс - группа отрисовки со своим цветом. Смена схемы тогда
+        перекрашивает count групп, а не все события. Перерисовка - в repaint.
+        """
+        if count == self.color_classes:
+            return
+        for collection in self.collections():
+            if collection.classes is not None:
+                self.backend.release_group(collection.handles(), collection.layer)
+                collection.classes = None
+                collection.colors = None
+        for group in self.class_groups:
+            self.backend.delete_group(group)
+        self.class_groups = []
+        self.class_colors = None
+        self.color_classes = count
+
+    def assign_classes(self, collection: EventsCollection, handles, energies, old=None):
+        """Перенос в группы событий, чей класс изменился; handles и energies - хвост коллекции или вся она."""
+        classes = np.searchsorted(self.class_bounds, self.color_scheme.transform(energies), side="right")
+        changed = np.ones(len(classes), dtype=bool) if old is None else classes != old
+        for index in np.unique(classes[changed]).tolist():
+            self.backend.assign_group(handles[changed & (classes == index)], self.class_groups[index])
+        if old is None and collection.classes is not None:
+            classes = np.concatenate([collection.classes, classes])
+        collection.classes = classes
+
+    def repaint_classes(self):
+        bounds, colors = self.color_scheme.classes(self.color_classes)
+        self.class_bounds = np.array(bounds, dtype=np.float64)
+        colors = np.array(colors, dtype=np.uint8)
+        self.class_colors = colors
+        if len(self.class_groups) == 0:
+            self.class_groups = [
+                self.backend.create_group("Класс %d" % (i + 1), color) for i, color in enumerate(colors)
+            ]
+        else:
+            for group, color in zip(self.class_groups, colors):
+                self.backend.set_group_color(group, color)
+        for collection in self.collections():
+            self.assign_classes(collection, collection.handles(), collection.table.value, collection.classes)
+        self.paint_clusters()
+        self.backend.redraw()
+
+    def update_reference(self) -> bool:
+        """Опорные квантили для квантильной шкалы по всем загруженным событиям, True - изменились."""
+        scheme = self.color_scheme
+        if scheme is None or scheme.axis != AXIS_QUANTILE:
+            return False
+        count = len(self.sketch)
+        if count > 0 and (scheme.reference is None or count != self.reference_count):
+            scheme.reference = self.sketch.quantiles(np.linspace(0, 1, QUANTILE_POINTS)).tolist()
+            self.reference_count = count
+            return True
+        return False
+
+    def refresh_quantile_colors(self):
+        """
+        Перекраска по квантилям всех событий после изменения их набора: порции
+        импорта раскрашены по промежуточным квантилям, без перекраски их цвета
+        зависели бы от порядка загрузки.
+        """
+        scheme = self.color_scheme
+        if scheme is not None and scheme.axis == AXIS_QUANTILE:
+            self.repaint()
+
     def repaint(self):
-        hBlock = lc.lcPropGetHandle(self.lc_wnd, lc.LC_PROP_WND_BLOCK)
-        for object in self.objects:
-            if isinstance(object, EventsCollection):
-                for event in object.events:
-                    for prim in event.primitives:
-                        energy = event.energy
-                        if self.color_scheme is not None:
-                            r, g, b, a = get_interpol_color_by_pos(self.color_scheme, energy).Get()
-                            color = "%d,%d,%d" % (r, g, b)
-                        else:
-                            color = "0,0,0"
-                        print(color)
-                        lc.lcPropPutStr(prim, lc.LC_PROP_ENT_COLOR, color)
-        lc.lcBlockUpdate(hBlock, True, 0)
-        lc.lcWndRedraw(self.lc_wnd)
+        self.update_reference()
+        if self.color_classes > 0 and self.color_scheme is not None:
+            self.repaint_classes()
+            return
+        for collection, changed, colors in self.compute_colors(self.color_scheme, self.color_snapshot()):
+            if collection.colors is None:
+                collection.colors = np.zeros((len(changed), 3), dtype=np.uint8)
+            self.apply_colors(collection, changed, colors)
+        self.paint_clusters()
+        self.backend.redraw()
+
+    def color_snapshot(self):
+        """Данные для расчета цветов вне потока окна: (коллекция, энергии, текущие цвета)."""
+        return [(collection, collection.table.value, collection.colors) for collection in self.collections()]
+
+    @classmethod
+    def compute_colors(cls, color_scheme: ColorScheme, snapshot):
+        """
+        Новые цвета по снимку color_snapshot: (коллекция, номера изменившихся
+        событий, их цвета). Можно вызывать из рабочего потока.
+        """
+        result = []
+        for collection, values, cached in snapshot:
+            colors = cls.map_colors(color_scheme, values)
+            if cached is None:
+                changed = np.arange(len(colors))
+            else:
+                # Отправляются только события, у которых цвет действительно изменился
+                changed = np.flatnonzero((colors != cached).any(axis=1))
+            result.append((collection, changed, colors[changed]))
+        return result
+
+    def apply_colors(self, collection: EventsCollection, index, colors, handles=None):
+        """Перекраска событий index коллекции; handles - готовый collection.handles(), если есть."""
+        if collection not in self.objects or collection.colors is None or len(index) == 0:
+            return
+        collection.colors[index] = colors
+        if handles is None:
+            handles = collection.handles()
+        handles = handles[index]
+        self.backend.set_colors(handles.ravel(), np.repeat(colors, handles.shape[1], axis=0))
+
+    @staticmethod
+    def map_colors(color_scheme: ColorScheme, values: np.ndarray) -> np.ndarray:
+        """Цвета (N, 3) uint8 для значений, без схемы - черный."""
+        if color_scheme is None:
+            return np.zeros((len(values), 3), dtype=np.uint8)
+        return color_scheme.map_colors(values)
@@ -26,16 +26,26 @@ class Properties(wx.Panel):
         self.n = FlatNotebook(self, agwStyle=FNB_NO_NAV_BUTTONS)
         self.pg = wx.propgrid.PropertyGrid(self, style=wx.propgrid.PG_SPLITTER_AUTO_CENTER)
         self.pg.RegisterEditor(GradientEditor(), "gradient")
-        pp: wx.propgrid.PGProperty = self.pg.Append(
-            ColorSchemeProperty(
-                "Цветовая схема",
-                "levels",
-                ColorScheme.basic(
-                    wx.Colour(0, 0, 255), 0, wx.Colour(255, 0, 0), 100
-                ), 
-            )
+        self.levels = ColorSchemeProperty(
+            "Цветовая схема",
+            "levels",
+            ColorScheme.basic(
+                wx.Colour(0, 0, 255), 0, wx.Colour(255, 0, 0), 100
+            ), 
         )
+        pp: wx.propgrid.PGProperty = self.pg.Append(self.levels)
         pp.SetEditor("gradient")
+        classes = self.pg.Append(wx.propgrid.IntProperty("Цветовых классов", "classes", 0))
+        classes.SetAttribute(wx.propgrid.PG_ATTR_MIN, 0)
+        classes.SetAttribute(wx.propgrid.PG_ATTR_MAX, 64)
+        classes.SetHelpString("0 - непрерывная раскраска, иначе события делятся на классы по энергии")
+        detail = self.pg.Append(wx.propgrid.FloatProperty("Только точки мельче, пикс/ед", "points_only_scale", 0.0))
+        detail.SetAttribute(wx.propgrid.PG_ATTR_MIN, 0.0)
+        detail.SetHelpString("При масштабе меньше заданного окружности и подписи событий не рисуются")
+        cluster = self.pg.Append(wx.propgrid.IntProperty("Ячейка скоплений, пикс", "cluster_pixels", 0))
+        cluster.SetAttribute(wx.propgrid.PG_ATTR_MIN, 0)
+        cluster.SetAttribute(wx.propgrid.PG_ATTR_MAX, 512)
+        cluster.SetHelpString("0 - без скоплений, иначе плотные группы событий в ячейке такого размера рисуются одним символом")
         self.n.AddPage(self.pg, "Параметры отрисовки")
         sz.Add(self.n, 1, wx.EXPAND)
         self.SetSizer(sz)
@@ -52,6 +62,25 @@ class Properties(wx.Panel):
     def get_color_scheme(self) -> ColorScheme:
         return self.pg.GetPropertyValue('levels')
 
+    def set_sketch(self, sketch):
+        """Распределение энергий загруженных событий для автоматической схемы."""
+        self.levels.sketch = sketch
+
+    def get_color_classes(self) -> int:
+        return max(0, self.pg.GetPropertyValue("classes"))
+
+    def set_points_only_scale(self, scale: float):
+        self.pg.SetPropertyValue("points_only_scale", scale)
+
+    def get_points_only_scale(self) -> float:
+        return max(0.0, self.pg.GetPropertyValue("points_only_scale"))
+
+    def set_cluster_pixels(self, pixels: int):
+        self.pg.SetPropertyValue("cluster_pixels", pixels)
+
+    def get_cluster_pixels(self) -> int:
+        return max(0, self.pg.GetPropertyValue("cluster_pixels"))
+
     def on_close(self, event):
         event.Veto()
         wx.PostEvent(self, CloseEvent())
@@ -0,0 +1,35 @@
+import os
+import sys
+
+from .base import (
+    LABEL_HEIGHT,
+    LABEL_MIN_PIXELS,
+    LABEL_OFFSET,
+    PRIM_COUNT,
+    PRIM_SYMBOL,
+    PRIM_TEXT,
+    SYMBOL_NAME,
+    RenderBackend,
+    color_strings,
+)
+
+# Переопределение выбора отрисовки: litecad или floatcanvas
+BACKEND_ENV = "SEISMIC_MAP_BACKEND"
+
+
+def create_backend(parent, name=None) -> RenderBackend:
+    """LiteCAD на Windows, если библиотека доступна, иначе FloatCanvas."""
+    if name is None:
+        name = os.environ.get(BACKEND_ENV)
+    if name is None:
+        name = "litecad" if sys.platform == "win32" else "floatcanvas"
+    if name == "litecad":
+        try:
+            from .litecad import LiteCadBackend
+        except (ImportError, OSError):
+            pass
+        else:
+            return LiteCadBackend(parent)
+    from .floatcanvas import FloatCanvasBackend
+
+    return FloatCanvasBackend(parent)
@@ -0,0 +1,150 @@
+from typing import Callable, Iterator, List, Tuple
+
+import numpy as np
+import wx
+
+# Примитивы одного события, столбцы массива описателей: ссылка на общий
+# символ (окружность с точкой в центре) и подпись
+PRIM_SYMBOL = 0
+PRIM_TEXT = 1
+PRIM_COUNT = 2
+# Имя общего символа события, окружность единичного радиуса
+SYMBOL_NAME = "EVENT"
+# Высота подписи в единицах чертежа и смещение ее вниз от события
+LABEL_HEIGHT = 16.0
+LABEL_OFFSET = 8.0
+# Мельче этого подписи не рисуются, пикс
+LABEL_MIN_PIXELS = 6
+
+
+def color_strings(colors: np.ndarray) -> List[str]:
+    """(N, 3) uint8 -> ['r,g,b', ...]"""
+    return ["%d,%d,%d" % (r, g, b) for r, g, b in colors.tolist()]
+
+
+def color_groups(colors: np.ndarray) -> Iterator[Tuple[str, np.ndarray]]:
+    """Группы одинаковых цветов: ('r,g,b', индексы строк colors)."""
+    if len(colors) == 0:
+        return
+    packed = (
+        (colors[:, 0].astype(np.uint32) << 16)
+        | (colors[:, 1].astype(np.uint32) << 8)
+        | colors[:, 2].astype(np.uint32)
+    )
+    order = np.argsort(packed, kind="stable")
+    bounds = np.flatnonzero(np.diff(packed[order])) + 1
+    for index in np.split(order, bounds):
+        r, g, b = colors[index[0]].tolist()
+        yield "%d,%d,%d" % (r, g, b), index
+
+
+class RenderBackend:
+    """
+    Интерфейс отрисовки карты под PlotWidget.
+
+    Все операции над событиями принимают массивы целиком, чтобы реализация
+    могла сама группировать вызовы. Символ события описан один раз, каждое
+    событие - легкая ссылка на него с положением, масштабом (радиусом)
+    и цветом, плюс подпись. Описатели возвращаются массивом int64 формы
+    (N, PRIM_COUNT).
+    """
+
+    name = ""
+
+    def __init__(self, parent: wx.Window):
+        # Окно, которое PlotWidget размещает в своем сизере
+        self.window: wx.Window = None
+        # Вызывается после изменения видимой области (масштаб, панорама, размер)
+        self.on_view_changed: Callable[[], None] = None
+        # Вызывается при движении мыши с координатами чертежа
+        self.on_mouse_move: Callable[[float, float], None] = None
+
+    def create_layer(self, name: str):
+        raise NotImplementedError
+
+    def delete_layer(self, layer):
+        raise NotImplementedError
+
+    def add_symbols(
+        self,
+        layer,
+        x: np.ndarray,
+        y: np.ndarray,
+        radius: np.ndarray,
+        colors: np.ndarray,
+        labels: List[str],
+    ) -> np.ndarray:
+        """
+        Строки labels передаются один раз: текстовые примитивы и есть кэш
+        подписей. При масштабе и расстановке подписи только показываются
+        и скрываются через set_visible, заново не создаются.
+        """
+        raise NotImplementedError
+
+    def set_colors(self, handles: np.ndarray, colors: np.ndarray):
+        """handles - (M,) описатели примитивов, colors - (M, 3) uint8."""
+        raise NotImplementedError
+
+    def remove(self, handles: np.ndarray):
+        raise NotImplementedError
+
+    def set_visible(self, handles: np.ndarray, visible: bool):
+        """Показать или скрыть примитивы (M,), скрытые не рисуются. Новые примитивы видимы."""
+        raise NotImplementedError
+
+    def set_points_only(self, points_only: bool):
+        """Мелкий масштаб: у символов событий рисуется только точка, без окружности."""
+        raise NotImplementedError
+
+    def create_group(self, name: str, color: np.ndarray):
+        """Цветовая группа: примитивы группы берут ее цвет вместо своего."""
+        raise NotImplementedError
+
+    def set_group_color(self, group, color: np.ndarray):
+        raise NotImplementedError
+
+    def delete_group(self, group):
+        raise NotImplementedError
+
+    def assign_group(self, handles: np.ndarray, group):
+        raise NotImplementedError
+
+    def release_group(self, handles: np.ndarray, layer):
+        """Возврат примитивов из групп в слой коллекции, цвет затем задается через set_colors."""
+        raise NotImplementedError
+
+    def redraw(self):
+        raise NotImplementedError
+
+    def zoom_in(self):
+        raise NotImplementedError
+
+    def zoom_out(self):
+        raise NotImplementedError
+
+    def zoom_extents(self):
+        raise NotImplementedError
+
+    def window_to_world(self, px: float, py: float) -> Tuple[float, float]:
+        raise NotImplementedError
+
+    def world_to_window(self, x: float, y: float) -> Tuple[float, float]:
+        raise NotImplementedError
+
+    def can_undo(self):
+        return False
+
+    def undo(self): ...
+
+    def can_redo(self):
+        return False
+
+    def redo(self): ...
+
+    def view_changed(self):
+        if self.on_view_changed is not None:
+            self.on_view_changed()
+
+    def mouse_moved(self, x, y):
+        if self.on_mouse_move is not None:
+            self.on_mouse_move(x, y)
@@ -0,0 +1,356 @@
+from typing import Dict, List
+
+import numpy as np
+import wx
+from wx.lib.floatcanvas import FloatCanvas, GUIMode
+from wx.lib.floatcanvas.Utilities import BBox
+
+from .base import (
+    LABEL_HEIGHT,
+    LABEL_MIN_PIXELS,
+    LABEL_OFFSET,
+    PRIM_COUNT,
+    PRIM_SYMBOL,
+    PRIM_TEXT,
+    RenderBackend,
+)
+
+ZOOM_FACTOR = 1.5
+
+
+def pack_colors(colors: np.ndarray) -> np.ndarray:
+    colors = colors.astype(np.uint32)
+    return (colors[:, 0] << 16) | (colors[:, 1] << 8) | colors[:, 2]
+
+
+def symbol_bounds(x, y, radius):
+    """
+    Границы [[xmin, ymin], [xmax, ymax]] символов или None, если их нет.
+
+    Символы с NaN или бесконечностью в координатах (ячейка, которую не удалось
+    разобрать) не учитываются, без конечного радиуса (энергия <= 0) - только
+    центр: один NaN в границах скрыл бы весь слой, FloatCanvas не рисует
+    объекты вне вида.
+    """
+    x, y, radius = np.asarray(x), np.asarray(y), np.abs(radius)
+    radius = np.where(np.isfinite(radius), radius, 0)
+    finite = np.isfinite(x) & np.isfinite(y)
+    if not finite.all():
+        x, y, radius = x[finite], y[finite], radius[finite]
+    if len(x) == 0:
+        return None
+    return np.array([[np.min(x - radius), np.min(y - radius)], [np.max(x + radius), np.max(y + radius)]])
+
+
+class SymbolLayer(FloatCanvas.DrawObject):
+    """
+    Слой событий FloatCanvas: все символы слоя хранятся массивами и рисуются
+    одним объектом через DrawEllipseList/DrawPointList/DrawTextList.
+
+    Массивы выделяются с запасом (емкость удваивается), записи за count
+    не живые, поэтому добавление порции не копирует весь слой. Записи
+    удаленных символов занимаются новыми: слой скоплений, который
+    перестраивается при каждой смене вида, не растет без конца.
+    """
+
+    def __init__(self, id, name, palette):
+        super().__init__()
+        self.id = id
+        self.name = name
+        # Цвета групп, общие для всех слоев, см. FloatCanvasBackend.create_group
+        self.palette = palette
+        self.x = np.empty(0, dtype=np.float64)
+        self.y = np.empty(0, dtype=np.float64)
+        self.radius = np.empty(0, dtype=np.float64)
+        self.colors = np.empty((0, 3), dtype=np.uint8)
+        # Номер цветовой группы записи, -1 - собственный цвет
+        self.group = np.empty(0, dtype=np.int32)
+        self.labels: List[str] = []
+        self.alive = np.empty(0, dtype=bool)
+        # Видимость символа и подписи записи, см. FloatCanvasBackend.set_visible
+        self.shown = np.empty(0, dtype=bool)
+        self.labeled = np.empty(0, dtype=bool)
+        # Занятые записи - первые count, остальное - запас емкости
+        self.count = 0
+        # Записи удаленных символов среди первых count, занимаются первыми
+        self.free = np.empty(0, dtype=np.int64)
+        self.points_only = False
+        # Границы живых символов, None - слой пуст; bounds_dirty - пересчитать после удаления
+        self.bounds = None
+        self.bounds_dirty = False
+        self.pens: Dict[int, wx.Pen] = {}
+
+    @property
+    def BoundingBox(self):
+        if self.bounds_dirty:
+            alive = self.alive
+            self.bounds = symbol_bounds(self.x[alive], self.y[alive], self.radius[alive])
+            self.bounds_dirty = False
+        if self.bounds is None:
+            return BBox.NullBBox()
+        return BBox.asBBox(self.bounds)
+
+    @BoundingBox.setter
+    def BoundingBox(self, bbox):
+        bounds = np.asarray(bbox, dtype=np.float64)
+        self.bounds = None if np.isnan(bounds).all() else bounds
+        self.bounds_dirty = False
+
+    def reserve(self, count):
+        """Емкость массивов не меньше count записей, при нехватке удваивается."""
+        capacity = len(self.x)
+        if count <= capacity:
+            return
+        capacity = max(count, 2 * capacity)
+
+        def grown(array, fill):
+            out = np.full((capacity,) + array.shape[1:], fill, dtype=array.dtype)
+            out[: len(array)] = array
+            return out
+
+        self.x = grown(self.x, 0)
+        self.y = grown(self.y, 0)
+        self.radius = grown(self.radius, 0)
+        self.colors = grown(self.colors, 0)
+        self.group = grown(self.group, -1)
+        self.alive = grown(self.alive, False)
+        self.shown = grown(self.shown, False)
+        self.labeled = grown(self.labeled, False)
+        self.labels.extend([""] * (capacity - len(self.labels)))
+
+    def append(self, x, y, radius, colors, labels) -> np.ndarray:
+        """Номера записей новых символов: сначала свободные, затем в конце слоя."""
+        reused = self.free[: len(x)]
+        self.free = self.free[len(reused) :]
+        start = self.count
+        end = start + len(x) - len(reused)
+        self.reserve(end)
+        index = np.concatenate([reused, np.arange(start, end, dtype=np.int64)])
+        self.x[index] = x
+        self.y[index] = y
+        self.radius[index] = radius
+        self.colors[index] = colors
+        self.group[index] = -1
+        labels = list(labels)
+        for i, label in zip(reused.tolist(), labels):
+            self.labels[i] = label
+        self.labels[start:end] = labels[len(reused) :]
+        self.alive[index] = True
+        self.shown[index] = True
+        self.labeled[index] = True
+        self.count = end
+        self.extend_bounds(x, y, radius)
+        return index
+
+    def release(self, index):
+        """Удаление символов: записи становятся свободными."""
+        index = np.unique(index)
+        index = index[self.alive[index]]
+        self.alive[index] = False
+        for i in index.tolist():
+            self.labels[i] = ""
+        self.free = np.concatenate([self.free, index])
+        # Границы пересчитываются при следующем обращении к BoundingBox
+        self.bounds_dirty = True
+
+    def extend_bounds(self, x, y, radius):
+        """Границы расширяются только по добавленным символам."""
+        added = symbol_bounds(x, y, radius)
+        if self.bounds_dirty or added is None:
+            return
+        if self.bounds is None:
+            self.bounds = added
+        else:
+            self.bounds = np.array(
+                [np.minimum(self.bounds[0], added[0]), np.maximum(self.bounds[1], added[1])]
+            )
+
+    def pen(self, packed):
+        pen = self.pens.get(packed)
+        if pen is None:
+            pen = wx.Pen(wx.Colour(packed >> 16, (packed >> 8) & 0xFF, packed & 0xFF))
+            self.pens[packed] = pen
+        return pen
+
+    def _Draw(self, dc, WorldToPixel, ScaleWorldToPixel, HTdc=None):
+        # Без координат символ не нарисовать, в int32 NaN превратился бы в мусор
+        index = np.flatnonzero(self.alive & self.shown & np.isfinite(self.x) & np.isfinite(self.y))
+        if len(index) == 0:
+            return
+        xy = WorldToPixel(np.column_stack((self.x[index], self.y[index])))
+        scale = abs(self._Canvas.TransformVector[0])
+        r = np.abs(self.radius[index]) * scale
+        colors = self.colors[index]
+        group = self.group[index]
+        grouped = group >= 0
+        if grouped.any():
+            colors[grouped] = self.palette()[group[grouped]]
+        packed = pack_colors(colors)
+        unique, inverse = np.unique(packed, return_inverse=True)
+        pens_unique = [self.pen(int(p)) for p in unique.tolist()]
+        pens = [pens_unique[i] for i in inverse.tolist()]
+        if not self.points_only:
+            # Без радиуса (энергия <= 0 или NaN) остаются точка и подпись
+            circles = np.flatnonzero(np.isfinite(r))
+            r = r[circles]
+            centers = xy[circles]
+            rects = np.column_stack(
+                (centers[:, 0] - r, centers[:, 1] - r, 2 * r, 2 * r)
+            ).astype(np.int32)
+            dc.DrawEllipseList(rects, pens=[pens[i] for i in circles.tolist()], brushes=wx.TRANSPARENT_BRUSH)
+        dc.DrawPointList(xy.astype(np.int32), pens=pens)
+        text_px = int(LABEL_HEIGHT * scale)
+        labeled = np.flatnonzero(self.labeled[index])
+        if text_px >= LABEL_MIN_PIXELS and len(labeled) > 0:
+            font = wx.Font(wx.FontInfo(wx.Size(0, text_px)).Family(wx.FONTFAMILY_SWISS))
+            dc.SetFont(font)
+            xy = xy[labeled]
+            coords = np.column_stack((xy[:, 0], xy[:, 1] + LABEL_OFFSET * scale)).astype(np.int32)
+            foregrounds = [pens[i].GetColour() for i in labeled.tolist()]
+            labels = [self.labels[i] for i in index[labeled].tolist()]
+            dc.DrawTextList(labels, coords, foregrounds=foregrounds)
+
+
+class MapMode(GUIMode.GUIBase):
+    """Колесо - масштаб относительно курсора, средняя кнопка - панорама."""
+
+    def __init__(self, backend, canvas=None):
+        super().__init__(canvas)
+        self.backend = backend
+        self.pan_start = None
+
+    def OnWheel(self, event):
+        center = self.Canvas.PixelToWorld(event.GetPosition())
+        factor = ZOOM_FACTOR if event.GetWheelRotation() > 0 else 1 / ZOOM_FACTOR
+        self.Canvas.Zoom(factor, center, centerCoords="world", keepPointInPlace=True)
+        self.backend.view_changed()
+
+    def OnMiddleDown(self, event):
+        self.pan_start = np.array(event.GetPosition())
+        self.Canvas.CaptureMouse()
+
+    def OnMiddleUp(self, event):
+        if self.Canvas.HasCapture():
+            self.Canvas.ReleaseMouse()
+        self.pan_start = None
+
+    def OnMove(self, event):
+        pos = np.array(event.GetPosition())
+        if self.pan_start is not None and event.MiddleIsDown():
+            self.Canvas.MoveImage(self.pan_start - pos, "Pixel")
+            self.pan_start = pos
+            self.backend.view_changed()
+        x, y = self.Canvas.PixelToWorld(pos)
+        self.backend.mouse_moved(x, y)
+
+
+class FloatCanvasBackend(RenderBackend):
+    """Кроссплатформенная отрисовка через wx.lib.floatcanvas."""
+
+    name = "floatcanvas"
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.canvas = FloatCanvas.FloatCanvas(parent, BackgroundColor="WHITE")
+        self.canvas.SetMode(MapMode(self))
+        self.window = self.canvas
+        self.layers: Dict[int, SymbolLayer] = {}
+        self.next_layer_id = 1
+        self.group_colors = np.empty((0, 3), dtype=np.uint8)
+        self.points_only = False
+        self.canvas.Bind(wx.EVT_SIZE, self.on_size)
+
+    def on_size(self, event):
+        event.Skip()
+        wx.CallAfter(self.view_changed)
+
+    def create_layer(self, name):
+        layer = SymbolLayer(self.next_layer_id, name, lambda: self.group_colors)
+        layer.points_only = self.points_only
+        self.next_layer_id += 1
+        self.layers[layer.id] = layer
+        self.canvas.AddObject(layer)
+        return layer
+
+    def delete_layer(self, layer: SymbolLayer):
+        self.canvas.RemoveObject(layer)
+        del self.layers[layer.id]
+
+    def add_symbols(self, layer: SymbolLayer, x, y, radius, colors, labels):
+        index = layer.append(x, y, radius, colors, labels)
+        self.canvas.BoundingBoxDirty = True
+        # Символ и подпись события - одна запись слоя, описатели отличаются младшими битами
+        prims = np.arange(PRIM_COUNT, dtype=np.int64)
+        return (np.int64(layer.id) << 32) | (index[:, None] << 2) | prims[None, :]
+
+    def decode(self, handles):
+        handles = np.ravel(handles)
+        return handles >> 32, (handles & 0xFFFFFFFF) >> 2
+
+    def set_colors(self, handles, colors):
+        layer_ids, index = self.decode(handles)
+        for layer_id in np.unique(layer_ids).tolist():
+            mask = layer_ids == layer_id
+            self.layers[layer_id].colors[index[mask]] = colors[mask]
+
+    def remove(self, handles):
+        layer_ids, index = self.decode(handles)
+        for layer_id in np.unique(layer_ids).tolist():
+            self.layers[layer_id].release(index[layer_ids == layer_id])
+        self.canvas.BoundingBoxDirty = True
+
+    def set_visible(self, handles, visible):
+        layer_ids, index = self.decode(handles)
+        prims = np.ravel(handles) & 0x3
+        for layer_id in np.unique(layer_ids).tolist():
+            layer = self.layers[layer_id]
+            mask = layer_ids == layer_id
+            layer.shown[index[mask & (prims == PRIM_SYMBOL)]] = visible
+            layer.labeled[index[mask & (prims == PRIM_TEXT)]] = visible
+
+    def set_points_only(self, points_only):
+        self.points_only = points_only
+        for layer in self.layers.values():
+            layer.points_only = points_only
+
+    def create_group(self, name, color):
+        self.group_colors = np.concatenate([self.group_colors, np.asarray(color, dtype=np.uint8)[None]])
+        return len(self.group_colors) - 1
+
+    def set_group_color(self, group, color):
+        self.group_colors[group] = color
+
+    def delete_group(self, group):
+        # Номера групп не переиспользуются, строка палитры просто остается
+        pass
+
+    def assign_group(self, handles, group):
+        layer_ids, index = self.decode(handles)
+        for layer_id in np.unique(layer_ids).tolist():
+            self.layers[layer_id].group[index[layer_ids == layer_id]] = group
+
+    def release_group(self, handles, layer):
+        self.assign_group(handles, -1)
+
+    def redraw(self):
+        self.canvas.Draw(Force=True)
+
+    def zoom_in(self):
+        self.canvas.Zoom(ZOOM_FACTOR)
+        self.view_changed()
+
+    def zoom_out(self):
+        self.canvas.Zoom(1 / ZOOM_FACTOR)
+        self.view_changed()
+
+    def zoom_extents(self):
+        self.canvas.ZoomToBB()
+        self.view_changed()
+
+    def window_to_world(self, px, py):
+        x, y = self.canvas.PixelToWorld((px, py))
+        return float(x), float(y)
+
+    def world_to_window(self, x, y):
+        px, py = self.canvas.WorldToPixel((x, y))
+        return int(px), int(py)
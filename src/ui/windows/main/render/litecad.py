@@ -0,0 +1,261 @@
+import ctypes
+import ctypes.wintypes as wt
+from typing import List
+
+import numpy as np
+import wx
+
+import lib.litecad as lc
+
+from .base import (
+    LABEL_HEIGHT,
+    LABEL_OFFSET,
+    PRIM_COUNT,
+    SYMBOL_NAME,
+    RenderBackend,
+    color_groups,
+    color_strings,
+)
+
+_lc_initialized = False
+
+
+def init_litecad_dll():
+    global _lc_initialized
+    if _lc_initialized:
+        return
+    lc.lcPropPutStr(
+        0, lc.LC_PROP_G_REGCODE, "cdda-e9ce-9eb7-1d89"
+    )  # Серийник от библиотеки
+    # lc.lcPropPutStr( 0, lc.LC_PROP_G_RULERBMP, "C:\Serg\sigmaview\icon.bmp")
+    lc.lcPropPutBool(0, lc.LC_PROP_G_PANREDQUAL, True)
+    print("Version:", lc.lcPropGetStr(0, lc.LC_PROP_G_VERSION))
+    print("Directory:", lc.lcPropGetStr(0, lc.LC_PROP_G_DIRDLL))
+    lc_job = lc.lcInitialize()  # Инициализация CAD'a)
+    print("Инициализация CADa lc_job=", lc_job)
+    print(lc.lcPropPutBool(0, lc.LC_PROP_SEL_PICKADD, True))
+    # Настройка цветов и режимов выделения примитивов
+    lc.lcPropPutBool(0, lc.LC_PROP_SEL_GRIPNUM, False)  # Отключаем нумирацию точек
+    lc.lcPropPutBool(
+        0, lc.LC_PROP_SEL_HATCHFILL, False
+    )  # Отключаем штриховку замкнутых областей
+    lc.lcPropPutInt(
+        0, lc.LC_PROP_SEL_GRIPCOLORF, 0
+    )  # Цвет точек на римитивах - черный
+    lc.lcPropPutInt(
+        0, lc.LC_PROP_SEL_COLORF, lc.lcColorRGB(255, 255, 255)
+    )  # Цвет заливки выбранной области - белый
+    _lc_initialized = True
+
+
+class LiteCadBackend(RenderBackend):
+    """Отрисовка через LiteCAD (только Windows)."""
+
+    name = "litecad"
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        init_litecad_dll()
+        self.window = wx.Panel(parent)
+        self.init_litecad(self.window)
+        self.window.Bind(wx.EVT_SIZE, self.on_size)
+
+        CMPFUNC = ctypes.CFUNCTYPE(None, wt.HANDLE)  # Регистрация процедуры событий
+        self.lc_event_proc = CMPFUNC(self.on_lc_event_proc)
+        lc.lcEventSetProc(lc.LC_EVENT_MOUSEMOVE, self.lc_event_proc, 0, self.lc_event_proc)
+        lc.lcEventSetProc(lc.LC_EVENT_WNDVIEW, self.lc_event_proc, 0, self.lc_event_proc)
+
+    def init_litecad(self, panel):
+        w, h = panel.Size  # Размеры рабочего поля 2D
+        lc_wnd = lc.lcCreateWindow(
+            panel.GetHandle(), lc.LC_WS_DEFAULT
+        )  # ^lc.LC_WS_RULERS #Sozdanie okna s privyazkoy k okny interfeisa
+        print("Инициализация окна CADa lc_wnd=", lc_wnd)
+        lc.lcWndResize(lc_wnd, 0, 0, w, h)  #
+        lc.lcPropPutBool(lc_wnd, lc.LC_PROP_WND_SELECT, True)
+        # On/Off vydelenye mysh'y
+        lc.lcPropPutBool(lc_wnd, lc.LC_PROP_WND_GRIDSHOW, True)
+        # On/Off setka na fone
+        lc_drw = lc.lcCreateDrawing()  # Sozdanie objecta otrisovki
+        print("Инициализация изображения CAD" "a lc_drw=", lc_drw)
+        lc.lcPropPutInt(
+            lc_drw, lc.LC_PROP_DRW_COLORBACKP, 255 * 65536 + 255 * 256 + 255
+        )
+        lc.lcPropPutInt(
+            lc_drw, lc.LC_PROP_DRW_COLORBACKM, 255 * 65536 + 255 * 256 + 255
+        )  # Cvet zadnego fona B*65535_G*256_R
+        lc.lcPropPutInt(
+            lc_wnd, lc.LC_PROP_WND_GRIDCOLOR, 252 * 65536 + 86 * 256 + 97
+        )  # Cvet GRID'a B*65535_G*256_R
+        hBlock = lc.lcPropGetHandle(lc_drw, lc.LC_PROP_DRW_BLOCK_MODEL)
+        lc.lcPropPutBool(lc_wnd, lc.LC_PROP_WND_DRAWPAPER, False)
+        print("Инициализация блока CAD" "a hBlock=", hBlock)
+        lc.lcWndSetBlock(lc_wnd, hBlock)
+        # Vybrat' block kotoriy bydet otobrajat'sya v okne
+        lc.lcBlockUpdate(hBlock, True, 0)
+        # Obnovlyaet block i vse objekty
+        lc.lcWndExeCommand(lc_wnd, lc.LC_CMD_ZOOM_EXT, 0)
+        # Vypolnyaet comandy 'Priblizit' k ob'ekty otrisovki'
+        lc.lcWndSetFocus(lc_wnd)
+        # Delaet aktivnym dlya klaviatury okino
+        lc.lcPropPutBool(lc_wnd, lc.LC_PROP_WND_STDBLKFRAME, False)
+        # On/Off Ramka blocka
+        lc.lcPropPutBool(
+            lc_drw, lc.LC_PROP_DRW_LOCKSEL, True
+        )  # On/Off Select locked elements
+        lc.lcPropPutFloat(lc_wnd, lc.LC_PROP_WND_GRIDDX, 10.0)
+        lc.lcPropPutFloat(lc_wnd, lc.LC_PROP_WND_GRIDDY, 10.0)
+        lc.lcPropPutBool(lc_wnd, lc.LC_PROP_WND_GRIDDOTTED, True)
+        # lc.lcPropPutBool( lc_wnd, lc.LC_PROP_WND_RULERS, True) #Отображение линейки LiteCAD'a
+        self.text_style = lc.lcDrwAddTextStyle(lc_drw, "ArialStyle", "Arial", True)
+        self.linetype = lc.lcDrwGetObjectByName(lc_drw, lc.LC_OBJ_LINETYPE, "CONTINUOUS")
+        # Слой окружностей внутри символа: выключается целиком в режиме только точек
+        self.circle_layer = lc.lcDrwAddLayer(lc_drw, SYMBOL_NAME + "_CIRCLE", "0,0,0", self.linetype, 0)
+        self.symbol = self.create_symbol(lc_drw)
+        self.lc_wnd = lc_wnd
+        self.lc_drw = lc_drw
+
+    def create_symbol(self, lc_drw):
+        """Общий блок символа события: окружность радиуса 1 и точка в центре, цвет берется от ссылки."""
+        symbol = lc.lcDrwAddBlock(lc_drw, SYMBOL_NAME, 0, 0)
+        circle = lc.lcBlockAddCircle(symbol, 0, 0, 1.0, False)
+        lc.lcPropPutHandle(circle, lc.LC_PROP_ENT_LINETYPE, self.linetype)
+        lc.lcPropPutHandle(circle, lc.LC_PROP_ENT_LAYER, self.circle_layer)
+        lc.lcPropPutStr(circle, lc.LC_PROP_ENT_COLOR, "ByBlock")
+        point = lc.lcBlockAddPoint(symbol, 0, 0)
+        lc.lcPropPutStr(point, lc.LC_PROP_ENT_COLOR, "ByBlock")
+        lc.lcBlockUpdate(symbol, True, 0)
+        return symbol
+
+    def on_lc_event_proc(self, action):
+        event_type = lc.lcPropGetInt(action, lc.LC_PROP_EVENT_TYPE)
+        if event_type == lc.LC_EVENT_WNDVIEW:
+            self.view_changed()
+        elif event_type == lc.LC_EVENT_MOUSEMOVE:
+            self.mouse_moved(
+                lc.lcPropGetFloat(action, lc.LC_PROP_EVENT_FLOAT1),
+                lc.lcPropGetFloat(action, lc.LC_PROP_EVENT_FLOAT2),
+            )
+        return 0
+
+    def on_size(self, event):
+        rc = lc.lcWndResize(
+            self.lc_wnd, 0, 0, event.GetSize().GetWidth(), event.GetSize().GetHeight()
+        )
+        if rc == 0:
+            raise Exception(lc.lcGetErrorStr())
+        event.Skip()
+        self.view_changed()
+
+    def block(self):
+        return lc.lcPropGetHandle(self.lc_wnd, lc.LC_PROP_WND_BLOCK)
+
+    def create_layer(self, name):
+        Layer = lc.lcDrwAddLayer(self.lc_drw, name, "0,0,0", self.linetype, 0)
+        lc.lcPropPutInt(Layer, lc.LC_PROP_LAYER_COLORI, 255)
+        lc.lcPropPutBool(Layer, lc.LC_PROP_LAYER_LOCKED, True)
+        lc.lcPropPutBool(Layer, lc.LC_PROP_LAYER_VISIBLE, True)
+        return Layer
+
+    def delete_layer(self, layer):
+        lc.lcDrwDeleteObject(self.lc_drw, layer)
+
+    def add_symbols(self, layer, xs, ys, radii, colors, labels: List[str]):
+        """
+        Слой, тип линии и стиль текста задаются чертежу один раз как текущие,
+        цвет - один раз на группу событий одного цвета. Новые примитивы
+        получают эти свойства при создании. Окружность и точка - одна ссылка
+        на общий блок с масштабом, равным радиусу.
+        """
+        hBlock = self.block()
+        lc.lcPropPutHandle(self.lc_drw, lc.LC_PROP_DRW_LAYER, layer)
+        lc.lcPropPutHandle(self.lc_drw, lc.LC_PROP_DRW_LINETYPE, self.linetype)
+        lc.lcPropPutHandle(self.lc_drw, lc.LC_PROP_DRW_TEXTSTYLE, self.text_style)
+        lc.lcPropPutFloat(self.lc_drw, lc.LC_PROP_DRW_LTSCALE, 1.0)
+        xs = xs.tolist()
+        ys = ys.tolist()
+        radii = radii.tolist()
+        label_ys = (np.asarray(ys) - LABEL_OFFSET).tolist()
+        handles = np.zeros((len(xs), PRIM_COUNT), dtype=np.int64)
+        for color, index in color_groups(colors):
+            lc.lcPropPutStr(self.lc_drw, lc.LC_PROP_DRW_COLOR, color)
+            for i in index.tolist():
+                x, y = xs[i], ys[i]
+                handles[i] = (
+                    lc.lcBlockAddBlockRef(hBlock, self.symbol, x, y, radii[i], 0),
+                    lc.lcBlockAddTextWin2(hBlock, labels[i], x, label_ys[i], 0, LABEL_HEIGHT, 1.0, 0, 0),
+                )
+        return handles
+
+    def set_colors(self, handles, colors):
+        for handle, color in zip(handles.tolist(), color_strings(colors)):
+            lc.lcPropPutStr(handle, lc.LC_PROP_ENT_COLOR, color)
+
+    def remove(self, handles):
+        for handle in np.ravel(handles).tolist():
+            lc.lcEntErase(handle, True)
+
+    def set_visible(self, handles, visible):
+        for handle in np.ravel(handles).tolist():
+            lc.lcPropPutBool(handle, lc.LC_PROP_ENT_VISIBLE, visible)
+
+    def set_points_only(self, points_only):
+        lc.lcPropPutBool(self.circle_layer, lc.LC_PROP_LAYER_VISIBLE, not points_only)
+
+    def create_group(self, name, color):
+        group = lc.lcDrwAddLayer(self.lc_drw, name, color_strings(color[None])[0], self.linetype, 0)
+        lc.lcPropPutBool(group, lc.LC_PROP_LAYER_LOCKED, True)
+        lc.lcPropPutBool(group, lc.LC_PROP_LAYER_VISIBLE, True)
+        return group
+
+    def set_group_color(self, group, color):
+        lc.lcPropPutStr(group, lc.LC_PROP_LAYER_COLOR, color_strings(color[None])[0])
+
+    def delete_group(self, group):
+        lc.lcDrwDeleteObject(self.lc_drw, group)
+
+    def assign_group(self, handles, group):
+        for handle in np.ravel(handles).tolist():
+            lc.lcPropPutHandle(handle, lc.LC_PROP_ENT_LAYER, group)
+            lc.lcPropPutStr(handle, lc.LC_PROP_ENT_COLOR, "ByLayer")
+
+    def release_group(self, handles, layer):
+        for handle in np.ravel(handles).tolist():
+            lc.lcPropPutHandle(handle, lc.LC_PROP_ENT_LAYER, layer)
+
+    def redraw(self):
+        lc.lcBlockUpdate(self.block(), True, 0)
+        lc.lcWndRedraw(self.lc_wnd)
+
+    def zoom_in(self):
+        lc.lcWndExeCommand(self.lc_wnd, lc.LC_CMD_ZOOM_IN, 0)
+
+    def zoom_out(self):
+        lc.lcWndExeCommand(self.lc_wnd, lc.LC_CMD_ZOOM_OUT, 0)
+
+    def zoom_extents(self):
+        lc.lcWndExeCommand(self.lc_wnd, lc.LC_CMD_ZOOM_EXT, 0)
+
+    def window_to_world(self, px, py):
+        x = ctypes.c_double()
+        y = ctypes.c_double()
+        lc.lcCoordWndToDrw(self.lc_wnd, int(px), int(py), ctypes.pointer(x), ctypes.pointer(y))
+        return x.value, y.value
+
+    def world_to_window(self, x, y):
+        px = ctypes.c_int()
+        py = ctypes.c_int()
+        lc.lcCoordDrwToWnd(self.lc_wnd, x, y, ctypes.pointer(px), ctypes.pointer(py))
+        return px.value, py.value
+
+    def can_undo(self):
+        return True
+
+    def undo(self):
+        lc.lcWndExeCommand(self.lc_wnd, lc.LC_CMD_UNDO, 0)
+
+    def can_redo(self):
+        return True
+
+    def redo(self):
+        lc.lcWndExeCommand(self.lc_wnd, lc.LC_CMD_REDO, 0)
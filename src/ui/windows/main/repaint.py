@@ -0,0 +1,123 @@
+import threading
+import time
+from collections import deque
+
+import wx
+
+# Пауза после последнего изменения перед фоновым пересчетом цветов, мс
+DEBOUNCE_MS = 30
+# Через сколько после последнего изменения выполняется точный проход, мс
+SETTLE_MS = 300
+# Время на применение цветов за один кадр, с
+FRAME_BUDGET = 0.012
+# Интервал между кадрами применения, мс
+FRAME_INTERVAL_MS = 16
+# Событий в одной порции set_colors
+APPLY_CHUNK = 5000
+
+
+class RepaintScheduler:
+    """
+    Прослойка между панелью свойств и PlotWidget при смене цветовой схемы.
+    Серия изменений схлопывается до последнего значения, цвета считаются
+    в рабочем потоке и применяются порциями, не дольше FRAME_BUDGET за кадр.
+    Когда изменения прекращаются на SETTLE_MS, выполняется обычный
+    PlotWidget.repaint, который досылает все, что не успело примениться.
+    """
+
+    def __init__(self, plot):
+        self.plot = plot
+        # Последнее запрошенное значение (схема, число классов), None - нечего делать
+        self.pending = None
+        # Номер запроса, результаты старых запросов отбрасываются
+        self.generation = 0
+        self.worker = None
+        self.batches = deque()
+        self.debounce = None
+        self.settle = None
+
+    def request(self, color_scheme, color_classes=0):
+        self.generation += 1
+        self.pending = (color_scheme, color_classes)
+        self.batches.clear()
+        self.debounce = self.restart(self.debounce, DEBOUNCE_MS, self.start_compute)
+        self.settle = self.restart(self.settle, SETTLE_MS, self.finish)
+
+    @staticmethod
+    def restart(timer, ms, callback):
+        if timer is None:
+            return wx.CallLater(ms, callback)
+        timer.Restart(ms)
+        return timer
+
+    def cancel(self):
+        self.pending = None
+        self.generation += 1
+        self.batches.clear()
+        for timer in (self.debounce, self.settle):
+            if timer is not None:
+                timer.Stop()
+
+    def start_compute(self):
+        if self.pending is None or self.worker is not None:
+            # Занятый поток по окончании сам запустит расчет для нового значения
+            return
+        color_scheme, color_classes = self.pending
+        plot = self.plot
+        if color_classes != plot.color_classes or color_classes > 0:
+            # Классы перекрашиваются за O(число классов), фоновый расчет не нужен
+            plot.set_color_classes(color_classes)
+            plot.apply_color_scheme(color_scheme)
+            return
+        plot.set_color_scheme(color_scheme)
+        plot.update_reference()
+        snapshot = [item for item in plot.color_snapshot() if item[2] is not None]
+        generation = self.generation
+
+        def compute():
+            result = plot.compute_colors(color_scheme, snapshot)
+            wx.CallAfter(self.on_computed, generation, result)
+
+        self.worker = threading.Thread(target=compute, daemon=True)
+        self.worker.start()
+
+    def on_computed(self, generation, result):
+        self.worker = None
+        if generation != self.generation:
+            self.start_compute()
+            return
+        for collection, changed, colors in result:
+            if len(changed) == 0:
+                continue
+            handles = collection.handles()
+            for start in range(0, len(changed), APPLY_CHUNK):
+                end = start + APPLY_CHUNK
+                self.batches.append(
+                    (generation, collection, changed[start:end], colors[start:end], handles)
+                )
+        if len(self.batches) > 0:
+            self.apply_step()
+
+    def apply_step(self):
+        start = time.perf_counter()
+        applied = False
+        while len(self.batches) > 0 and time.perf_counter() - start < FRAME_BUDGET:
+            generation, collection, index, colors, handles = self.batches.popleft()
+            if generation == self.generation:
+                self.plot.apply_colors(collection, index, colors, handles)
+                applied = True
+        if applied:
+            self.plot.backend.redraw()
+        if len(self.batches) > 0:
+            wx.CallLater(FRAME_INTERVAL_MS, self.apply_step)
+
+    def finish(self):
+        if self.pending is None:
+            return
+        if self.worker is not None or len(self.batches) > 0:
+            self.settle.Restart(SETTLE_MS)
+            return
+        color_scheme, color_classes = self.pending
+        self.pending = None
+        self.plot.set_color_classes(color_classes)
+        self.plot.apply_color_scheme(color_scheme)
@@ -0,0 +1,187 @@
+from dataclasses import dataclass
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from src.catalog import EventTable
+from .render import PRIM_COUNT
+from .clusters import ClusterGrid, ShownClusters
+from .labels import label_lengths
+from .spatial import GridIndex
+
+
+@dataclass
+class Event:
+    """Одно событие коллекции, создается по запросу из столбцов."""
+
+    x: float
+    y: float
+    z: float
+    energy: float
+    primitives: np.ndarray
+
+
+class EventsView(Sequence):
+    """Последовательность Event поверх столбцов коллекции, для совместимости со списком событий."""
+
+    def __init__(self, collection: "EventsCollection"):
+        self.collection = collection
+
+    def __len__(self):
+        return len(self.collection)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        collection = self.collection
+        index = int(index)
+        if index < 0:
+            index += len(collection)
+        if not 0 <= index < len(collection):
+            raise IndexError(index)
+        return Event(
+            float(collection.x[index]),
+            float(collection.y[index]),
+            float(collection.z[index]),
+            float(collection.energy[index]),
+            collection.primitives[index],
+        )
+
+
+class ColumnBuffers:
+    """
+    Буферы столбцов с запасом емкости: при нехватке емкость удваивается,
+    поэтому добавление порциями стоит амортизированно O(размера порции),
+    а не O(всего столбца), как concatenate. Наружу отдаются срезы
+    заполненной части буферов, запись по индексам в них попадает в буфер.
+    """
+
+    def __init__(self):
+        self.buffers: Dict[str, np.ndarray] = {}
+        self.views: Dict[str, np.ndarray] = {}
+
+    def append(self, name: str, current: np.ndarray, values: np.ndarray) -> np.ndarray:
+        """current с values в конце; current - последний срез name или замененный снаружи столбец."""
+        count = len(current)
+        needed = count + len(values)
+        # Замененный снаружи столбец не пишется на месте, дальше растет его копия
+        buffer = self.buffers[name] if self.holds(name, current) else current
+        if needed > len(buffer) or buffer is current:
+            grown = np.empty((max(needed, 2 * count),) + current.shape[1:], dtype=current.dtype)
+            grown[:count] = current
+            buffer = grown
+        buffer[count:needed] = values
+        self.buffers[name] = buffer
+        self.views[name] = buffer[:needed]
+        return self.views[name]
+
+    def holds(self, name: str, column: np.ndarray) -> bool:
+        """column - текущий срез буфера name, а не замененный снаружи столбец."""
+        return self.views.get(name) is column
+
+    def nbytes(self) -> int:
+        """Память буферов по емкости, а не по заполненной части."""
+        return sum(buffer.nbytes for buffer in self.buffers.values())
+
+
+class EventsCollection:
+    """
+    Коллекция событий одного импорта, хранится столбцами: координаты,
+    энергия и время - в EventTable, текущие цвета - (N, 3) uint8,
+    описатели примитивов отрисовки - (N, PRIM_COUNT) int64. Объекты Event
+    создаются только при обращении через events.
+    """
+
+    def __init__(self, layer, with_time=False):
+        self.layer = layer
+        self.table = EventTable.empty(with_time=with_time)
+        self.buffers = ColumnBuffers()
+        # Текущие собственные цвета событий (N, 3), None - неизвестны
+        self.colors = np.empty((0, 3), dtype=np.uint8)
+        self.primitives = np.empty((0, PRIM_COUNT), dtype=np.int64)
+        # Номер цветового класса события в режиме классов, None - не распределены
+        self.classes: np.ndarray = None
+        self.events = EventsView(self)
+        # Сетка по x/y для поиска события под курсором и отбора видимых
+        self.index = GridIndex()
+        # Номера событий, примитивы которых сейчас показаны, по возрастанию
+        self.visible = np.empty(0, dtype=np.int64)
+        # Длины подписей событий для расстановки, сами строки формируются по запросу
+        self.label_lengths = np.empty(0, dtype=np.int32)
+        # Номера событий с показанной подписью, по возрастанию
+        self.labeled = np.empty(0, dtype=np.int64)
+        # Наибольший радиус символа, запас при отборе по видимой области
+        self.reach = 0.0
+        # Иерархия сеток для скоплений, их символы рисуются в отдельном слое
+        self.clusters = ClusterGrid()
+        self.shown_clusters = ShownClusters()
+        self.cluster_layer = None
+
+    def __len__(self):
+        return len(self.table)
+
+    @property
+    def x(self) -> np.ndarray:
+        return self.table.x
+
+    @property
+    def y(self) -> np.ndarray:
+        return self.table.y
+
+    @property
+    def z(self) -> np.ndarray:
+        return self.table.z
+
+    @property
+    def energy(self) -> np.ndarray:
+        return self.table.value
+
+    def handles(self) -> np.ndarray:
+        return self.primitives
+
+    def append(self, table: EventTable, colors: np.ndarray, primitives: np.ndarray, labels: List[str] = None):
+        if labels is None:
+            labels = [""] * len(table)
+        buffers = self.buffers
+        self.label_lengths = buffers.append("label_lengths", self.label_lengths, label_lengths(labels))
+        old = self.table
+        with_time = old.time is not None and table.time is not None
+        self.table = EventTable(
+            x=buffers.append("x", old.x, table.x),
+            y=buffers.append("y", old.y, table.y),
+            z=buffers.append("z", old.z, table.z),
+            value=buffers.append("value", old.value, table.value),
+            time=buffers.append("time", old.time, table.time) if with_time else None,
+        )
+        self.index.update(self.table.x, self.table.y)
+        self.primitives = buffers.append("primitives", self.primitives, primitives)
+        if self.colors is not None:
+            self.colors = buffers.append("colors", self.colors, colors)
+
+    def nearest(self, x, y, radius):
+        """Номер ближайшего к точке события не дальше radius и расстояние, -1 если нет."""
+        return self.index.nearest(x, y, self.table.x, self.table.y, radius)
+
+    def nbytes(self) -> int:
+        """Память коллекции: буферы столбцов с запасом, индексы, скопления."""
+        table = self.table
+        columns = {
+            "x": table.x,
+            "y": table.y,
+            "z": table.z,
+            "value": table.value,
+            "time": table.time,
+            "primitives": self.primitives,
+            "colors": self.colors,
+            "label_lengths": self.label_lengths,
+        }
+        total = self.buffers.nbytes()
+        # Замененные снаружи столбцы живут отдельно от буферов
+        for name, column in columns.items():
+            if column is not None and not self.buffers.holds(name, column):
+                total += column.nbytes
+        for column in (self.classes, self.visible, self.labeled):
+            if column is not None:
+                total += column.nbytes
+        return total + self.index.nbytes() + self.clusters.nbytes() + self.shown_clusters.nbytes()
+
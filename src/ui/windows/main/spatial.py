@@ -0,0 +1,170 @@
+import math
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Сколько событий в среднем приходится на ячейку сетки
+TARGET_PER_CELL = 8
+# Сетка перестраивается, когда событий на ячейку становится больше в столько раз
+REGRID_FACTOR = 4
+# Размер ячейки, если по событиям его не определить
+DEFAULT_CELL_SIZE = 10.0
+# Дальше скольких колец ячеек поиск ближайшего не идет
+MAX_RINGS = 32
+# Обход одной ячейки по цене примерно как проверка стольких событий подряд
+CELL_COST = 256
+# Упаковка номера ячейки (cx, cy) в один int64
+_CELL_BITS = 32
+_CELL_MASK = (1 << _CELL_BITS) - 1
+
+
+def cell_key(cx, cy):
+    # Одинаковый результат для int и массивов int64 при |cx|, |cy| < 2**31
+    return (cx << _CELL_BITS) + (cy & _CELL_MASK)
+
+
+class GridIndex:
+    """
+    Равномерная сетка над координатами x/y коллекции для поиска ближайшего
+    события. Новые события дописываются в ячейки без перестроения; когда
+    событий становится в REGRID_FACTOR раз больше, чем рассчитана сетка,
+    она строится заново с меньшей ячейкой (в сумме O(N) на все добавления).
+    В ячейке хранятся номера событий, координаты берутся из столбцов коллекции.
+    """
+
+    def __init__(self):
+        self.cell_size: Optional[float] = None
+        self.cells: Dict[int, List[np.ndarray]] = {}
+        self.count = 0
+        # На сколько событий рассчитан текущий размер ячейки
+        self.planned = 0
+
+    def __len__(self):
+        return self.count
+
+    @staticmethod
+    def guess_cell_size(x: np.ndarray, y: np.ndarray) -> float:
+        finite = np.isfinite(x) & np.isfinite(y)
+        count = int(finite.sum())
+        if count < 2:
+            return DEFAULT_CELL_SIZE
+        x, y = x[finite], y[finite]
+        width = float(x.max() - x.min())
+        height = float(y.max() - y.min())
+        # Для вытянутых облаков площадь считается не меньше квадрата большей стороны на число событий
+        area = max(width * height, max(width, height) ** 2 / count)
+        if area <= 0:
+            return DEFAULT_CELL_SIZE
+        return math.sqrt(area * TARGET_PER_CELL / count)
+
+    def update(self, xs: np.ndarray, ys: np.ndarray):
+        """Учесть события коллекции с номерами от len(self) до len(xs)."""
+        total = len(xs)
+        if total <= self.count:
+            return
+        if self.cell_size is None or total > self.planned * REGRID_FACTOR:
+            self.cell_size = self.guess_cell_size(xs, ys)
+            self.planned = total
+            self.cells = {}
+            self.count = 0
+        self.add(self.count, xs[self.count :], ys[self.count :])
+
+    def add(self, start: int, x: np.ndarray, y: np.ndarray):
+        finite = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+        cx = np.floor(x[finite] / self.cell_size).astype(np.int64)
+        cy = np.floor(y[finite] / self.cell_size).astype(np.int64)
+        keys = cell_key(cx, cy)
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        bounds = np.flatnonzero(np.diff(keys)) + 1
+        indices = finite[order] + start
+        cells = self.cells
+        for key, part in zip(keys[np.r_[0, bounds]].tolist() if len(keys) else [], np.split(indices, bounds)):
+            parts = cells.get(key)
+            if parts is None:
+                cells[key] = [part]
+            else:
+                parts.append(part)
+        self.count += len(x)
+
+    def nbytes(self) -> int:
+        return sum(part.nbytes for parts in self.cells.values() for part in parts)
+
+    def cell(self, key) -> Optional[np.ndarray]:
+        parts = self.cells.get(key)
+        if parts is None:
+            return None
+        if len(parts) > 1:
+            # Порции, дописанные в ячейку, склеиваются при первом запросе
+            parts[:] = [np.concatenate(parts)]
+        return parts[0]
+
+    def nearest(self, px, py, xs: np.ndarray, ys: np.ndarray, radius=math.inf) -> Tuple[int, float]:
+        """
+        Ближайшее к (px, py) событие не дальше radius: (номер, расстояние),
+        (-1, inf) если такого нет. xs, ys - текущие столбцы коллекции.
+        Кольца ячеек обходятся от центра, пока кольцо не окажется дальше
+        найденного расстояния.
+        """
+        if self.count == 0:
+            return -1, math.inf
+        size = self.cell_size
+        cx = math.floor(px / size)
+        cy = math.floor(py / size)
+        best_index, best_dist = -1, math.inf
+        rings = min(MAX_RINGS, int(radius / size) + 1) if math.isfinite(radius) else MAX_RINGS
+        for ring in range(rings + 1):
+            # Точки кольца ring не ближе (ring - 1) * size
+            if (ring - 1) * size > min(best_dist, radius):
+                break
+            for kx, ky in self.ring_cells(cx, cy, ring):
+                index = self.cell(cell_key(kx, ky))
+                if index is None:
+                    continue
+                dist = np.hypot(xs[index] - px, ys[index] - py)
+                i = int(np.argmin(dist))
+                if dist[i] < best_dist:
+                    best_index, best_dist = int(index[i]), float(dist[i])
+        if best_dist > radius:
+            return -1, math.inf
+        return best_index, best_dist
+
+    def query_rect(self, x0, y0, x1, y1, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """
+        Номера событий внутри прямоугольника по возрастанию. Если ячеек
+        в прямоугольнике больше, чем стоит полный просмотр столбцов,
+        события проверяются все сразу.
+        """
+        if self.count == 0:
+            return np.empty(0, dtype=np.int64)
+        size = self.cell_size
+        kx0, kx1 = math.floor(x0 / size), math.floor(x1 / size)
+        ky0, ky1 = math.floor(y0 / size), math.floor(y1 / size)
+        if (kx1 - kx0 + 1) * (ky1 - ky0 + 1) * CELL_COST >= self.count:
+            xs, ys = xs[: self.count], ys[: self.count]
+            return np.flatnonzero((xs >= x0) & (xs <= x1) & (ys >= y0) & (ys <= y1))
+        parts = []
+        for kx in range(kx0, kx1 + 1):
+            for ky in range(ky0, ky1 + 1):
+                index = self.cell(cell_key(kx, ky))
+                if index is not None:
+                    parts.append(index)
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        index = np.concatenate(parts)
+        x, y = xs[index], ys[index]
+        index = index[(x >= x0) & (x <= x1) & (y >= y0) & (y <= y1)]
+        index.sort()
+        return index
+
+    @staticmethod
+    def ring_cells(cx, cy, ring):
+        if ring == 0:
+            yield cx, cy
+            return
+        for dx in range(-ring, ring + 1):
+            yield cx + dx, cy - ring
+            yield cx + dx, cy + ring
+        for dy in range(-ring + 1, ring):
+            yield cx - ring, cy + dy
+            yield cx + ring, cy + dy
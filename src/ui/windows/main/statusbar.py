@@ -1,3 +1,44 @@
 import wx
+import wx.lib.newevent
 
-class MainStatubar(wx.StatusBar): ...
\ No newline at end of file
+CancelEvent, EVT_STATUS_CANCEL = wx.lib.newevent.NewEvent()
+
+
+class MainStatubar(wx.StatusBar):
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.SetFieldsCount(2, [-1, 260])
+        self.gauge = wx.Gauge(self, range=1000, style=wx.GA_HORIZONTAL | wx.GA_SMOOTH)
+        self.btn_cancel = wx.Button(self, label="Отмена", style=wx.BU_EXACTFIT)
+        self.gauge.Hide()
+        self.btn_cancel.Hide()
+        self.btn_cancel.Bind(wx.EVT_BUTTON, self.on_cancel)
+        self.Bind(wx.EVT_SIZE, self.on_size)
+
+    def on_size(self, event):
+        rect: wx.Rect = self.GetFieldRect(1)
+        bw = self.btn_cancel.GetBestSize().GetWidth()
+        self.gauge.SetRect(wx.Rect(rect.x + 1, rect.y + 1, rect.width - bw - 4, rect.height - 2))
+        self.btn_cancel.SetRect(wx.Rect(rect.x + rect.width - bw - 1, rect.y, bw, rect.height))
+        event.Skip()
+
+    def on_cancel(self, event):
+        self.btn_cancel.Disable()
+        wx.PostEvent(self, CancelEvent())
+
+    def start_progress(self, text):
+        self.SetStatusText(text, 0)
+        self.gauge.SetValue(0)
+        self.gauge.Show()
+        self.btn_cancel.Enable()
+        self.btn_cancel.Show()
+
+    def set_progress(self, fraction, text=None):
+        self.gauge.SetValue(int(max(0.0, min(fraction, 1.0)) * 1000))
+        if text is not None:
+            self.SetStatusText(text, 0)
+
+    def finish_progress(self, text=""):
+        self.gauge.Hide()
+        self.btn_cancel.Hide()
+        self.SetStatusText(text, 0)
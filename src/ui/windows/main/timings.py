@@ -0,0 +1,42 @@
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+# Подписи этапов для строки состояния
+PHASE_LABELS = {
+    "parse": "разбор",
+    "colors": "цвета",
+    "labels": "подписи",
+    "create": "примитивы",
+}
+
+
+class PhaseTimings:
+    """Накопитель времени по этапам загрузки событий, с."""
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+
+    @contextmanager
+    def measure(self, phase):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(phase, time.perf_counter() - start)
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def merge(self, other: "PhaseTimings"):
+        for phase, seconds in other.phases.items():
+            self.add(phase, seconds)
+
+    def total(self):
+        return sum(self.phases.values())
+
+    def __str__(self):
+        return ", ".join(
+            "%s %.2f с" % (PHASE_LABELS.get(phase, phase), seconds)
+            for phase, seconds in self.phases.items()
+        )
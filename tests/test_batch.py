@@ -0,0 +1,87 @@
+import numpy as np
+
+from src.catalog import TIME_NONE, EventTable, deduplicate
+
+
+def table(x, y=None, z=None, time=None):
+    x = np.asarray(x, dtype=np.float64)
+    zeros = np.zeros(len(x))
+    return EventTable(
+        x=x,
+        y=zeros if y is None else np.asarray(y, dtype=np.float64),
+        z=zeros if z is None else np.asarray(z, dtype=np.float64),
+        value=np.arange(len(x), dtype=np.float64),
+        time=None if time is None else np.asarray(time, dtype=np.int64),
+    )
+
+
+def greedy(events, tolerance, time_tolerance):
+    kept = []
+    for i in range(len(events)):
+        for j in kept:
+            close = all(
+                abs(c[i] - c[j]) <= tolerance for c in (events.x, events.y, events.z)
+            )
+            if events.time is not None:
+                close &= abs(float(events.time[i]) - float(events.time[j])) <= time_tolerance
+            if close:
+                break
+        else:
+            kept.append(i)
+    return kept
+
+
+def test_deduplicate_without_time():
+    events = table([0.0, 0.2, 5.0, 5.4, 0.1], [0.0, 0.1, 0.0, 0.0, 0.6])
+    result, removed = deduplicate(events, 0.5)
+    assert removed == 2
+    assert result.value.tolist() == [0, 2, 4]
+
+
+def test_deduplicate_zero_time_tolerance_needs_equal_time():
+    events = table([0.0, 0.0, 0.1, 0.0], time=[100, 160, 100, TIME_NONE])
+    result, removed = deduplicate(events, 0.5, 0)
+    assert removed == 1
+    assert result.value.tolist() == [0, 1, 3]
+    result, removed = deduplicate(events, 0.5, 60)
+    assert result.value.tolist() == [0, 3]
+
+
+def test_deduplicate_across_cell_boundary():
+    # 0.49 и 0.51 в разных ячейках floor(x / 0.5), но в пределах допуска
+    events = table([0.49, 0.51, 1.6, 1.4])
+    result, removed = deduplicate(events, 0.5)
+    assert result.value.tolist() == [0, 2]
+    assert removed == 2
+
+
+def test_deduplicate_keeps_chain_links():
+    # 1 повтор 0, 2 рядом только с 1: остается, потому что 1 удален
+    events = table([0.0, 0.4, 0.8])
+    result, removed = deduplicate(events, 0.5)
+    assert result.value.tolist() == [0, 2]
+
+
+def test_deduplicate_matches_greedy_pass():
+    rng = np.random.default_rng(7)
+    for _ in range(50):
+        n = int(rng.integers(1, 60))
+        events = table(
+            rng.integers(0, 6, n) * 0.3,
+            rng.integers(0, 3, n) * 0.3,
+            time=rng.integers(0, 4, n) * 30,
+        )
+        for tolerance, time_tolerance in [(0.3, 0), (0.3, 30), (0.5, 60)]:
+            result, removed = deduplicate(events, tolerance, time_tolerance)
+            kept = greedy(events, tolerance, time_tolerance)
+            assert result.value.tolist() == kept
+            assert removed == n - len(kept)
+
+
+def test_deduplicate_dense_catalog():
+    rng = np.random.default_rng(3)
+    x = rng.random(300_000) * 100
+    result, removed = deduplicate(table(x), 0.5)
+    assert len(result) + removed == len(x)
+    kept = np.sort(result.x)
+    assert (np.diff(kept) > 0.5).all()
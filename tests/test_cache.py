@@ -0,0 +1,90 @@
+import os
+
+import numpy as np
+
+from src.catalog import CatalogCache, EventTable, FileFingerprint
+
+
+def write(path, text):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(text)
+
+
+def events(count, with_time=True):
+    return EventTable(
+        x=np.arange(count, dtype=np.float64),
+        y=np.zeros(count),
+        z=np.ones(count),
+        value=np.full(count, 10.0),
+        time=np.arange(count, dtype=np.int64) if with_time else None,
+    )
+
+
+def put(cache, path, mapping, table):
+    return cache.put(FileFingerprint.of(path), ";", mapping, ["x", "y", "z", "e"], table)
+
+
+def test_cache_roundtrip_and_key(tmp_path):
+    path = str(tmp_path / "catalog.csv")
+    write(path, "x;y;z;e\n1;2;3;4\n")
+    cache = CatalogCache(str(tmp_path / "cache"))
+    entry = put(cache, path, [0, 1, 2, 3], events(5))
+    assert entry.rows == 5 and entry.header == ["x", "y", "z", "e"]
+
+    found = cache.get(path, ";", [0, 1, 2, 3])
+    assert found.key == entry.key
+    table = found.load()
+    assert isinstance(table.x, np.memmap)
+    assert table.x.tolist() == [0, 1, 2, 3, 4]
+    assert table.time.tolist() == [0, 1, 2, 3, 4]
+    # Другие соответствие колонок или разделитель - другой ключ
+    assert cache.get(path, ";", [1, 0, 2, 3]) is None
+    assert cache.get(path, ",", [0, 1, 2, 3]) is None
+    assert cache.find(path, ";").key == entry.key
+
+
+def test_cache_invalidated_by_changed_file(tmp_path):
+    path = str(tmp_path / "catalog.csv")
+    write(path, "x;y;z;e\n1;2;3;4\n")
+    cache = CatalogCache(str(tmp_path / "cache"))
+    fingerprint = FileFingerprint.of(path)
+    put(cache, path, [0, 1, 2, 3], events(1))
+    write(path, "x;y;z;e\n1;2;3;4\n5;6;7;8\n")
+    assert cache.get(path, ";", [0, 1, 2, 3]) is None
+    assert cache.find(path, ";") is None
+    # Файл изменился после снятия отпечатка: таблица не сохраняется
+    assert cache.put(fingerprint, ";", [0, 1, 2, 3], [], events(2)) is None
+    assert len(cache.entries()) == 1
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = CatalogCache(str(tmp_path / "cache"))
+    paths = []
+    for i in range(3):
+        path = str(tmp_path / ("catalog%d.csv" % i))
+        write(path, "x;y;z;e\n%d;2;3;4\n" % i)
+        paths.append(path)
+        entry = put(cache, path, [0, 1, 2, 3], events(100, with_time=False))
+        meta = os.path.join(entry.dir, "meta.json")
+        os.utime(meta, (1000 + i, 1000 + i))
+    size = cache.entries()[0].size
+    cache.get(paths[0], ";", [0, 1, 2, 3])
+    cache.limit = 2 * size
+    cache.evict()
+    assert cache.get(paths[1], ";", [0, 1, 2, 3]) is None
+    assert cache.get(paths[0], ";", [0, 1, 2, 3]) is not None
+    assert cache.total_size() == 2 * size
+
+    # Только что записанная запись остается, даже если одна не помещается
+    cache.limit = 0
+    entry = put(cache, paths[1], [0, 1, 2, 3], events(100, with_time=False))
+    assert [e.key for e in cache.entries()] == [entry.key]
+    cache.clear()
+    assert cache.entries() == []
+
+
+def test_cache_skips_unfinished_entries(tmp_path):
+    cache = CatalogCache(str(tmp_path / "cache"))
+    os.makedirs(os.path.join(cache.path, "abc.tmp"))
+    write(os.path.join(cache.path, "abc.tmp", "meta.json"), "{}")
+    assert cache.entries() == []
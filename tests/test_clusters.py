@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("wx")
+
+from src.ui.windows.main.clusters import ClusterGrid, GridLevel
+
+
+def points(count, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.normal(0, 50, count)
+    y = rng.normal(0, 20, count)
+    x[::101] = np.nan
+    return x, y, rng.uniform(1, 100, count)
+
+
+def assert_same_level(level, expected):
+    assert level.keys.tolist() == expected.keys.tolist()
+    assert level.count.tolist() == expected.count.tolist()
+    assert np.allclose(level.energy, expected.energy)
+    assert np.allclose(level.sx, expected.sx)
+    assert np.allclose(level.sy, expected.sy)
+
+
+def test_levels_aggregate_bottom_up():
+    x, y, energy = points(5000)
+    grid = ClusterGrid(depth=8)
+    grid.build(x, y, energy)
+    finite = int(np.isfinite(x).sum())
+    for index in range(8):
+        level = grid.level(index, x, y, energy)
+        assert level.count.sum() == finite
+        # Уровень из нижнего совпадает с уровнем, собранным прямо из точек
+        assert_same_level(level, GridLevel.from_points(x, y, energy, grid.cell_size(index)))
+
+
+def test_level_catches_up_with_appended_events():
+    x, y, energy = points(3000, 1)
+    grid = ClusterGrid(depth=6)
+    grid.build(x[:1000], y[:1000], energy[:1000])
+    level = grid.level(4, x, y, energy)
+    assert level.covered == len(x)
+    assert_same_level(level, GridLevel.from_points(x, y, energy, grid.cell_size(4)))
+    # Остальные уровни досчитываются только при обращении
+    assert grid.levels[3].covered == 1000
+
+
+def test_choose_level_select_and_members():
+    grid = ClusterGrid(depth=10)
+    assert grid.choose_level(0.01, 20) == -1
+    assert grid.choose_level(1.0, 20) == 5
+    assert grid.choose_level(1e6, 20) == 9
+
+    x = np.array([0.1, 0.2, 0.3, 0.4, 0.5, 10.5, 10.6])
+    y = np.array([0.1, 0.2, 0.3, 0.4, 0.5, 0.5, 0.6])
+    energy = np.ones(len(x))
+    grid.build(x, y, energy)
+    level = grid.level(0, x, y, energy)
+    cells = level.select(-1, -1, 20, 20, min_count=5)
+    assert level.count[cells].tolist() == [5]
+    assert grid.members(0, x, y, min_count=5).tolist() == [True] * 5 + [False] * 2
+    assert level.lookup(np.array([0, 3]), np.array([0, 3])).tolist()[1] == -1
@@ -0,0 +1,128 @@
+import math
+
+import numpy as np
+import pytest
+
+pytest.importorskip("wx")
+
+from src.catalog import QuantileSketch
+from src.ui.widgets.color_scheme import (
+    AXIS_LINEAR,
+    AXIS_LOG10,
+    AXIS_QUANTILE,
+    INTERPOL_MODE_COSINE,
+    INTERPOL_MODE_FLAT_END,
+    INTERPOL_MODE_FLAT_MIDDLE,
+    INTERPOL_MODE_FLAT_START,
+    INTERPOL_MODE_LINEAR,
+    INTERPOL_MODE_REVERSE,
+    ColorScheme,
+    get_interpol_color_by_pos,
+)
+from src.ui.widgets.color_scheme.color_scheme import LUT_SIZE
+
+SCHEMA = [(0, 0, 255, 0.0), (0, 255, 0, 300.0), (255, 255, 0, 700.0), (255, 0, 0, 1000.0)]
+
+
+def scalar_color(schema, pos, mode):
+    """Прежний расчет цвета одного события по сегменту схемы, pos внутри схемы."""
+    for c0, c1 in zip(schema, schema[1:]):
+        if c0[3] <= pos <= c1[3]:
+            ratio = (pos - c0[3]) / (c1[3] - c0[3])
+            ratio = {
+                INTERPOL_MODE_LINEAR: ratio,
+                INTERPOL_MODE_REVERSE: 1 - ratio,
+                INTERPOL_MODE_COSINE: (1 - math.cos(ratio * math.pi)) / 2,
+                INTERPOL_MODE_FLAT_START: 0.0,
+                INTERPOL_MODE_FLAT_MIDDLE: 0.5,
+                INTERPOL_MODE_FLAT_END: 1.0,
+            }[mode]
+            return tuple(int(a + ratio * (b - a)) for a, b in zip(c0[:3], c1[:3]))
+
+
+@pytest.mark.parametrize(
+    "mode",
+    [
+        INTERPOL_MODE_LINEAR,
+        INTERPOL_MODE_REVERSE,
+        INTERPOL_MODE_COSINE,
+        INTERPOL_MODE_FLAT_START,
+        INTERPOL_MODE_FLAT_MIDDLE,
+        INTERPOL_MODE_FLAT_END,
+    ],
+)
+def test_lut_matches_scalar_colors(mode):
+    scheme = ColorScheme(list(SCHEMA))
+    values = np.random.default_rng(mode).uniform(0, 1000, 2000)
+    # У ступенчатых режимов цвет рвется на точках схемы, там таблица может взять соседний сегмент
+    step = 1000 / (LUT_SIZE - 1)
+    stops = np.array([o[3] for o in SCHEMA])
+    values = values[np.abs(values[:, None] - stops).min(axis=1) > step]
+    colors = scheme.map_colors(values, mode)
+    expected = np.array([scalar_color(SCHEMA, v, mode) for v in values.tolist()])
+    # Таблица округляет, прежний расчет отбрасывал дробную часть
+    assert np.abs(colors.astype(int) - expected).max() <= 2
+
+
+def test_map_colors_clamps_and_handles_nan():
+    scheme = ColorScheme(list(SCHEMA))
+    colors = scheme.map_colors([-1e9, 1e9, np.nan])
+    assert colors.tolist() == [[0, 0, 255], [255, 0, 0], [0, 0, 255]]
+    # За пределами схемы - цвет края в том же режиме
+    edges = scheme.map_colors([0.0, 1000.0], INTERPOL_MODE_REVERSE)
+    assert (scheme.map_colors([-5.0, 2000.0], INTERPOL_MODE_REVERSE) == edges).all()
+    single = get_interpol_color_by_pos(scheme, 1000.0)
+    assert (single.Red(), single.Green(), single.Blue()) == (255, 0, 0)
+
+
+def test_lut_rebuilt_after_in_place_edit():
+    scheme = ColorScheme(list(SCHEMA))
+    first = scheme.lut()
+    assert scheme.lut() is first
+    scheme.schema[0] = (255, 255, 255, 0.0)
+    assert scheme.lut() is not first
+    assert scheme.map_colors([0.0]).tolist() == [[255, 255, 255]]
+
+
+def test_log10_axis():
+    scheme = ColorScheme([(0, 0, 0, 2.0), (255, 255, 255, 6.0)], AXIS_LOG10)
+    assert scheme.transform([100.0, 1e6, 0.0]).tolist() == [2.0, 6.0, 0.0]
+    assert scheme.map_colors([1e4]).tolist() == [[128, 128, 128]]
+    assert np.allclose(scheme.inverse([2.0, 6.0]), [100.0, 1e6])
+
+
+def test_quantile_axis():
+    scheme = ColorScheme([(0, 0, 0, 0.0), (255, 255, 255, 1.0)], AXIS_QUANTILE)
+    # Без опорных квантилей распределение неизвестно
+    assert scheme.transform([1.0, 5.0]).tolist() == [0.0, 0.0]
+    scheme.set_reference(np.arange(1001, dtype=np.float64) ** 2)
+    assert np.allclose(scheme.transform([0.0, 250000.0, 1e6]), [0.0, 0.5, 1.0])
+    assert scheme.map_colors([250000.0]).tolist() == [[128, 128, 128]]
+
+
+def test_axis_conversion_and_serialization():
+    linear = ColorScheme([(0, 0, 0, 100.0), (255, 255, 255, 1e6)])
+    log = linear.with_axis(AXIS_LOG10)
+    assert [o[3] for o in log.schema] == [2.0, 6.0]
+    assert np.allclose([o[3] for o in log.with_axis(AXIS_LINEAR).schema], [100.0, 1e6])
+    quantile = linear.with_axis(AXIS_QUANTILE)
+    assert [o[3] for o in quantile.schema] == [0.0, 1.0]
+
+    restored = ColorScheme.from_string(log.to_string())
+    assert restored.axis == AXIS_LOG10 and restored.schema == log.schema
+    # Линейная схема пишется прежним списком точек
+    assert linear.to_string().startswith("[")
+    assert ColorScheme.from_string(linear.to_string()).axis == AXIS_LINEAR
+
+
+def test_fit_to_sketch_percentiles():
+    sketch = QuantileSketch()
+    sketch.add(np.arange(1, 10001, dtype=np.float64))
+    scheme = ColorScheme([(0, 0, 0, 0.0), (255, 255, 255, 1.0)], AXIS_LOG10)
+    fitted = scheme.fit(sketch, [2, 98])
+    assert [o[:3] for o in fitted.schema] == [(0, 0, 0), (255, 255, 255)]
+    low, high = (o[3] for o in fitted.schema)
+    assert low == pytest.approx(np.log10(200), abs=0.01)
+    assert high == pytest.approx(np.log10(9800), abs=0.01)
+    # Три процентиля на две точки: цвета берутся из схемы равномерно
+    assert len(scheme.fit(sketch, [2, 50, 98]).schema) == 3
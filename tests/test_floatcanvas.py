@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("wx")
+
+from src.ui.windows.main.render.floatcanvas import SymbolLayer, symbol_bounds
+
+
+def append(layer, x, y, radius):
+    n = len(x)
+    return layer.append(
+        np.asarray(x, dtype=np.float64),
+        np.asarray(y, dtype=np.float64),
+        np.asarray(radius, dtype=np.float64),
+        np.zeros((n, 3), dtype=np.uint8),
+        [str(i) for i in range(n)],
+    )
+
+
+def test_symbol_bounds_skip_non_finite():
+    # Энергия 0 дает радиус 5 * log(0) = -inf, неразобранная ячейка - NaN
+    with np.errstate(divide="ignore"):
+        radius = 5 * np.log(np.array([100.0, 0.0, np.nan, 100.0]))
+    bounds = symbol_bounds(np.array([0.0, 50.0, 60.0, np.nan]), np.array([0.0, 50.0, 0.0, 1.0]), radius)
+    r = 5 * np.log(100.0)
+    assert np.allclose(bounds, [[-r, -r], [60, 50]])
+    assert symbol_bounds(np.array([np.nan]), np.array([0.0]), np.array([1.0])) is None
+
+
+def test_layer_bounds_survive_nan_row():
+    layer = SymbolLayer(1, "test", None)
+    append(layer, [0, 10], [0, 10], [1, 1])
+    append(layer, [np.nan, 5], [5, np.nan], [1, 1])
+    append(layer, [20], [0], [-np.inf])
+    assert np.allclose(layer.bounds, [[-1, -1], [20, 11]])
+    assert np.isfinite(layer.bounds).all()
+    assert np.isfinite(layer.BoundingBox).all()
+
+
+def test_layer_reuses_removed_records():
+    layer = SymbolLayer(1, "test", None)
+    first = append(layer, [0, 1, 2], [0, 1, 2], [1, 1, 1])
+    assert first.tolist() == [0, 1, 2]
+    layer.release(first[:2])
+    layer.release(first[:1])
+    assert layer.alive[:3].tolist() == [False, False, True]
+    second = append(layer, [5, 6, 7], [5, 6, 7], [1, 1, 1])
+    assert sorted(second.tolist()) == [0, 1, 3]
+    assert layer.count == 4
+    assert layer.alive[:4].all()
+    assert layer.labels[second[0]] == "0"
+    # Слой, который перестраивается целиком, не растет
+    for _ in range(100):
+        layer.release(np.flatnonzero(layer.alive))
+        append(layer, [0, 1, 2, 3], [0, 1, 2, 3], [1, 1, 1, 1])
+    assert layer.count == 4
+    assert np.allclose(layer.BoundingBox, [[-1, -1], [4, 4]])
@@ -0,0 +1,40 @@
+from src.catalog import CatalogFollower, EventTable, line_end, read_table
+
+
+def write(path, text, mode="w"):
+    with open(path, mode, encoding="utf-8", newline="") as f:
+        f.write(text)
+
+
+def test_line_end(tmp_path):
+    path = str(tmp_path / "catalog.csv")
+    write(path, "x;y;z;e\n1;2;3;10\n7;8;9;30")
+    assert line_end(path) == len("x;y;z;e\n1;2;3;10\n")
+    assert line_end(path, 5) == 0
+    write(path, "x;y;z;e\n")
+    assert line_end(path) == len("x;y;z;e\n")
+
+
+def test_follow_half_written_line(tmp_path):
+    path = str(tmp_path / "catalog.csv")
+    write(path, "x;y;z;e\n1;2;3;10\n7;8;9;30")
+    end = line_end(path)
+    loaded = EventTable.from_raw(read_table(path, ";", end=end), 0, 1, 2, 3)
+    assert loaded.value.tolist() == [10]
+
+    follower = CatalogFollower(path, ";", [0, 1, 2, 3], end)
+    assert follower.poll() is None
+
+    write(path, "00\n4;5;6;20\n", "a")
+    table = follower.poll()
+    assert table.value.tolist() == [3000, 20]
+    assert table.x.tolist() == [7, 4]
+    assert follower.poll() is None
+
+
+def test_follow_recreated_file(tmp_path):
+    path = str(tmp_path / "catalog.csv")
+    write(path, "x;y;z;e\n1;2;3;10\n4;5;6;20\n")
+    follower = CatalogFollower(path, ";", [0, 1, 2, 3], line_end(path))
+    write(path, "x;y;z;e\n7;8;9;30\n")
+    assert follower.poll().value.tolist() == [30]
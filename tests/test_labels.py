@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("wx")
+
+from src.ui.windows.main.labels import CHAR_WIDTH, label_lengths, place_labels
+from src.ui.windows.main.render import LABEL_HEIGHT, LABEL_MIN_PIXELS, LABEL_OFFSET
+
+
+def label_rects(x, y, lengths, scale):
+    """Экранные прямоугольники подписей: left, top, right, bottom."""
+    left = x * scale
+    top = -y * scale + LABEL_OFFSET
+    return np.column_stack([left, top, left + lengths * CHAR_WIDTH * LABEL_HEIGHT, top + LABEL_HEIGHT])
+
+
+def test_placed_labels_do_not_overlap():
+    rng = np.random.default_rng(0)
+    count = 3000
+    x, y = rng.uniform(0, 200, count), rng.uniform(0, 200, count)
+    energy = rng.uniform(1, 1e6, count)
+    lengths = label_lengths(["%.0f" % e for e in energy])
+    placed = place_labels(x, y, energy, lengths, 4.0)
+    assert 0 < placed.sum() < count
+    rects = label_rects(x, y, lengths, 4.0)[placed]
+    a, b = np.triu_indices(len(rects), 1)
+    overlap = (
+        (rects[a, 0] < rects[b, 2])
+        & (rects[b, 0] < rects[a, 2])
+        & (rects[a, 1] < rects[b, 3])
+        & (rects[b, 1] < rects[a, 3])
+    )
+    assert not overlap.any()
+
+
+def test_strongest_label_wins():
+    x = np.array([0.0, 0.1, 0.2, 50.0])
+    y = np.array([0.0, 0.0, 0.1, 0.0])
+    energy = np.array([10.0, 30.0, 20.0, 1.0])
+    placed = place_labels(x, y, energy, np.full(4, 3), 2.0)
+    assert placed.tolist() == [False, True, False, True]
+
+
+def test_no_labels_when_zoomed_out_or_not_finite():
+    x = np.array([0.0, np.nan, 10.0])
+    y = np.array([0.0, 0.0, np.inf])
+    lengths = np.full(3, 2)
+    assert place_labels(x, y, np.ones(3), lengths, 1.0).tolist() == [True, False, False]
+    small = LABEL_MIN_PIXELS / LABEL_HEIGHT / 2
+    assert not place_labels(x, y, np.ones(3), lengths, small).any()
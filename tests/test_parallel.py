@@ -0,0 +1,62 @@
+import pytest
+
+from src.catalog import ReadCancelled, read_events_parallel, read_table, split_ranges
+from src.catalog import parallel
+
+
+def write_catalog(path, rows):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("x;y;z;e\n")
+        for i in range(rows):
+            f.write("%d;%d;%d;%d\n" % (i, i + 1, i + 2, i * 10))
+
+
+def test_split_ranges_on_line_starts(tmp_path):
+    path = str(tmp_path / "catalog.csv")
+    write_catalog(path, 100)
+    with open(path, "rb") as f:
+        data = f.read()
+    ranges = split_ranges(path, 7)
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(data)
+    for (_, end), (start, _) in zip(ranges, ranges[1:]):
+        assert end == start
+        assert data[start - 1:start] == b"\n"
+    ranges = split_ranges(path, 3, 40)
+    assert ranges[-1][1] == 40
+
+
+def test_read_events_parallel_matches_serial(tmp_path, monkeypatch):
+    path = str(tmp_path / "catalog.csv")
+    write_catalog(path, 1000)
+    monkeypatch.setattr(parallel, "PARALLEL_MIN_SIZE", 0)
+    table, header = read_events_parallel(path, ";", [0, 1, 2, 3], workers=3, chunk_size=256)
+    assert header == ["x", "y", "z", "e"]
+    assert table.x.tolist() == list(range(1000))
+    assert table.value.tolist() == [i * 10 for i in range(1000)]
+
+
+def test_read_events_single_range_progress(tmp_path):
+    path = str(tmp_path / "catalog.csv")
+    write_catalog(path, 1000)
+    calls = []
+    table, _ = read_events_parallel(
+        path, ";", [0, 1, 2, 3], workers=1, chunk_size=256, on_progress=calls.append
+    )
+    assert len(table) == 1000
+    assert len(calls) > 1
+    assert calls[-1].fraction == 1.0
+
+    with pytest.raises(ReadCancelled):
+        read_events_parallel(
+            path, ";", [0, 1, 2, 3], workers=1, chunk_size=256, on_progress=lambda p: False
+        )
+
+
+def test_read_events_parallel_tail(tmp_path, monkeypatch):
+    path = str(tmp_path / "catalog.csv")
+    write_catalog(path, 1000)
+    start = split_ranges(path, 2)[1][0]
+    head = read_table(path, ";", end=start)
+    monkeypatch.setattr(parallel, "PARALLEL_MIN_SIZE", 0)
+    tail, _ = read_events_parallel(path, ";", [0, 1, 2, 3], workers=3, start=start)
+    assert tail.x.tolist() == list(range(len(head), 1000))
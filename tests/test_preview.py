@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("wx")
+
+from src.catalog import EventTable, RawTable
+from src.ui.windows.import_seismic_data.table import PreviewTable
+
+
+def raw_table():
+    raw = RawTable()
+    raw.set_header(["a", "b", "c", "d", "e"])
+    raw.append_rows([["1", "2", "3", "10", "01.02.2025 3:06"], ["4", "5", "6", "20", "02.02.2025 3:06"]])
+    return raw
+
+
+def test_preview_maps_columns_without_copying():
+    table = PreviewTable()
+    raw = raw_table()
+    table.set_data(raw)
+    assert table.GetNumberRows() == 2
+    assert table.GetNumberCols() == 5
+    assert table.GetValue(1, 0) == "4"
+    assert table.GetValue(0, 4) == ""
+
+    table.set_mapping(2, 1, 0, 3, 4)
+    assert [table.GetValue(1, col) for col in range(5)] == ["6", "5", "4", "20", "02.02.2025 3:06"]
+    # Правка ячейки пишется в колонку RawTable по соответствию
+    table.SetValue(0, 3, "11")
+    assert raw.columns[3][0] == "11"
+
+
+def test_preview_shows_cached_events():
+    table = PreviewTable()
+    table.set_data(raw_table())
+    table.set_events(
+        EventTable(
+            x=np.array([1.5]),
+            y=np.array([2.0]),
+            z=np.array([3.0]),
+            value=np.array([1e6]),
+        )
+    )
+    assert table.GetNumberRows() == 1
+    assert [table.GetValue(0, col) for col in range(5)] == ["1.5", "2", "3", "1e+06", ""]
+    table.SetValue(0, 0, "7")
+    assert table.events.x[0] == 1.5
@@ -0,0 +1,56 @@
+import pytest
+
+from src.catalog import ReadCancelled, iter_chunks, read_table
+from src.catalog.reader import FILL_VALUE
+
+
+def write(path, text):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(text)
+
+
+CATALOG = "x;y;z;Энергия\n1;2;3;10\n\n4;5;6;2,5\n7;8;9;30"
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 7, 16, 1024])
+def test_read_table_same_for_any_chunk_size(tmp_path, chunk_size):
+    path = str(tmp_path / "catalog.csv")
+    write(path, CATALOG)
+    table = read_table(path, ";", chunk_size)
+    assert table.header == ["x", "y", "z", "Энергия"]
+    assert table.columns == [["1", "4", "7"], ["2", "5", "8"], ["3", "6", "9"], ["10", "2,5", "30"]]
+    assert table.end == len(CATALOG.encode("utf-8"))
+
+
+def test_iter_chunks_splits_on_line_ends(tmp_path):
+    path = str(tmp_path / "catalog.csv")
+    write(path, "a;b\r\n1;2\r\n3;4\r\n")
+    chunks = list(iter_chunks(path, ";", chunk_size=4))
+    rows = [row for chunk, _ in chunks for row in chunk]
+    assert rows == [["a", "b"], ["1", "2"], ["3", "4"]]
+    assert len(chunks) > 1
+    assert chunks[-1][1].fraction == 1.0
+
+
+def test_read_table_range_without_header(tmp_path):
+    path = str(tmp_path / "catalog.csv")
+    write(path, "x;y\n1;2\n3;4\n5;6\n")
+    start = len("x;y\n1;2\n")
+    table = read_table(path, ";", 3, start=start, end=start + len("3;4\n"), with_header=False)
+    assert table.columns == [["3"], ["4"]]
+
+
+def test_read_table_fills_short_rows_and_collapses_tabs(tmp_path):
+    path = str(tmp_path / "catalog.csv")
+    write(path, "x\t\ty\n1\t\t\t2\t3\n4\n")
+    table = read_table(path, "\t", 5)
+    assert table.width == 3
+    assert table.row(0) == ["1", "2", "3"]
+    assert table.row(1) == ["4", FILL_VALUE, FILL_VALUE]
+
+
+def test_read_table_cancel(tmp_path):
+    path = str(tmp_path / "catalog.csv")
+    write(path, CATALOG)
+    with pytest.raises(ReadCancelled):
+        read_table(path, ";", 4, on_progress=lambda progress: False)
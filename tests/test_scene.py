@@ -0,0 +1,76 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+
+pytest.importorskip("wx")
+
+from src.catalog import EventTable
+from src.ui.windows.main.render import PRIM_COUNT
+from src.ui.windows.main.scene import ColumnBuffers, Event, EventsCollection
+
+
+def events(count, start=0):
+    rng = np.random.default_rng(start)
+    return EventTable(
+        x=rng.uniform(0, 5000, count),
+        y=rng.uniform(0, 5000, count),
+        z=rng.uniform(0, 500, count),
+        value=10 ** rng.uniform(2, 7, count),
+        time=np.arange(start, start + count, dtype=np.int64),
+    )
+
+
+def append(collection, table):
+    count = len(table)
+    collection.append(
+        table,
+        np.zeros((count, 3), dtype=np.uint8),
+        np.arange(count * PRIM_COUNT, dtype=np.int64).reshape(count, PRIM_COUNT),
+    )
+
+
+def test_column_buffers_grow_by_doubling():
+    buffers = ColumnBuffers()
+    column = np.empty(0)
+    for i in range(10):
+        column = buffers.append("x", column, np.full(3, float(i)))
+    assert column.tolist() == [float(i) for i in range(10) for _ in range(3)]
+    assert len(buffers.buffers["x"]) == 48
+    assert buffers.nbytes() == 48 * 8
+    # Замененный снаружи столбец не пишется на месте
+    replaced = column.copy()
+    column = buffers.append("x", replaced, np.ones(1))
+    assert len(column) == 31 and len(replaced) == 30
+
+
+def test_collection_nbytes_counts_capacity_and_indexes():
+    collection = EventsCollection(None, with_time=True)
+    append(collection, events(1000))
+    append(collection, events(10, 1000))
+    table = collection.table
+    filled = sum(c.nbytes for c in (table.x, table.y, table.z, table.value, table.time))
+    filled += collection.primitives.nbytes + collection.colors.nbytes + collection.label_lengths.nbytes
+    assert collection.nbytes() >= filled + collection.index.nbytes()
+    assert collection.index.nbytes() == 1010 * 8
+
+
+def test_collection_memory_per_event():
+    """Столбцы занимают меньше памяти, чем прежний список объектов Event."""
+    count = 20000
+    collection = EventsCollection(None, with_time=True)
+    table = events(count)
+    append(collection, table)
+    per_event = collection.nbytes() / count
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    legacy = [
+        Event(x, y, z, e, [i, i + 1, i + 2])
+        for i, (x, y, z, e) in enumerate(
+            zip(table.x.tolist(), table.y.tolist(), table.z.tolist(), table.value.tolist())
+        )
+    ]
+    legacy_per_event = (tracemalloc.get_traced_memory()[0] - before) / len(legacy)
+    tracemalloc.stop()
+    assert per_event < legacy_per_event
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from src.catalog import QuantileSketch
+
+
+def test_sketch_quantiles_within_relative_accuracy():
+    values = np.random.default_rng(0).lognormal(8, 2, 100_000)
+    sketch = QuantileSketch()
+    for part in np.array_split(values, 7):
+        sketch.add(part)
+    qs = np.linspace(0, 1, 21)
+    expected = np.quantile(values, qs, method="lower")
+    assert np.allclose(sketch.quantiles(qs), expected, rtol=0.01)
+    assert len(sketch) == len(values)
+
+
+def test_sketch_zeros_and_non_finite():
+    sketch = QuantileSketch()
+    sketch.add([0.0, -5.0, np.nan, np.inf, 100.0, 100.0])
+    assert len(sketch) == 4
+    assert sketch.quantile(0) == 0.0
+    assert sketch.quantile(0.4) == 0.0
+    assert sketch.quantile(1) == pytest.approx(100.0, rel=0.01)
+    assert sketch.histogram([-1, 1, 1000]).tolist() == [2, 2]
+
+
+def test_sketch_merge_matches_single_sketch():
+    values = np.random.default_rng(1).uniform(1, 1e6, 10_000)
+    whole, first, second = QuantileSketch(), QuantileSketch(), QuantileSketch()
+    whole.add(values)
+    first.add(values[:3000])
+    second.add(values[3000:])
+    version = first.version
+    first.merge(second)
+    assert first.version > version
+    qs = np.linspace(0, 1, 11)
+    assert first.quantiles(qs).tolist() == whole.quantiles(qs).tolist()
+    with pytest.raises(ValueError):
+        first.merge(QuantileSketch(0.05))
+
+
+def test_empty_sketch():
+    sketch = QuantileSketch()
+    assert np.isnan(sketch.quantiles([0.0, 0.5])).all()
+    sketch.add([10.0])
+    sketch.clear()
+    assert len(sketch) == 0 and np.isnan(sketch.quantile(0.5))
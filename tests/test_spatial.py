@@ -0,0 +1,58 @@
+import math
+
+import numpy as np
+import pytest
+
+pytest.importorskip("wx")
+
+from src.ui.windows.main.spatial import GridIndex
+
+
+def points(count, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.normal(0, 100, count)
+    y = rng.uniform(-50, 50, count)
+    x[::97] = np.nan
+    return x, y
+
+
+def brute_nearest(x, y, px, py, radius=math.inf):
+    dist = np.hypot(x - px, y - py)
+    dist[~np.isfinite(dist)] = np.inf
+    i = int(np.argmin(dist))
+    if dist[i] > radius:
+        return -1, math.inf
+    return i, float(dist[i])
+
+
+def test_nearest_matches_brute_force_while_growing():
+    x, y = points(20000)
+    index = GridIndex()
+    rng = np.random.default_rng(1)
+    # Порции дописываются с перестроением сетки по ходу
+    for end in (10, 200, 5000, 20000):
+        index.update(x[:end], y[:end])
+        assert len(index) == end
+        for px, py in rng.uniform(-300, 300, (50, 2)):
+            found = index.nearest(px, py, x, y)
+            expected = brute_nearest(x[:end], y[:end], px, py)
+            assert found[1] == pytest.approx(expected[1])
+            found = index.nearest(px, py, x, y, radius=5.0)
+            assert found[0] == brute_nearest(x[:end], y[:end], px, py, 5.0)[0]
+
+
+def test_query_rect_matches_brute_force():
+    x, y = points(20000, 2)
+    index = GridIndex()
+    index.update(x, y)
+    # Маленький прямоугольник - по ячейкам, большой - полным просмотром
+    for x0, y0, x1, y1 in [(-10, -5, 12, 3), (-1, -1, 1, 1), (-500, -60, 500, 60), (1000, 0, 1001, 1)]:
+        expected = np.flatnonzero((x >= x0) & (x <= x1) & (y >= y0) & (y <= y1))
+        assert index.query_rect(x0, y0, x1, y1, x, y).tolist() == expected.tolist()
+
+
+def test_empty_index():
+    index = GridIndex()
+    x = np.empty(0)
+    assert index.nearest(0, 0, x, x) == (-1, math.inf)
+    assert len(index.query_rect(0, 0, 1, 1, x, x)) == 0
@@ -0,0 +1,36 @@
+import numpy as np
+
+from src.catalog import EventTable, RawTable, to_float64
+
+
+def test_to_float64_decimal_comma_and_bad_values():
+    values = to_float64(["1,41E+03", "2.5", "-3", "abc", ""])
+    assert values.dtype == np.float64
+    assert values.flags.c_contiguous
+    assert values[:3].tolist() == [1410.0, 2.5, -3.0]
+    assert np.isnan(values[3:]).all()
+
+
+def test_event_table_from_raw():
+    raw = RawTable()
+    raw.set_header(["Энергия", "X", "Y", "Z", "Время"])
+    raw.append_rows([["1,5e3", "1", "2", "3", "01.02.2025 3:06"], ["20", "4,5", "5", "6", "x"]])
+    table = EventTable.from_raw(raw, 1, 2, 3, 0, 4)
+    assert table.x.tolist() == [1.0, 4.5]
+    assert table.value.tolist() == [1500.0, 20.0]
+    assert table.time.dtype == np.int64
+    assert table.time[0] == np.datetime64("2025-02-01T03:06", "s").astype(np.int64)
+    assert EventTable.from_raw(raw, 1, 2, 3, 0).time is None
+
+
+def test_event_table_concat_and_take():
+    first = EventTable(np.array([1.0]), np.array([2.0]), np.array([3.0]), np.array([4.0]), np.array([10]))
+    second = EventTable(np.array([5.0]), np.array([6.0]), np.array([7.0]), np.array([8.0]), np.array([20]))
+    table = EventTable.concat([first, second])
+    assert table.x.tolist() == [1.0, 5.0]
+    assert table.time.tolist() == [10, 20]
+    # Без времени в одной из частей время не сохраняется
+    second.time = None
+    assert EventTable.concat([first, second]).time is None
+    assert table.take(np.array([1])).value.tolist() == [8.0]
+    assert len(EventTable.concat([])) == 0
@@ -0,0 +1,32 @@
+import numpy as np
+
+from src.catalog import TIME_NONE, parse_times
+
+
+def epoch(value):
+    return int(np.datetime64(value, "s").astype(np.int64))
+
+
+def test_parse_times():
+    times = parse_times(["01.02.2025 3:06", "28.02.2025 23:59"])
+    assert times.tolist() == [epoch("2025-02-01T03:06"), epoch("2025-02-28T23:59")]
+
+
+def test_parse_times_rejects_out_of_range_fields():
+    values = [
+        "13.13.2025 3:06",
+        "00.01.2025 3:06",
+        "30.02.2025 3:06",
+        "29.02.2025 3:06",
+        "01.01.2025 24:00",
+        "01.01.2025 3:60",
+        "29.02.2024 3:06",
+    ]
+    times = parse_times(values)
+    assert times[:-1].tolist() == [TIME_NONE] * 6
+    assert times[-1] == epoch("2024-02-29T03:06")
+
+
+def test_parse_times_rejects_out_of_range_seconds():
+    times = parse_times(["01.01.2025 03:06:60", "01.01.2025 03:06:59"], "%d.%m.%Y %H:%M:%S")
+    assert times.tolist() == [TIME_NONE, epoch("2025-01-01T03:06:59")]